@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import http_client
+
+# Thumbnail cache for RSS Finder artwork. Each artwork URL is downloaded once,
+# downsized to THUMBNAIL_SIZE and stored on disk under the SHA-256 of the
+# thumbnail bytes (so shows sharing artwork share a file). A SQLite index maps
+# URLs to files and drives LRU eviction past MAX_CACHE_BYTES, and the most
+# recently used thumbnails are also kept in memory.
+
+CACHE_DIR = os.path.join('.cache', 'artwork')
+INDEX_PATH = os.path.join('.cache', 'artwork.sqlite3')
+THUMBNAIL_SIZE = (160, 160)
+JPEG_QUALITY = 85
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+MEMORY_ENTRIES = 256
+MAX_WORKERS = 8
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+_connection = None
+_db_lock = threading.Lock()
+
+def _connect():
+    global _connection
+    if _connection is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _connection = sqlite3.connect(INDEX_PATH, check_same_thread=False, timeout=30)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute(
+            'CREATE TABLE IF NOT EXISTS artwork ('
+            'url TEXT PRIMARY KEY, digest TEXT, size INTEGER, accessed_at REAL)'
+        )
+        _connection.execute('CREATE INDEX IF NOT EXISTS artwork_accessed ON artwork (accessed_at)')
+        _connection.commit()
+    return _connection
+
+def _path(digest):
+    return os.path.join(CACHE_DIR, digest[:2], digest + '.jpg')
+
+def _remember(url, thumbnail):
+    with _memory_lock:
+        _memory[url] = thumbnail
+        _memory.move_to_end(url)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+# Downsize image bytes to a JPEG thumbnail
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', size)  # Lets JPEG decoding skip straight to a smaller scale
+        image = image.convert('RGB')
+        image.thumbnail(size)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+def _lookup(url):
+    with _db_lock:
+        connection = _connect()
+        row = connection.execute('SELECT digest FROM artwork WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(_path(row[0]), 'rb') as thumbnail_file:
+                thumbnail = thumbnail_file.read()
+        except OSError:
+            connection.execute('DELETE FROM artwork WHERE url = ?', (url,))
+            connection.commit()
+            return None
+        connection.execute('UPDATE artwork SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        connection.commit()
+    return thumbnail
+
+def _evict(connection):
+    total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM artwork').fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url, digest, size in connection.execute(
+            'SELECT url, digest, size FROM artwork ORDER BY accessed_at').fetchall():
+        connection.execute('DELETE FROM artwork WHERE url = ?', (url,))
+        # A file can back several URLs; only remove it once nothing points at it
+        if connection.execute('SELECT 1 FROM artwork WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+            try:
+                os.remove(_path(digest))
+            except OSError:
+                pass
+        total -= size
+        if total <= MAX_CACHE_BYTES:
+            break
+
+def _store(url, thumbnail):
+    digest = hashlib.sha256(thumbnail).hexdigest()
+    path = _path(digest)
+    with _db_lock:
+        connection = _connect()
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as thumbnail_file:
+                thumbnail_file.write(thumbnail)
+            os.replace(temp_path, path)
+        connection.execute(
+            'INSERT OR REPLACE INTO artwork (url, digest, size, accessed_at) VALUES (?, ?, ?, ?)',
+            (url, digest, len(thumbnail), time.time())
+        )
+        _evict(connection)
+        connection.commit()
+
+# Thumbnail bytes for an artwork URL, from memory, disk or the network (in that
+# order). Returns None if the image can't be fetched or decoded, so callers can
+# fall back to the original URL.
+def get_thumbnail(url):
+    with _memory_lock:
+        thumbnail = _memory.get(url)
+        if thumbnail is not None:
+            _memory.move_to_end(url)
+            return thumbnail
+
+    thumbnail = _lookup(url)
+    if thumbnail is None:
+        try:
+            response = http_client.get(url)
+            response.raise_for_status()
+            thumbnail = make_thumbnail(response.content)
+        except Exception as e:
+            print(f"Failed to cache artwork {url}: {e}")
+            return None
+        _store(url, thumbnail)
+    _remember(url, thumbnail)
+    return thumbnail
+
+# Thumbnails for several URLs fetched in parallel, in the order given
+def get_thumbnails(urls, max_workers=MAX_WORKERS):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(get_thumbnail, urls))
@@ -0,0 +1,148 @@
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import endpoints
+import http_client
+import metrics
+from csv_export import CsvExport
+
+# Backup store for the markers a run is about to overwrite (for Mid2 runs, each
+# plan row with the episode's original markers). Rows are written as
+# they are produced into gzip-compressed CSV chunks of CHUNK_ROWS rows, each a
+# standalone file with its own header, next to a manifest.json that records
+# every chunk's row count, size and SHA-256. Local disk is the default
+# backend; an uploader (e.g. PipedreamUploader) can ship each chunk in the
+# background as soon as it is written.
+
+BACKUP_DIR = 'backups'
+CHUNK_ROWS = 500
+UPLOAD_WORKERS = 2
+
+class PipedreamUploader:
+    # Sends each chunk to the Pipedream webhook that files backups in Google
+    # Drive, in the same {"filename", "file"} shape as the old single upload
+    def __init__(self, webhook_url=None, run_metrics=metrics.NULL):
+        self.webhook_url = webhook_url or endpoints.PIPEDREAM_WEBHOOK_URL
+        self.run_metrics = run_metrics
+
+    def upload(self, name, data, sha256):
+        response = http_client.post(self.webhook_url, json={
+            'filename': name,
+            'file': base64.b64encode(data).decode('ascii'),
+            'sha256': sha256,
+        }, run_metrics=self.run_metrics)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} - {response.text}")
+
+class LocalBackupSink:
+    def __init__(self, show_id, filename, header, directory=BACKUP_DIR, chunk_rows=CHUNK_ROWS, uploader=None):
+        self.directory = os.path.join(directory, show_id, time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(self.directory, exist_ok=True)
+        self.name = os.path.splitext(filename)[0]
+        self.header = list(header)
+        self.chunk_rows = chunk_rows
+        self.uploader = uploader
+        self.manifest = {'show_id': show_id, 'filename': filename, 'header': self.header, 'chunks': [], 'complete': False}
+        self.errors = []
+        self._rows = []
+        self._lock = threading.Lock()
+        self._uploads = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) if uploader is not None else None
+        self._futures = []
+
+    @property
+    def row_count(self):
+        return sum(chunk['rows'] for chunk in self.manifest['chunks']) + len(self._rows)
+
+    def write_row(self, row):
+        self._rows.append(list(row))
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    # Write the buffered rows out as the next chunk
+    def flush(self):
+        if not self._rows:
+            return
+        export = CsvExport(self.header, compress=True)
+        export.write_rows(self._rows)
+        data = export.getvalue()
+        self._rows = []
+
+        chunk = {
+            'file': f"{self.name}-{len(self.manifest['chunks']) + 1:05d}.csv.gz",
+            'rows': export.row_count,
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'uploaded': False,
+        }
+        _write_atomic(os.path.join(self.directory, chunk['file']), data)
+        with self._lock:
+            self.manifest['chunks'].append(chunk)
+            self._write_manifest()
+        if self._uploads is not None:
+            self._futures.append(self._uploads.submit(self._upload, chunk, data))
+
+    def _upload(self, chunk, data):
+        try:
+            self.uploader.upload(chunk['file'], data, chunk['sha256'])
+        except Exception as e:
+            print(f"Failed to upload backup chunk {chunk['file']}: {e}")
+            self.errors.append(f"{chunk['file']}: {e}")
+            return
+        with self._lock:
+            chunk['uploaded'] = True
+            self._write_manifest()
+
+    def _write_manifest(self):
+        _write_atomic(os.path.join(self.directory, 'manifest.json'), json.dumps(self.manifest, indent=2).encode('utf-8'))
+
+    # Flush the last chunk and mark the backup complete. Uploads carry on in
+    # the background; wait() blocks until they finish.
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.manifest['complete'] = True
+            self._write_manifest()
+
+    # True once every chunk is on disk and (with an uploader) uploaded
+    def wait(self):
+        for future in self._futures:
+            future.result()
+        if self._uploads is not None:
+            self._uploads.shutdown()
+        return not self.errors
+
+def _write_atomic(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as output_file:
+        output_file.write(data)
+        output_file.flush()
+        os.fsync(output_file.fileno())
+    os.replace(temp_path, path)
+
+def open_backup(show_id, filename, header, upload=False, run_metrics=metrics.NULL, **options):
+    return LocalBackupSink(show_id, filename, header, uploader=PipedreamUploader(run_metrics=run_metrics) if upload else None, **options)
+
+# Read a backup back, checking every chunk against its manifest checksum.
+# Yields rows without the per-chunk header.
+def iter_backup_rows(directory):
+    with open(os.path.join(directory, 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+    for chunk in manifest['chunks']:
+        with open(os.path.join(directory, chunk['file']), 'rb') as chunk_file:
+            data = chunk_file.read()
+        if hashlib.sha256(data).hexdigest() != chunk['sha256']:
+            raise ValueError(f"Checksum mismatch in backup chunk {chunk['file']}")
+        reader = csv.reader(io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(data)), encoding='utf-8', newline=''))
+        next(reader, None)
+        yield from reader
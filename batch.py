@@ -0,0 +1,112 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.managers import SyncManager
+import http_client
+import mid2_pipeline
+import patch_writer
+import timestamp_pipeline
+from rate_limit import TokenBucket
+
+# Batch runner for applying a pipeline to many shows at once. Each show runs as
+# its own task in a process pool (a fresh worker process per show, so no state
+# leaks between shows), all processes share one budget of concurrent HTTP
+# requests and one PATCH rate limiter, and every show writes its own result
+# file.
+
+MAX_PROCESSES = os.cpu_count() or 2
+HTTP_BUDGET = 32  # Concurrent HTTP requests across all processes
+OUTPUT_DIR = 'batch_output'
+
+# Show IDs from an uploaded CSV or plain list: the first column of each row,
+# skipping blank lines and a header row
+def read_show_ids(text):
+    show_ids = []
+    for line in text.splitlines():
+        show_id = line.split(',')[0].strip().strip('"')
+        if show_id and show_id.lower() not in ('show id', 'showid', 'show_id', 'id'):
+            show_ids.append(show_id)
+    return list(dict.fromkeys(show_ids))
+
+def new_output_dir():
+    output_dir = os.path.join(OUTPUT_DIR, time.strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+def export_timestamps_job(show_id, key, output_dir, compress=False):
+    show_name, episode_count, export = timestamp_pipeline.export_show_timestamps(show_id, key, compress=compress)
+    path = os.path.join(output_dir, export.file_name(show_id))
+    with open(path, 'wb') as result_file:
+        result_file.write(export.getvalue())
+    return {'show_name': show_name, 'episodes': episode_count, 'rows': export.row_count, 'file': path}
+
+def mid2_job(show_id, key, output_dir, max_workers=mid2_pipeline.MAX_WORKERS, resume=False, dry_run=False, upload_backup=True, incremental=False):
+    summary = mid2_pipeline.run_autoplacer(show_id, key, max_workers=max_workers, resume=resume, dry_run=dry_run,
+                                           upload_backup=upload_backup, incremental=incremental)
+    path = os.path.join(output_dir, f"{show_id}_mid2.csv")
+    with open(path, 'w') as result_file:
+        result_file.write(summary.pop('file_content'))
+    summary['file'] = path
+    if 'report_content' in summary:
+        summary['report'] = os.path.join(output_dir, f"{show_id}_mid2_diff.csv")
+        with open(summary['report'], 'w') as report_file:
+            report_file.write(summary.pop('report_content'))
+    return summary
+
+JOBS = {
+    'export-timestamps': export_timestamps_job,
+    'mid2': mid2_job,
+}
+
+# A manager that can also host a TokenBucket. The bucket lives in the manager
+# process, so every worker's writes draw on the same tokens.
+class BatchManager(SyncManager):
+    pass
+
+BatchManager.register('TokenBucket', TokenBucket)
+
+def _init_worker(http_budget, write_limiter):
+    http_client.set_concurrency_limit(http_budget)
+    patch_writer.set_shared_limiter(write_limiter)
+
+# Runs in the worker process; failures are reported per show instead of
+# aborting the batch
+def _run_show(job, show_id, key, output_dir, options):
+    started = time.monotonic()
+    try:
+        result = JOBS[job](show_id, key, output_dir, **options)
+        result['status'] = 'ok'
+    except Exception as e:
+        result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    result['show_id'] = show_id
+    result['seconds'] = round(time.monotonic() - started, 1)
+    return result
+
+# Run `job` for every show and yield each show's result as it finishes. A line
+# per show is also appended to summary.jsonl in the output directory.
+def run_batch(job, show_ids, key, output_dir=None, max_processes=MAX_PROCESSES, http_budget=HTTP_BUDGET, **options):
+    output_dir = output_dir or new_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = os.path.join(output_dir, 'summary.jsonl')
+
+    # Spawned workers start clean instead of inheriting the parent's threads
+    context = multiprocessing.get_context('spawn')
+    with BatchManager(ctx=context) as manager:
+        budget = manager.BoundedSemaphore(http_budget)
+        write_limiter = manager.TokenBucket()
+        with ProcessPoolExecutor(max_workers=max_processes, mp_context=context, initializer=_init_worker,
+                                 initargs=(budget, write_limiter), max_tasks_per_child=1) as executor:
+            futures = {
+                executor.submit(_run_show, job, show_id, key, output_dir, options): show_id
+                for show_id in show_ids
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'show_id': futures[future], 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+                with open(summary_path, 'a') as summary_file:
+                    summary_file.write(json.dumps(result) + '\n')
+                yield result
@@ -0,0 +1,54 @@
+import io
+import os
+import zipfile
+import pandas as pd
+import streamlit as st
+import batch
+
+# Streamlit form shared by the pages that support batch mode
+
+def zip_directory(path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(os.listdir(path)):
+            archive.write(os.path.join(path, name), arcname=name)
+    return buffer.getvalue()
+
+def render_batch_mode(job, **options):
+    with st.expander("Batch mode: run a list of shows"):
+        with st.form(key=f'batch_form_{job}'):
+            upload = st.file_uploader("Show IDs (CSV with the Show ID in the first column, or one per line):", type=['csv', 'txt'], key=f'batch_upload_{job}')
+            key = st.text_input("API Key:", type="password", key=f'batch_key_{job}')
+            max_processes = st.number_input("Processes:", min_value=1, max_value=64, value=batch.MAX_PROCESSES, key=f'batch_processes_{job}')
+            if job == 'mid2':
+                # Batch Mid2 runs touch every listed show, so they default to a dry run
+                dry_run = st.checkbox("Dry run (plan placements and report changes without updating episodes)", value=True, key=f'batch_dry_run_{job}')
+                confirmed = st.checkbox("I understand a live run updates episodes in every listed show", key=f'batch_confirm_{job}')
+            submit_button = st.form_submit_button(label='Run batch')
+
+        if submit_button and upload is not None:
+            show_ids = batch.read_show_ids(upload.getvalue().decode('utf-8'))
+            if not show_ids:
+                st.warning("No Show IDs found in the uploaded file.")
+                return
+            if job == 'mid2':
+                if not dry_run and not confirmed:
+                    st.error(f"Tick the confirmation box to update episodes in {len(show_ids)} shows, or keep Dry run selected.")
+                    return
+                options = {**options, 'dry_run': dry_run}
+
+            output_dir = batch.new_output_dir()
+            progress_bar = st.progress(0)
+            results_table = st.empty()
+            results = []
+            for result in batch.run_batch(job, show_ids, key, output_dir=output_dir, max_processes=int(max_processes), **options):
+                results.append(result)
+                progress_bar.progress(len(results) / len(show_ids), text=f"Finished {len(results)} of {len(show_ids)} shows")
+                results_table.dataframe(pd.DataFrame(results))
+
+            failed = sum(1 for result in results if result['status'] != 'ok')
+            if failed:
+                st.warning(f"{failed} of {len(show_ids)} shows failed. See the table above for details.")
+            else:
+                st.success(f"All {len(show_ids)} shows done! 🎉")
+            st.download_button(label="Download results", data=zip_directory(output_dir), file_name=f"{job}_batch.zip", mime='application/zip')
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Offline throughput benchmark for the pipelines. A StandinServer serves
+# synthetic shows of each size, and every (pipeline, size) case runs in a fresh
+# Python process with its own empty working directory, so caches start cold
+# and peak RSS is measured per case.
+#
+#   python benchmark.py
+#   python benchmark.py --sizes 100 1000 --pipelines mid2 --media-latency 0.05
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINES = ['mid2', 'export-timestamps', 'embed']
+SIZES = [100, 1000, 10000]
+
+def quiet_notify(level, message):
+    pass
+
+def run_mid2(show_id, max_workers):
+    import mid2_pipeline
+    summary = mid2_pipeline.run_autoplacer(show_id, 'bench-key', max_workers=max_workers, notify=quiet_notify)
+    return {'planned': summary['planned'], 'updated': summary['updated']}
+
+def run_export_timestamps(show_id, max_workers):
+    import timestamp_pipeline
+    show_name, episode_count, export = timestamp_pipeline.export_show_timestamps(show_id, 'bench-key')
+    export.getvalue()
+    return {'rows': export.row_count}
+
+def run_embed(show_id, max_workers):
+    import embed_pipeline
+    episodes, show_title, sanitized_show_title = embed_pipeline.get_episode_ids(show_id)
+    export = embed_pipeline.save_to_csv(episodes)
+    export.getvalue()
+    return {'rows': export.row_count}
+
+CASES = {
+    'mid2': run_mid2,
+    'export-timestamps': run_export_timestamps,
+    'embed': run_embed,
+}
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+# Runs inside the case process; prints one JSON result line
+def run_case(pipeline, size, max_workers):
+    started = time.perf_counter()
+    result = CASES[pipeline](f"bench-{size}", max_workers)
+    seconds = time.perf_counter() - started
+    result.update({
+        'pipeline': pipeline,
+        'episodes': size,
+        'seconds': round(seconds, 3),
+        'episodes_per_sec': round(size / seconds, 1),
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    print(json.dumps(result))
+
+def spawn_case(pipeline, size, max_workers, env):
+    with tempfile.TemporaryDirectory() as work_dir:
+        completed = subprocess.run(
+            [sys.executable, os.path.join(REPO_DIR, 'benchmark.py'), '--case', pipeline, str(size), '--workers', str(max_workers)],
+            cwd=work_dir, env=env, capture_output=True, text=True,
+        )
+    if completed.returncode != 0:
+        return {'pipeline': pipeline, 'episodes': size, 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines against local stand-in servers.")
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES, default=PIPELINES)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help="Episodes per show")
+    parser.add_argument('--latency', type=float, default=0.002, help="Seconds added to every stand-in request")
+    parser.add_argument('--media-latency', type=float, default=0.02, help="Seconds added to sphinx encoder requests")
+    parser.add_argument('--workers', type=int, default=16, help="mid2: episodes analysed in parallel")
+    parser.add_argument('-o', '--output', help="Also write the results as JSON lines to this file")
+    parser.add_argument('--case', nargs=2, metavar=('PIPELINE', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        run_case(args.case[0], int(args.case[1]), args.workers)
+        return 0
+
+    from standin_servers import StandinServer
+    results = []
+    with StandinServer(latency=args.latency, media_latency=args.media_latency) as server:
+        env = dict(os.environ, PYTHONPATH=REPO_DIR, **server.env())
+        print(f"{'pipeline':<18}{'episodes':>9}{'seconds':>10}{'eps/sec':>10}{'peak MB':>9}")
+        for pipeline in args.pipelines:
+            for size in args.sizes:
+                result = spawn_case(pipeline, size, args.workers, env)
+                results.append(result)
+                if 'error' in result:
+                    print(f"{pipeline:<18}{size:>9}  failed: {' '.join(result['error'])}")
+                else:
+                    print(f"{pipeline:<18}{size:>9}{result['seconds']:>10}{result['episodes_per_sec']:>10}{result['peak_rss_mb']:>9}")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            for result in results:
+                output_file.write(json.dumps(result) + '\n')
+    return 1 if any('error' in result for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
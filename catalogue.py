@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import http_client
+import endpoints
+import metrics
+from episode_records import iter_episodes
+
+# Paginated fetcher for the open.acast.com episodes endpoint. Pages are
+# requested concurrently (at most MAX_CONCURRENT_PAGES at a time) and their
+# episodes are yielded as each page arrives, so callers can start joining and
+# extracting markers before the last page lands. Each page is decoded
+# incrementally into compact CatalogueEpisode records.
+
+CATALOGUE_URL = endpoints.OPEN_API_URL + "/rest/shows/{show_id}/episodes"
+PAGE_SIZE = 100
+MAX_CONCURRENT_PAGES = 4
+
+def fetch_page(show_id, headers, page, page_size=PAGE_SIZE, run_metrics=metrics.NULL):
+    url = CATALOGUE_URL.format(show_id=show_id)
+    response = http_client.get(url, headers=headers, params={'page': page, 'limit': page_size}, stream=True, run_metrics=run_metrics)
+    response.raise_for_status()
+    return list(iter_episodes(response))
+
+# Yield every episode of a show, in page-completion order. If `stop_after`
+# returns True for a page, no pages after it are requested (e.g. once a
+# newest-first catalogue reaches episodes a previous run already handled).
+def iter_catalogue(show_id, headers, page_size=PAGE_SIZE, max_concurrency=MAX_CONCURRENT_PAGES, stop_after=None, run_metrics=metrics.NULL):
+    first_page = fetch_page(show_id, headers, 1, page_size, run_metrics)
+    yield from first_page
+    # A short page is the last one; a long one means the API ignored paging
+    if len(first_page) != page_size or (stop_after is not None and stop_after(first_page)):
+        return
+
+    first_id = first_page[0].get('_id')
+    last_page = None
+    next_page = 2
+    pending = {}
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        while True:
+            while len(pending) < max_concurrency and (last_page is None or next_page <= last_page):
+                pending[executor.submit(fetch_page, show_id, headers, next_page, page_size, run_metrics)] = next_page
+                next_page += 1
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = pending.pop(future)
+                episodes = future.result()
+                if episodes and episodes[0].get('_id') == first_id:
+                    # The endpoint served page 1 again, so it isn't paginated
+                    last_page = 1
+                    continue
+                if len(episodes) < page_size and (last_page is None or page < last_page):
+                    last_page = page
+                if last_page is None or page <= last_page:
+                    yield from episodes
+                    if stop_after is not None and stop_after(episodes) and (last_page is None or page < last_page):
+                        last_page = page
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+import pandas as pd
+
+# Shared CSV export used by the pages that offer a download. Rows are streamed
+# through csv.writer into an in-memory buffer (optionally gzip-compressed) as
+# the pipeline produces them, so a file is serialized exactly once. Only the
+# first PREVIEW_ROWS rows are kept around for display.
+
+PREVIEW_ROWS = 100
+
+class CsvExport:
+    def __init__(self, header, compress=False, preview_rows=PREVIEW_ROWS):
+        self.header = list(header)
+        self.compress = compress
+        self.preview_rows = preview_rows
+        self.preview = []
+        self.row_count = 0
+        self._buffer = io.BytesIO()
+        self._gzip = gzip.GzipFile(fileobj=self._buffer, mode='wb') if compress else None
+        self._text = io.TextIOWrapper(self._gzip or self._buffer, encoding='utf-8', newline='')
+        self._writer = csv.writer(self._text, lineterminator='\n')
+        self._writer.writerow(self.header)
+        self._data = None
+
+    def write_row(self, row):
+        row = list(row)
+        self._writer.writerow(row)
+        if len(self.preview) < self.preview_rows:
+            self.preview.append(row)
+        self.row_count += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    # Finish the file and return its bytes; no rows can be written afterwards
+    def getvalue(self):
+        if self._data is None:
+            self._text.flush()
+            self._text.detach()
+            if self._gzip is not None:
+                self._gzip.close()
+            self._data = self._buffer.getvalue()
+        return self._data
+
+    def preview_frame(self):
+        return pd.DataFrame(self.preview, columns=self.header)
+
+    @property
+    def mime(self):
+        return 'application/gzip' if self.compress else 'text/csv'
+
+    def file_name(self, base_name):
+        return f"{base_name}.csv.gz" if self.compress else f"{base_name}.csv"
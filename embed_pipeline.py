@@ -0,0 +1,33 @@
+import re
+import feed_cache
+import endpoints
+from csv_export import CsvExport
+
+# Embed player export pipeline, independent of Streamlit: one CSV row per feed
+# episode with its title, publish date and embed player code.
+
+def sanitize_filename(filename):
+    filename = re.sub(r'[\\/*?:"<>|]', "", filename)
+    return filename.replace(" ", "_")
+
+def get_episode_ids(show_id):
+    url = endpoints.feed_url(show_id)
+    feed = feed_cache.get_feed(url)
+    show_title = feed.title
+    sanitized_show_title = sanitize_filename(show_title)
+    episodes = (
+        (entry.title, entry.pubDate if entry.pubDate is not None else 'Unknown', embed_code(show_id, entry.episodeId))
+        for entry in feed.episodes()
+        if entry.episodeId is not None
+    )
+
+    return episodes, show_title, sanitized_show_title
+
+def embed_code(show_id, episode_id):
+    return f'<iframe src="https://embed.acast.com/{show_id}/{episode_id}" frameBorder="0" width="100%" height="190px"></iframe>'
+
+# Stream episode rows straight into an in-memory CSV
+def save_to_csv(episodes, compress=False):
+    export = CsvExport(["Episode Title", "Published Date", "Embed Code"], compress=compress)
+    export.write_rows(episodes)
+    return export
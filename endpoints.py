@@ -0,0 +1,14 @@
+import os
+
+# Base URLs of the remote services the pipelines talk to. Each can be
+# overridden with an environment variable (set before the pipelines are
+# imported), e.g. to point a run at the local stand-ins in standin_servers.py.
+
+FEEDS_URL = os.environ.get('ACAST_FEEDS_URL', 'https://feeds.acast.com').rstrip('/')
+OPEN_API_URL = os.environ.get('ACAST_OPEN_API_URL', 'https://open.acast.com').rstrip('/')
+SPHINX_URL = os.environ.get('SPHINX_ENCODER_URL', 'https://sphinx-encoder-api-v2.prod.ateam.acast.cloud').rstrip('/')
+ITUNES_URL = os.environ.get('ITUNES_SEARCH_URL', 'https://itunes.apple.com').rstrip('/')
+PIPEDREAM_WEBHOOK_URL = os.environ.get('PIPEDREAM_WEBHOOK_URL', 'https://eowecaqy8eij74h.m.pipedream.net')
+
+def feed_url(show_id):
+    return f"{FEEDS_URL}/public/shows/{show_id}"
@@ -0,0 +1,93 @@
+import pandas as pd
+
+# Matches CMS episodes (open.acast.com) to RSS feed items. Dates and titles for
+# both sides are parsed and normalized column-wise with pandas, then matched in
+# three passes, each only over what the previous passes left unmatched:
+#   exact   - same publish time, to the second
+#   title   - same normalized title on the same (UTC) day
+#   nearest - closest publish time within NEAREST_TOLERANCE
+# Every CMS episode and every RSS item is matched at most once.
+
+NEAREST_TOLERANCE = pd.Timedelta(minutes=10)
+RSS_DATE_FORMAT = '%a, %d %b %Y %H:%M:%S %Z'
+
+def normalize_titles(titles):
+    normalized = titles.fillna('').astype(str).str.lower().str.replace(r'[^a-z0-9]', '', regex=True)
+    return normalized.mask(normalized == '')
+
+# Parse with the expected format first and only fall back to per-value format
+# inference for the few dates that don't fit it
+def _parse_dates(dates, date_format):
+    parsed = pd.to_datetime(dates, format=date_format, utc=True, errors='coerce')
+    unparsed = parsed.isna() & dates.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(dates[unparsed], format='mixed', utc=True, errors='coerce')
+    return parsed
+
+def parse_cms_dates(dates):
+    return _parse_dates(pd.Series(dates, dtype='object'), 'ISO8601')
+
+def parse_rss_dates(dates):
+    return _parse_dates(pd.Series(dates, dtype='object'), RSS_DATE_FORMAT)
+
+def _frame(titles, published):
+    frame = pd.DataFrame({
+        'position': range(len(published)),
+        'published': published.dt.floor('s'),
+        'norm_title': normalize_titles(pd.Series(titles, dtype='object')),
+    })
+    frame['day'] = frame['published'].dt.floor('D')
+    return frame
+
+def _merge_on(rss, cms, keys, match):
+    left = rss.dropna(subset=keys).drop_duplicates(keys)
+    right = cms.dropna(subset=keys).drop_duplicates(keys)
+    merged = left.merge(right, on=keys, suffixes=('_rss', '_cms'))
+    return pd.DataFrame({
+        'rss_index': merged['position_rss'],
+        'cms_index': merged['position_cms'],
+        'match': match,
+    })
+
+def _merge_nearest(rss, cms, tolerance):
+    left = rss.dropna(subset=['published']).sort_values('published')
+    right = cms.dropna(subset=['published']).sort_values('published')
+    right = right.assign(cms_published=right['published'])
+    if left.empty or right.empty:
+        return None
+
+    merged = pd.merge_asof(
+        left[['position', 'published']],
+        right[['position', 'published', 'cms_published']],
+        on='published', direction='nearest', tolerance=tolerance, suffixes=('_rss', '_cms'),
+    ).dropna(subset=['position_cms'])
+    # Several RSS items can land on the same CMS episode; keep the closest
+    merged['gap'] = (merged['published'] - merged['cms_published']).abs()
+    merged = merged.sort_values('gap', kind='stable').drop_duplicates('position_cms')
+    return pd.DataFrame({
+        'rss_index': merged['position_rss'],
+        'cms_index': merged['position_cms'].astype(int),
+        'match': 'nearest',
+    })
+
+# Match CMS episodes to RSS items. Returns a DataFrame of (rss_index,
+# cms_index, match) rows ordered by rss_index, where the indexes are positions
+# in the given sequences.
+def join_episodes(cms_titles, cms_dates, rss_titles, rss_dates, tolerance=NEAREST_TOLERANCE):
+    cms = _frame(cms_titles, parse_cms_dates(cms_dates))
+    rss = _frame(rss_titles, parse_rss_dates(rss_dates))
+
+    matches = []
+    for keys, match in ((['published'], 'exact'), (['norm_title', 'day'], 'title')):
+        merged = _merge_on(rss, cms, keys, match)
+        matches.append(merged)
+        rss = rss[~rss['position'].isin(merged['rss_index'])]
+        cms = cms[~cms['position'].isin(merged['cms_index'])]
+
+    if tolerance is not None:
+        nearest = _merge_nearest(rss, cms, tolerance)
+        if nearest is not None:
+            matches.append(nearest)
+
+    joined = pd.concat(matches, ignore_index=True)
+    return joined.sort_values('rss_index').reset_index(drop=True)
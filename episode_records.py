@@ -0,0 +1,119 @@
+import codecs
+import json
+import sys
+from array import array
+import requests
+
+# Compact catalogue episodes. The open.acast.com episodes endpoint returns
+# large objects, but the pipelines only read a handful of fields, so each
+# element is decoded on its own as the response streams in (iter_json_array)
+# and immediately reduced to a CatalogueEpisode that keeps just those fields,
+# with its markers packed into an array.
+
+FIELDS = ('_id', 'title', 'status', 'publishDate', 'duration', 'markers')
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+class CatalogueEpisode:
+    __slots__ = ('_id', 'title', 'status', 'publishDate', 'duration', '_placements', '_starts')
+
+    def __init__(self, _id=None, title=None, status=None, publishDate=None, duration=None, markers=()):
+        self._id = _id
+        self.title = title
+        self.status = sys.intern(status) if isinstance(status, str) else status
+        self.publishDate = publishDate
+        self.duration = duration
+        # Placements are interned strings; a marker without a start is stored as NaN
+        self._placements = tuple(sys.intern(str(marker.get('placement', ''))) for marker in markers)
+        self._starts = array('d', (float(marker['start']) if marker.get('start') is not None else float('nan') for marker in markers))
+
+    @classmethod
+    def from_json(cls, episode):
+        return cls(**{field: episode[field] for field in FIELDS if field in episode and episode[field] is not None})
+
+    @property
+    def markers(self):
+        return [
+            {'placement': placement} if start != start else {'placement': placement, 'start': _number(start)}
+            for placement, start in zip(self._placements, self._starts)
+        ]
+
+    # Read like the CMS dict it replaces: episode['title'], episode.get(...)
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        value = self.markers if key == 'markers' else getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        return {field: self[field] for field in FIELDS if field in self}
+
+    def __repr__(self):
+        return f"CatalogueEpisode({self.to_dict()!r})"
+
+# A body that isn't a complete JSON array. Like the JSONDecodeError that
+# response.json() raises, it is a requests exception (so pages that report
+# RequestExceptions show it) as well as a ValueError.
+class InvalidJSONArrayError(requests.exceptions.InvalidJSONError, ValueError):
+    pass
+
+# Whole-second positions come back as ints, as the API sent them
+def _number(value):
+    return int(value) if value.is_integer() else value
+
+# Yield each element of a top-level JSON array from an iterable of byte chunks,
+# decoding elements as soon as they are complete
+def iter_json_array(chunks):
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    buffer = ''
+    started = False
+    for chunk in chunks:
+        buffer += decode(chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position] in _WHITESPACE or (started and buffer[position] == ',')):
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise InvalidJSONArrayError(f"Expected a JSON array, got {buffer[position:position + 20]!r}")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break  # The element continues in the next chunk
+            if not isinstance(element, (dict, list)) and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                break  # A number at the end of a chunk may be cut short
+            position = end
+            yield element
+        buffer = buffer[position:]
+    if not started:
+        raise InvalidJSONArrayError("Empty response where a JSON array was expected")
+    raise InvalidJSONArrayError("Truncated JSON array")
+
+# Decode a streamed episodes response into CatalogueEpisode records
+def iter_episodes(response, chunk_size=CHUNK_SIZE):
+    try:
+        for episode in iter_json_array(response.iter_content(chunk_size=chunk_size)):
+            yield CatalogueEpisode.from_json(episode)
+    finally:
+        response.close()
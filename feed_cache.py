@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import http_client
+import metrics
+import feed_parser
+
+# On-disk cache for RSS feeds. Each feed body is stored with its ETag and
+# Last-Modified so later fetches can be revalidated with a conditional GET;
+# a 304 is served from disk. Each body is parsed once, as it is streamed
+# through feed_parser, into a compact JSONL file of its episodes tagged with
+# the body's SHA-256. Later hits read that file back line by line, so an
+# unchanged feed is never parsed twice and memory stays flat however large
+# the feed is.
+
+CACHE_DIR = os.path.join('.cache', 'feeds')
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+def _paths(url):
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    base = os.path.join(CACHE_DIR, name)
+    return base + '.xml', base + '.json', base + '.jsonl'
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+
+def _write_atomic(path, data, mode='w'):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as tmp_file:
+        tmp_file.write(data)
+    os.replace(tmp_path, path)
+
+# A feed read back from its parsed file, with the same interface as
+# feed_parser.Feed. Episodes are decoded one line at a time.
+class CachedFeed:
+    def __init__(self, title, signature, parsed_file):
+        self.title = title
+        self.signature = signature
+        self._file = parsed_file
+
+    def episodes(self):
+        try:
+            for line in self._file:
+                yield feed_parser.FeedEpisode(*json.loads(line))
+        finally:
+            self.close()
+
+    def close(self):
+        self._file.close()
+
+# Parse a cached body into `parsed_path`: a first line holding the body's
+# checksum, then one line per episode. Returns the feed's title and signature.
+def _parse_body(body_path, parsed_path, checksum):
+    tmp_path = f"{parsed_path}.{threading.get_ident()}.tmp"
+    with open(body_path, 'rb') as body_file, open(tmp_path, 'w') as parsed_file:
+        feed = feed_parser.Feed(body_file)
+        parsed_file.write(json.dumps({'checksum': checksum}) + '\n')
+        for episode in feed.episodes():
+            parsed_file.write(json.dumps(list(episode)) + '\n')
+    os.replace(tmp_path, parsed_path)
+    return feed.title, feed.signature
+
+# Open the parsed episodes of the body described by `meta`, or return None if
+# they are missing or belong to a different body
+def _open_parsed(parsed_path, meta):
+    try:
+        parsed_file = open(parsed_path)
+    except OSError:
+        return None
+    try:
+        header = json.loads(parsed_file.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('checksum') != meta.get('checksum') or 'title' not in meta:
+        parsed_file.close()
+        return None
+    return CachedFeed(meta['title'], meta.get('signature'), parsed_file)
+
+# Remove least recently used feeds until the cache fits in MAX_CACHE_BYTES
+def _evict():
+    entries = {}
+    for name in os.listdir(CACHE_DIR):
+        stem, _ = os.path.splitext(name)
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        size, used, names = entries.get(stem, (0, 0, []))
+        entries[stem] = (size + stat.st_size, max(used, stat.st_mtime), names + [name])
+
+    total = sum(size for size, _, _ in entries.values())
+    for size, _, names in sorted(entries.values(), key=lambda entry: entry[1]):
+        if total <= MAX_CACHE_BYTES:
+            break
+        for name in names:
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+        total -= size
+
+# Fetch a feed through the cache and return a CachedFeed reading its parsed
+# episodes. The body is only parsed when it has changed since it was last
+# parsed.
+def get_feed(url, run_metrics=metrics.NULL):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    body_path, meta_path, parsed_path = _paths(url)
+    meta = _read_meta(meta_path)
+
+    headers = {}
+    if meta and os.path.exists(body_path):
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = http_client.get(url, headers=headers, stream=True, run_metrics=run_metrics)
+    try:
+        if response.status_code == 304 and headers:
+            os.utime(meta_path)
+        else:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            checksum = hashlib.sha256()
+            tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as body_file:
+                for chunk in iter(lambda: response.raw.read(CHUNK_SIZE), b''):
+                    checksum.update(chunk)
+                    body_file.write(chunk)
+            os.replace(tmp_path, body_path)
+            # An unchanged body keeps its parsed episodes (and their title and signature)
+            if not meta or meta.get('checksum') != checksum.hexdigest():
+                meta = {}
+            meta.update({
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checksum': checksum.hexdigest(),
+            })
+            _write_atomic(meta_path, json.dumps(meta))
+            _evict()
+    finally:
+        response.close()
+
+    feed = _open_parsed(parsed_path, meta)
+    if feed is None:
+        run_metrics.increment('feed_parses')
+        meta['title'], meta['signature'] = _parse_body(body_path, parsed_path, meta['checksum'])
+        _write_atomic(meta_path, json.dumps(meta))
+        feed = _open_parsed(parsed_path, meta)
+    return feed
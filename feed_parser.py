@@ -0,0 +1,82 @@
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+# Incremental RSS parser shared by the pages that read Acast feeds. The feed is
+# read straight from the HTTP response stream with iterparse, each <item> is
+# turned into a small FeedEpisode record and then freed, so memory stays flat
+# regardless of how many episodes the feed has.
+
+ACAST_NS = 'https://schema.acast.com/1.0/'
+EPISODE_ID_TAG = f'{{{ACAST_NS}}}episodeId'
+SETTINGS_TAG = f'{{{ACAST_NS}}}settings'
+SIGNATURE_TAG = f'{{{ACAST_NS}}}signature'
+
+FeedEpisode = namedtuple('FeedEpisode', ['episodeId', 'settings', 'title', 'pubDate', 'guid'])
+
+class Feed:
+    # `response` is closed once the episodes have been read (an HTTP response
+    # or the open file `source` reads from)
+    def __init__(self, source, response=None):
+        self.title = None
+        self.signature = None
+        self._response = response
+        self._events = ET.iterparse(source, events=('start', 'end'))
+        self._path = []
+        self._channel = None
+        self._read_header()
+
+    # Consume the channel header up to the first <item> so the show title and
+    # signature are available before any episode is read.
+    def _read_header(self):
+        for event, elem in self._events:
+            if event == 'start':
+                if elem.tag == 'item':
+                    self._path.append(elem.tag)
+                    return
+                self._handle_start(elem)
+            else:
+                self._handle_end(elem)
+
+    def _handle_start(self, elem):
+        if elem.tag == 'channel':
+            self._channel = elem
+        self._path.append(elem.tag)
+
+    # Channel-level fields may appear after the items in some feeds
+    def _handle_end(self, elem):
+        self._path.pop()
+        parent = self._path[-1] if self._path else None
+        if parent != 'channel':
+            return
+        if elem.tag == 'title' and self.title is None:
+            self.title = elem.text
+        elif elem.tag == SIGNATURE_TAG and self.signature is None:
+            self.signature = elem.text
+
+    def episodes(self):
+        try:
+            for event, elem in self._events:
+                if event == 'start':
+                    self._handle_start(elem)
+                elif elem.tag == 'item':
+                    self._path.pop()
+                    yield FeedEpisode(
+                        episodeId=elem.findtext(EPISODE_ID_TAG),
+                        settings=elem.findtext(SETTINGS_TAG),
+                        title=elem.findtext('title'),
+                        pubDate=elem.findtext('pubDate'),
+                        guid=elem.findtext('guid'),
+                    )
+                    # Drop the processed item so the tree never grows
+                    elem.clear()
+                    if self._channel is not None:
+                        self._channel.remove(elem)
+                else:
+                    self._handle_end(elem)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
@@ -0,0 +1,144 @@
+import functools
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import metrics
+
+# Shared HTTP client used by every page. All outbound calls go through one
+# requests.Session so connections (and their TLS handshakes) are kept alive and
+# reused per host, with a single timeout and retry policy.
+
+# Retry policy for every request: exponential backoff on connection errors and
+# on throttling / gateway errors. Status retries only apply to idempotent
+# methods (GET, PUT, ...); callers that write with PATCH/POST handle statuses
+# themselves.
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 1
+RETRY_STATUSES = [429, 502, 503, 504]
+
+# (connect, read) timeout in seconds applied when a caller doesn't pass one
+DEFAULT_TIMEOUT = (10, 60)
+
+# Connections kept open per host, and how many distinct hosts keep a pool
+POOL_SIZE = 16
+POOL_HOSTS = 10
+
+_session = None
+_single_attempt_session = None
+_pool_size = None
+_lock = threading.Lock()
+_concurrency_limit = None
+
+def build_retry():
+    return Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    )
+
+# Delay before retry number `attempt` (0-based), matching urllib3's backoff
+def backoff_delay(attempt):
+    return BACKOFF_FACTOR * (2 ** attempt)
+
+def _mount_adapters(session, pool_size, max_retries):
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+# Size the per-host connection pools to the number of concurrent workers so
+# no worker has to open (and then discard) an extra connection. Requests with
+# a deadline go through a second session that never retries on its own.
+def configure(pool_size=POOL_SIZE):
+    global _session, _single_attempt_session, _pool_size
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _single_attempt_session = requests.Session()
+        if pool_size != _pool_size:
+            _mount_adapters(_session, pool_size, build_retry())
+            _mount_adapters(_single_attempt_session, pool_size, 0)
+            _pool_size = pool_size
+        return _session
+
+def get_session():
+    if _session is None:
+        return configure()
+    return _session
+
+# Cap the number of requests in flight, e.g. with a semaphore shared by every
+# process of a batch run so they stay within one global budget
+def set_concurrency_limit(semaphore):
+    global _concurrency_limit
+    _concurrency_limit = semaphore
+
+# Send one request and record its latency, retries and failures per host in
+# the calling run's metrics
+def _send(method, url, timeout, run_metrics, session=None, **kwargs):
+    host = urlsplit(url).hostname or ''
+    started = time.monotonic()
+    try:
+        response = (session or get_session()).request(method, url, timeout=timeout, **kwargs)
+    except requests.exceptions.RequestException as e:
+        run_metrics.increment('http_errors', host=host, error=type(e).__name__)
+        raise
+    finally:
+        run_metrics.observe_latency(host, time.monotonic() - started)
+
+    retries = getattr(response.raw, 'retries', None)
+    if retries is not None and retries.history:
+        run_metrics.increment('http_retries', len(retries.history), host=host)
+    if response.status_code >= 400:
+        run_metrics.increment('http_errors', host=host, error=str(response.status_code))
+    return response
+
+def _retry_in_time(attempt, deadline):
+    return attempt < MAX_RETRIES and time.monotonic() + backoff_delay(attempt) < deadline
+
+# Send a request that has to finish by `deadline` (a time.monotonic() value),
+# retries included. Each attempt's timeouts are cut to the time left, and
+# retries follow the shared policy by hand so that none starts (or backs off)
+# past the deadline. Raises requests.exceptions.Timeout once it has passed.
+def _send_by(deadline, method, url, timeout, run_metrics, **kwargs):
+    get_session()  # Creates the single-attempt session too
+    host = urlsplit(url).hostname or ''
+    connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    retry = build_retry()
+    idempotent = method.upper() in retry.allowed_methods
+    for attempt in range(MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout(f"{method} {url} did not finish within its deadline")
+        try:
+            response = _send(method, url, (min(connect_timeout, remaining), min(read_timeout, remaining)),
+                             run_metrics, session=_single_attempt_session, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if not idempotent or not _retry_in_time(attempt, deadline):
+                raise
+        else:
+            if not retry.is_retry(method, response.status_code) or not _retry_in_time(attempt, deadline):
+                return response
+            response.close()
+        run_metrics.increment('http_retries', host=host)
+        time.sleep(backoff_delay(attempt))
+
+# `deadline` (optional, a time.monotonic() value) bounds the whole request,
+# retries included, rather than each read
+def request(method, url, timeout=DEFAULT_TIMEOUT, run_metrics=metrics.NULL, deadline=None, **kwargs):
+    send = _send if deadline is None else functools.partial(_send_by, deadline)
+    if _concurrency_limit is None:
+        return send(method, url, timeout, run_metrics, **kwargs)
+    with _concurrency_limit:
+        return send(method, url, timeout, run_metrics, **kwargs)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def patch(url, **kwargs):
+    return request('PATCH', url, **kwargs)
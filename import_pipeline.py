@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+import catalogue
+import endpoints
+import metrics
+import patch_writer
+from csv_export import CsvExport
+
+# Bulk timestamp importer, independent of Streamlit. Reads a Timestamp
+# Exporter CSV or a Mid2 plan/backup CSV (optionally gzipped) in chunks of
+# CHUNK_ROWS rows, validates each chunk in vectorized passes and streams the
+# valid rows into the concurrent, rate-limited PATCH writer. Only one chunk is
+# held in memory at a time; rows are pulled as write slots free up.
+#
+# A PATCH replaces all of an episode's markers, so a file without a Midroll2
+# column (the exporter's) would wipe a second midroll. For those files the
+# show's catalogue is read first and rows for episodes that have one are
+# refused.
+
+CHUNK_ROWS = 5000
+GUID_PATTERN = r'[0-9a-f]{24}'
+POSTROLL_AT_END = 9999  # CMS shorthand for a postroll at the very end
+DURATION_TOLERANCE = 1.0  # seconds a marker may sit past the episode's end
+
+MARKER_COLUMNS = ['preroll', 'midroll', 'midroll2', 'postroll']
+# Accepted header names for each field, from export_timestamps, mid2 plans and
+# mid2 backups. A backup's Original columns come first, so importing one
+# restores the markers its episodes had before the run.
+COLUMN_ALIASES = {
+    'guid': ['GUID', 'Episode GUID'],
+    'preroll': ['Original Preroll', 'Preroll'],
+    'midroll': ['Original Midroll', 'Midroll'],
+    'midroll2': ['Original Midroll2', 'Midroll2'],
+    'postroll': ['Original Postroll', 'Postroll'],
+    'duration': ['Episode Duration', 'Duration'],
+}
+ERROR_HEADER = ['Row', 'GUID', 'Error']
+
+def _column_map(columns):
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in columns:
+                mapping[alias] = field
+                break
+    fields = set(mapping.values())
+    if 'guid' not in fields or not fields & set(MARKER_COLUMNS):
+        raise ValueError(f"Unrecognised CSV: expected a GUID column and at least one marker column, got {list(columns)}")
+    return mapping
+
+# Normalise a raw chunk to guid + numeric marker (and duration) columns, with
+# the file row number as the index
+def _normalise(chunk, mapping, first_row):
+    frame = chunk[list(mapping)].rename(columns=mapping)
+    frame.index = pd.RangeIndex(first_row, first_row + len(frame))
+    frame['guid'] = frame['guid'].fillna('').astype(str).str.strip().str.lower()
+    for column in MARKER_COLUMNS + ['duration']:
+        if column not in frame:
+            frame[column] = np.nan
+        raw = frame[column]
+        frame[column] = pd.to_numeric(raw, errors='coerce')
+        # Remember cells that held something other than a number
+        frame[column + '_invalid'] = raw.notna() & (raw.astype(str).str.strip() != '') & frame[column].isna()
+    return frame
+
+# Midrolls each catalogue episode of a show has now, by GUID
+def current_midroll_counts(show_id, headers, run_metrics=metrics.NULL):
+    return {
+        episode['_id']: sum(1 for marker in episode.get('markers', []) if marker.get('placement') == 'midroll' and 'start' in marker)
+        for episode in catalogue.iter_catalogue(show_id, headers, run_metrics=run_metrics)
+    }
+
+# One reason per invalid row (the first check it fails), as a Series indexed
+# by row number. All checks are vectorized over the chunk. With `midrolls`
+# (from current_midroll_counts), rows for episodes that have more than one
+# midroll are refused, for files that can't carry a second one.
+def validate(frame, midrolls=None):
+    markers = frame[MARKER_COLUMNS]
+    # A postroll of 9999 means "at the end", so it is exempt from the checks below
+    comparable = markers.mask((markers['postroll'] == POSTROLL_AT_END).to_frame('postroll').reindex(columns=MARKER_COLUMNS, fill_value=False))
+    # Carry the running maximum across gaps so a marker is checked against every earlier one
+    previous_max = comparable.cummax(axis=1).ffill(axis=1).shift(1, axis=1)
+    duration = frame['duration']
+
+    checks = [
+        ('Invalid GUID (expected 24 lowercase hex characters)', ~frame['guid'].str.fullmatch(GUID_PATTERN)),
+        ('Non-numeric marker', frame[[column + '_invalid' for column in MARKER_COLUMNS]].any(axis=1)),
+        ('No markers', markers.isna().all(axis=1)),
+        ('Negative marker', (markers < 0).any(axis=1)),
+        ('Markers out of order (preroll, midroll, midroll2, postroll)', (comparable < previous_max).any(axis=1)),
+        ('Marker past the end of the episode', duration.notna() & comparable.gt(duration + DURATION_TOLERANCE, axis=0).any(axis=1)),
+    ]
+    if midrolls is not None:
+        checks.append(('Episode has a second midroll and the file has no Midroll2 column', frame['guid'].map(midrolls).gt(1)))
+    reasons = pd.Series(None, index=frame.index, dtype='object')
+    for reason, failed in checks:
+        reasons = reasons.mask(reasons.isna() & failed.fillna(False).astype(bool), reason)
+    return reasons.dropna()
+
+def _format_marker(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+# The markers string for a PATCH, positional like the Mid2 writer's: preroll,
+# midroll, [midroll2,] postroll, with an empty slot for a missing marker so
+# the others keep their placement
+def markers_payload(row):
+    preroll, midroll, midroll2, postroll = ('' if value != value else _format_marker(value) for value in row)
+    slots = [preroll, midroll, midroll2, postroll] if midroll2 else [preroll, midroll, postroll]
+    return ','.join(slots)
+
+def read_chunks(source, compression='infer', chunk_rows=CHUNK_ROWS):
+    return pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[''], compression=compression)
+
+# Import `source` (a path or file object) into `show_id`, reporting
+# through `notify(level, message)` and `progress(completed, total)`,
+# where total is the number of valid rows read so far. With dry_run the file
+# is only validated. Returns a summary with counts and the error report CSV.
+def import_timestamps(source, show_id, key, compression='infer', dry_run=False, chunk_rows=CHUNK_ROWS,
+                      max_workers=patch_writer.MAX_WORKERS, notify=None, progress=None):
+    notify = notify or (lambda level, message: print(f"[{level}] {message}") if message else None)
+    headers = {'x-api-key': key, 'Content-Type': 'application/json'}
+    run_metrics = metrics.Metrics()
+    errors = CsvExport(ERROR_HEADER)
+    counts = {'rows': 0, 'valid': 0, 'invalid': 0, 'duplicates': 0, 'updated': 0, 'failed': 0, 'chunks': 0}
+    seen = set()
+    chunk_ends = []  # Cumulative valid-row count at the end of each chunk read so far
+
+    def valid_rows():
+        mapping = None
+        midrolls = None
+        for chunk in read_chunks(source, compression=compression, chunk_rows=chunk_rows):
+            if mapping is None:
+                mapping = _column_map(chunk.columns)
+                if 'midroll2' not in mapping.values():
+                    notify('status', "The file has no Midroll2 column; checking which episodes already have one...")
+                    with run_metrics.stage('catalogue_fetch'):
+                        midrolls = current_midroll_counts(show_id, headers, run_metrics)
+            with run_metrics.stage('import_validate'):
+                frame = _normalise(chunk, mapping, first_row=counts['rows'] + 2)  # +2: 1-based, after the header
+                counts['rows'] += len(frame)
+                counts['chunks'] += 1
+
+                reasons = validate(frame, midrolls)
+                duplicates = frame['guid'].duplicated() | frame['guid'].isin(seen)
+                duplicates &= ~frame.index.isin(reasons.index)
+                for row_number, reason in reasons.items():
+                    errors.write_row([row_number, frame.at[row_number, 'guid'], reason])
+                for row_number in frame.index[duplicates]:
+                    errors.write_row([row_number, frame.at[row_number, 'guid'], 'Duplicate GUID (first occurrence kept)'])
+
+                valid = frame[~frame.index.isin(reasons.index) & ~duplicates]
+                seen.update(valid['guid'])
+                counts['invalid'] += len(reasons)
+                counts['duplicates'] += int(duplicates.sum())
+                counts['valid'] += len(valid)
+                chunk_ends.append(counts['valid'])
+
+            notify('status', f"Chunk {counts['chunks']}: read {counts['rows']} rows, {counts['valid']} valid, {counts['invalid'] + counts['duplicates']} rejected")
+            yield from zip(valid.index, valid['guid'], valid[MARKER_COLUMNS].itertuples(index=False, name=None))
+
+    if dry_run:
+        for _ in valid_rows():
+            pass
+    else:
+        limiter = patch_writer.new_limiter()
+
+        def write(item):
+            _, guid, markers = item
+            url = f"{endpoints.OPEN_API_URL}/rest/shows/{show_id}/episodes/{guid}"
+            return patch_writer.send_patch(url, {'markers': markers_payload(markers)}, headers, limiter, run_metrics=run_metrics)
+
+        completed = 0
+        reported_chunks = 0
+        for (row_number, guid, _), response in patch_writer.write_concurrently(valid_rows(), write, max_workers=max_workers, run_metrics=run_metrics):
+            completed += 1
+            if response is not None and response.status_code == 200:
+                counts['updated'] += 1
+            else:
+                counts['failed'] += 1
+                status = response.status_code if response is not None else 'request failed'
+                errors.write_row([row_number, guid, f"PATCH failed: {status}"])
+                run_metrics.increment('errors', kind='import')
+            if progress is not None:
+                progress(completed, counts['valid'])
+            # Report each chunk once all of its rows have been written
+            while reported_chunks < len(chunk_ends) and completed >= chunk_ends[reported_chunks]:
+                reported_chunks += 1
+                notify('status', f"Chunk {reported_chunks} written: {counts['updated']} updated, {counts['failed']} failed so far")
+
+    notify('status', '')
+    if dry_run:
+        notify('info', f"Validated {counts['rows']} rows: {counts['valid']} valid, {counts['invalid']} invalid, {counts['duplicates']} duplicates.")
+    elif counts['failed'] or counts['invalid'] or counts['duplicates']:
+        notify('warning', f"Updated {counts['updated']} episodes. {counts['failed']} updates failed and {counts['invalid'] + counts['duplicates']} rows were rejected; see the error report.")
+    else:
+        notify('success', f"Updated {counts['updated']} episodes. All done! 🎉")
+
+    name = f"import-{show_id}"
+    run_metrics.write_report(name)
+    counts['metrics'] = os.path.join(metrics.METRICS_DIR, name + '.json')
+    counts['error_content'] = errors.getvalue()
+    counts['error_rows'] = errors.row_count
+    return counts
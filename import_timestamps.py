@@ -1,10 +1,73 @@
+import requests
 import streamlit as st
+import import_pipeline
+from patch_writer import MAX_WORKERS
+
+hide_menu_style = """
+        <style>
+        #MainMenu {visibility: hidden;}
+        </style>
+        """
+st.markdown(hide_menu_style, unsafe_allow_html=True)
+
+st.header('⏳ Timestamp Importer')
+st.markdown("Update ad markers in bulk from a Timestamp Exporter CSV or a Mid2 Autoplacer plan or backup (`.csv` or `.csv.gz`). Importing a backup chunk puts back the markers its episodes had before the Mid2 run. Rows are checked before anything is sent: GUIDs must be 24-character episode IDs, markers must be in order and inside the episode. Exporter files have no Midroll2 column, so rows for episodes that already have a second midroll are refused instead of wiping it.")
+
+def main(showId, key, uploaded_file, dry_run=False, max_workers=MAX_WORKERS):
+    status_placeholder = st.empty()
+    progress_bar = None
+
+    def notify(level, message):
+        if level == 'status':
+            if message:
+                status_placeholder.write(message)
+            else:
+                status_placeholder.empty()
+        else:
+            getattr(st, level)(message)
+
+    def progress(completed, total):
+        nonlocal progress_bar
+        if progress_bar is None:
+            progress_bar = st.progress(0)
+        progress_bar.progress(completed / total if total else 1.0, text=f"Updated {completed} of {total} rows read so far")
+
+    compression = 'gzip' if uploaded_file.name.endswith('.gz') else None
+    return import_pipeline.import_timestamps(uploaded_file, showId, key, compression=compression, dry_run=dry_run,
+                                             max_workers=max_workers, notify=notify, progress=progress)
 
 # Check if the user is authenticated
 if st.session_state.get("authentication_status"):
-    st.title('Import Timestamps')
-    st.write('Coming soon!')
-    # Add your timestamp exporter functionality here
+    with st.form(key='my_form'):
+        st.markdown("Use API key associated with your Acast account and verify you have assigned yourself the admin role on the show via User Management.")
+        showId = st.text_input("Acast Show ID:")
+        key = st.text_input("API Key:", type="password")
+        uploaded_file = st.file_uploader("Timestamps CSV:", type=['csv', 'gz'])
+        max_workers = st.number_input("Parallel updates:", min_value=1, max_value=64, value=MAX_WORKERS)
+        dry_run = st.checkbox("Validate only (don't update episodes)")
+
+        # Status placeholder
+        processing_time_message = st.empty()
+        processing_time_message.caption("Processing time may vary depending on the number of rows.")
+
+        submit_button = st.form_submit_button(label='Import')
+
+    if submit_button:
+        processing_time_message.empty()
+        if not uploaded_file:
+            st.error("Please upload a CSV file to import.")
+        else:
+            try:
+                summary = main(showId, key, uploaded_file, dry_run=dry_run, max_workers=int(max_workers))
+                st.write(f"{summary['rows']} rows read: {summary['valid']} valid, {summary['invalid']} invalid, {summary['duplicates']} duplicates" +
+                         ("" if dry_run else f", {summary['updated']} updated, {summary['failed']} failed"))
+                if summary['error_rows']:
+                    st.download_button(label="Download error report", data=summary['error_content'],
+                                       file_name=f"{showId}_import_errors.csv", mime='text/csv')
+            except ValueError as e:
+                st.error(f"Error reading the CSV: {e}")
+            except requests.exceptions.RequestException as err:
+                st.error("Error! Please ensure valid Show ID and API key. Also, double-check your Acast account has admin role on the show in User Management. {0}".format(err))
 else:
     st.warning("You must log in to access this page.")
     st.markdown("[Go to Login](../hub.py)")
@@ -0,0 +1,85 @@
+from collections import namedtuple
+
+# Compares a planned marker row with the markers an episode already has in the
+# CMS, so only episodes whose markers actually change are PATCHed. Markers are
+# compared by placement (preroll, midroll, midroll2, postroll); positions
+# within MARKER_TOLERANCE seconds of each other count as unchanged.
+
+MARKER_TOLERANCE = 1.0  # seconds
+POSTROLL_AT_END = 9999  # CMS shorthand for a postroll at the very end
+
+PLACEMENTS = ['preroll', 'midroll', 'midroll2', 'postroll']
+REPORT_HEADER = ['Episode GUID', 'Current Markers', 'Proposed Markers', 'Changes', 'Action']
+
+MarkerChange = namedtuple('MarkerChange', ['placement', 'current', 'proposed'])
+
+def _missing(value):
+    return value is None or value == '' or value != value  # NaN != NaN
+
+# Existing CMS markers by placement; a second midroll is 'midroll2'
+def current_markers(markers, duration=None):
+    current = {}
+    midrolls = 0
+    for marker in markers:
+        if 'start' not in marker:
+            continue
+        placement = marker['placement']
+        if placement == 'midroll':
+            midrolls += 1
+            if midrolls > 1:
+                placement = f"midroll{midrolls}"
+        start = float(marker['start'])
+        if placement == 'postroll' and start == POSTROLL_AT_END and duration:
+            start = float(duration)
+        current.setdefault(placement, start)
+    return current
+
+# Proposed markers from a plan row (mid2_pipeline.PLAN_HEADER order). A
+# postroll planned as POSTROLL_AT_END is read as the episode's duration, as
+# it is for the current markers.
+def proposed_markers(row):
+    proposed = {
+        placement: float(value)
+        for placement, value in zip(PLACEMENTS, row[1:5])
+        if not _missing(value)
+    }
+    if proposed.get('postroll') == POSTROLL_AT_END and not _missing(row[5]):
+        proposed['postroll'] = float(row[5])
+    return proposed
+
+# Placements that differ by more than `tolerance`, were added or were removed.
+# An empty list means the PATCH would be a no-op. Only PLACEMENTS are
+# compared: a plan row can't hold anything else (a third midroll, say), so
+# such markers are never reported as removed.
+def diff_markers(markers, row, tolerance=MARKER_TOLERANCE):
+    current = current_markers(markers, duration=row[5])
+    proposed = proposed_markers(row)
+    changes = []
+    for placement in PLACEMENTS:
+        old = current.get(placement)
+        new = proposed.get(placement)
+        if old is None and new is None:
+            continue
+        if old is None or new is None or abs(old - new) > tolerance:
+            changes.append(MarkerChange(placement, old, new))
+    return changes
+
+def _format_markers(markers):
+    return ', '.join(f"{placement} {position:g}" for placement, position in markers.items())
+
+def format_changes(changes):
+    return '; '.join(
+        f"{change.placement}: {'-' if change.current is None else format(change.current, 'g')}"
+        f" -> {'-' if change.proposed is None else format(change.proposed, 'g')}"
+        for change in changes
+    )
+
+# One dry-run report row (REPORT_HEADER order)
+def report_row(markers, row, changes):
+    return [
+        row[0],
+        _format_markers(current_markers(markers, duration=row[5])),
+        _format_markers(proposed_markers(row)),
+        format_changes(changes),
+        'update' if changes else 'skip',
+    ]
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+
+# Persistent cache of sphinx encoder results. Silence detection for a media URL
+# never changes, so each analysed file is stored in SQLite as its duration plus
+# the silences packed into a float array, and reused across runs. Entries
+# expire after MEDIA_TTL, and the least recently used ones are evicted once the
+# packed silences pass MAX_CACHE_BYTES. Concurrent requests for the same URL
+# share a single remote call.
+
+CACHE_PATH = os.path.join('.cache', 'media_info.sqlite3')
+MEDIA_TTL = 30 * 24 * 60 * 60  # seconds
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+_connection = None
+_db_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _connect():
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _connection = sqlite3.connect(CACHE_PATH, check_same_thread=False, timeout=30)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute(
+            'CREATE TABLE IF NOT EXISTS media_info ('
+            'url TEXT PRIMARY KEY, duration REAL, silences BLOB, '
+            'fetched_at REAL, accessed_at REAL, size INTEGER)'
+        )
+        # Caches created before entries were sized
+        columns = {row[1] for row in _connection.execute('PRAGMA table_info(media_info)')}
+        if 'size' not in columns:
+            _connection.execute('ALTER TABLE media_info ADD COLUMN size INTEGER')
+            _connection.execute('UPDATE media_info SET size = LENGTH(silences)')
+        _connection.execute('CREATE INDEX IF NOT EXISTS media_info_accessed ON media_info (accessed_at)')
+        _connection.commit()
+    return _connection
+
+# Silences are stored as a flat array of (end, duration) pairs
+def _pack_silences(silences):
+    packed = array('d')
+    for silence in silences:
+        packed.append(silence['end'])
+        packed.append(silence['duration'])
+    return packed.tobytes()
+
+def _unpack_silences(blob):
+    packed = array('d')
+    packed.frombytes(blob)
+    return [{'end': packed[i], 'duration': packed[i + 1]} for i in range(0, len(packed), 2)]
+
+def lookup(media_url):
+    now = time.time()
+    with _db_lock:
+        connection = _connect()
+        row = connection.execute(
+            'SELECT duration, silences, fetched_at FROM media_info WHERE url = ?', (media_url,)
+        ).fetchone()
+        if row is None:
+            return None
+        duration, silences, fetched_at = row
+        if now - fetched_at > MEDIA_TTL:
+            connection.execute('DELETE FROM media_info WHERE url = ?', (media_url,))
+            connection.commit()
+            return None
+        connection.execute('UPDATE media_info SET accessed_at = ? WHERE url = ?', (now, media_url))
+        connection.commit()
+    return {'duration': duration, 'silenceDetected': _unpack_silences(silences)}
+
+# Drop expired entries, then the least recently used ones until the packed
+# silences fit in MAX_CACHE_BYTES
+def _evict(connection, now):
+    connection.execute('DELETE FROM media_info WHERE fetched_at < ?', (now - MEDIA_TTL,))
+    total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM media_info').fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url, size in connection.execute('SELECT url, size FROM media_info ORDER BY accessed_at').fetchall():
+        connection.execute('DELETE FROM media_info WHERE url = ?', (url,))
+        total -= size or 0
+        if total <= MAX_CACHE_BYTES:
+            break
+
+def store(media_url, media_info):
+    now = time.time()
+    silences = _pack_silences(media_info.get('silenceDetected', []))
+    with _db_lock:
+        connection = _connect()
+        connection.execute(
+            'INSERT OR REPLACE INTO media_info (url, duration, silences, fetched_at, accessed_at, size) VALUES (?, ?, ?, ?, ?, ?)',
+            (media_url, media_info.get('duration', 0), silences, now, now, len(silences))
+        )
+        _evict(connection, now)
+        connection.commit()
+
+# Return cached media info for `media_url`, calling `fetch(media_url)` on a
+# miss. Callers asking for a URL that is already being fetched wait for that
+# call instead of starting their own. Empty (failed) results are not cached.
+def get_media_info(media_url, fetch):
+    cached = lookup(media_url)
+    if cached is not None:
+        return cached
+
+    # Check the cache again and claim the URL under one lock, so a fetch that
+    # finished since the lookup above is reused rather than repeated
+    with _inflight_lock:
+        future = _inflight.get(media_url)
+        if future is None:
+            cached = lookup(media_url)
+            if cached is not None:
+                return cached
+            future = Future()
+            _inflight[media_url] = future
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        return future.result()
+
+    try:
+        media_info = fetch(media_url)
+        if media_info:
+            store(media_url, media_info)
+        future.set_result(media_info)
+        return media_info
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(media_url, None)
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Run metrics for the pipelines: wall time per stage, request latency
+# histograms per remote host, retry/error counters and worker pool queue
+# depth. Each run creates its own Metrics registry and passes it down to
+# everything it calls, so concurrent runs (e.g. two Streamlit sessions) never
+# mix their numbers. `write_report()` exports a run as JSON and in the
+# Prometheus text format.
+
+METRICS_DIR = os.path.join('.cache', 'metrics')
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages = defaultdict(lambda: {'seconds': 0.0, 'calls': 0})
+        self.latency = defaultdict(lambda: {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0})
+        self.counters = defaultdict(int)
+        self.gauges = defaultdict(lambda: {'current': 0, 'max': 0})
+
+    # Time a block of work under `name`. Stages run per episode (from many
+    # worker threads) add up their time across threads, so compare them by
+    # `calls` and the average rather than against the run's wall time.
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.monotonic() - started)
+
+    def add_stage_time(self, name, seconds, calls=1):
+        with self._lock:
+            entry = self.stages[name]
+            entry['seconds'] += seconds
+            entry['calls'] += calls
+
+    def observe_latency(self, host, seconds):
+        with self._lock:
+            histogram = self.latency[host]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    # Counters are keyed by name and labels, e.g. increment('http_retries', host=host)
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            gauge = self.gauges[name]
+            gauge['current'] = value
+            gauge['max'] = max(gauge['max'], value)
+
+    def report(self):
+        with self._lock:
+            counters = defaultdict(list)
+            for (name, labels), value in self.counters.items():
+                counters[name].append(dict(labels, value=value))
+            return {
+                'started': self.started,
+                'seconds': round(time.time() - self.started, 3),
+                'stages': {name: {'seconds': round(entry['seconds'], 3), 'calls': entry['calls']}
+                           for name, entry in self.stages.items()},
+                'latency': {host: {'buckets': dict(zip(map(str, LATENCY_BUCKETS), histogram['buckets'])),
+                                   'sum': round(histogram['sum'], 3), 'count': histogram['count']}
+                            for host, histogram in self.latency.items()},
+                'counters': dict(counters),
+                'queue_depth': {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+    # Write the run as <name>.json and <name>.prom (overwriting the previous
+    # run of the same name, as a Prometheus textfile collector expects).
+    # Returns the JSON report.
+    def write_report(self, name, directory=METRICS_DIR):
+        run_report = self.report()
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        with open(base + '.json', 'w') as report_file:
+            json.dump(run_report, report_file, indent=2)
+        with open(base + '.prom', 'w') as prom_file:
+            prom_file.write(to_prometheus(run_report))
+        return run_report
+
+# Accepts everything and records nothing, for calls made outside a run
+class NullMetrics(Metrics):
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add_stage_time(self, name, seconds, calls=1):
+        pass
+
+    def observe_latency(self, host, seconds):
+        pass
+
+    def increment(self, name, amount=1, **labels):
+        pass
+
+    def set_gauge(self, name, value):
+        pass
+
+NULL = NullMetrics()
+
+# Iterate `items`, adding up the time spent waiting for each one. A generator
+# stage consumed inside another stage is timed this way so the consumer can
+# subtract it instead of counting the same wall time twice.
+class TimedIterator:
+    def __init__(self, items):
+        self._items = iter(items)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.monotonic()
+        try:
+            return next(self._items)
+        finally:
+            self.seconds += time.monotonic() - started
+
+def _label(key, value):
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'{key}="{value}"'
+
+def to_prometheus(run_report, prefix='scripthub'):
+    lines = [
+        f"# TYPE {prefix}_run_seconds gauge",
+        f"{prefix}_run_seconds {run_report['seconds']}",
+        f"# TYPE {prefix}_stage_seconds_total counter",
+    ]
+    for name, entry in run_report['stages'].items():
+        lines.append(f"{prefix}_stage_seconds_total{{{_label('stage', name)}}} {entry['seconds']}")
+    lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+    for name, entry in run_report['stages'].items():
+        lines.append(f"{prefix}_stage_calls_total{{{_label('stage', name)}}} {entry['calls']}")
+
+    lines.append(f"# TYPE {prefix}_http_request_duration_seconds histogram")
+    for host, histogram in run_report['latency'].items():
+        cumulative = 0
+        for bound, count in histogram['buckets'].items():
+            cumulative += count
+            lines.append(f"{prefix}_http_request_duration_seconds_bucket{{{_label('host', host)},{_label('le', bound)}}} {cumulative}")
+        lines.append(f"{prefix}_http_request_duration_seconds_bucket{{{_label('host', host)},le=\"+Inf\"}} {histogram['count']}")
+        lines.append(f"{prefix}_http_request_duration_seconds_sum{{{_label('host', host)}}} {histogram['sum']}")
+        lines.append(f"{prefix}_http_request_duration_seconds_count{{{_label('host', host)}}} {histogram['count']}")
+
+    for name, series in run_report['counters'].items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for entry in series:
+            labels = ','.join(_label(key, value) for key, value in entry.items() if key != 'value')
+            lines.append(f"{prefix}_{name}_total{{{labels}}} {entry['value']}")
+
+    lines.append(f"# TYPE {prefix}_queue_depth gauge")
+    for name, gauge in run_report['queue_depth'].items():
+        lines.append(f"{prefix}_queue_depth{{{_label('pool', name)}}} {gauge['current']}")
+    lines.append(f"# TYPE {prefix}_queue_depth_max gauge")
+    for name, gauge in run_report['queue_depth'].items():
+        lines.append(f"{prefix}_queue_depth_max{{{_label('pool', name)}}} {gauge['max']}")
+    return '\n'.join(lines) + '\n'
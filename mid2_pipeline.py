@@ -0,0 +1,731 @@
+import requests
+from base64 import b64decode
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import OrderedDict, deque
+import pandas as pd
+from io import StringIO
+import http_client
+import endpoints
+import feed_cache
+import media_cache
+import catalogue
+from run_journal import RunJournal
+from watermark import Watermark, parse_publish_date
+import backup_store
+from episode_join import join_episodes
+from csv_export import CsvExport
+from silence_index import SilenceIndex
+import patch_writer
+import marker_diff
+import metrics
+
+# Mid2 autoplacer pipeline, independent of Streamlit. Callers receive
+# user-facing messages through `notify(level, message)`, where level is one of
+# 'status' (transient), 'info', 'success', 'warning' or 'error', and PATCH
+# progress through `progress(completed, total)`.
+
+def print_notify(level, message):
+    if message:
+        print(f"[{level}] {message}")
+
+PLAN_HEADER = ["Episode GUID", "Preroll", "Midroll", "Midroll2", "Postroll", "Episode Duration", "Postroll At End", "Publish Date"]
+# A backup row is the plan row followed by the markers the episode had before
+# the run. import_pipeline reads the Original columns first, so importing a
+# backup chunk puts those markers back.
+BACKUP_HEADER = PLAN_HEADER + ["Original Preroll", "Original Midroll", "Original Midroll2", "Original Postroll"]
+
+# Hardcoded password
+password = 'EXAMPLE_HARDCODED'
+
+# Fetch and parse RSS feed
+def fetch_and_parse_rss(url, run_metrics=metrics.NULL):
+    feed = feed_cache.get_feed(url, run_metrics=run_metrics)
+    episodes = [episode for episode in feed.episodes() if episode.episodeId is not None]
+    return feed.title, feed.signature, episodes
+
+def extract_valid_json_from_text(text):
+    try:
+        start = text.index('{')
+        end = text.rindex('}') + 1
+        valid_json = text[start:end]
+        return json.loads(valid_json)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"Failed to extract JSON: {e}")
+        return {}
+
+# Scrypt is deliberately expensive (~16 MB per derivation), and every episode
+# in a feed shares the same signature, so derived keys are cached per
+# (signature, password) and evicted least-recently-used.
+KEY_CACHE_SIZE = 32
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+
+def derive_key(signature, password):
+    cache_key = (signature, password)
+    # The lock is held while deriving so concurrent callers for the same feed
+    # wait for one derivation instead of each running their own.
+    with _key_cache_lock:
+        key = _key_cache.get(cache_key)
+        if key is not None:
+            _key_cache.move_to_end(cache_key)
+            return key
+        kdf = Scrypt(salt=b64decode(signature), length=32, n=2**14, r=8, p=1, backend=default_backend())
+        key = kdf.derive(password.encode())
+        _key_cache[cache_key] = key
+        if len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+        return key
+
+def _decrypt_with_cipher(cipher, text):
+    try:
+        decryptor = cipher.decryptor()
+        decrypted = decryptor.update(b64decode(text)) + decryptor.finalize()
+        decrypted_text = decrypted.decode('utf-8')
+        return extract_valid_json_from_text(decrypted_text)
+    except Exception as e:
+        print(f"Decryption failed: {e}")
+        return {}
+
+def _build_cipher(signature, password):
+    salt = b64decode(signature)
+    key = derive_key(signature, password)
+    return Cipher(algorithms.AES(key), modes.CBC(salt), backend=default_backend())
+
+def decrypt(signature, text, password):
+    try:
+        cipher = _build_cipher(signature, password)
+    except Exception as e:
+        print(f"Decryption failed: {e}")
+        return {}
+    return _decrypt_with_cipher(cipher, text)
+
+# Decrypt every <acast:settings> blob of a feed with a single key derivation
+# and cipher setup. Results are returned in the same order as `texts`.
+def decrypt_many(signature, texts, password):
+    texts = list(texts)
+    try:
+        cipher = _build_cipher(signature, password)
+    except Exception as e:
+        print(f"Decryption failed: {e}")
+        return [{} for _ in texts]
+    return [_decrypt_with_cipher(cipher, text) for text in texts]
+
+# Silence detection for a media URL never changes, so results are cached on disk
+# `deadline` (a time.monotonic() value) cuts the remote lookup off, retries
+# included, so a hung encoder can't hold a worker past its task's timeout
+def fetch_media_info(media_url, run_metrics=metrics.NULL, deadline=None):
+    with run_metrics.stage('fetch_media_info'):
+        return media_cache.get_media_info(media_url, lambda url: request_media_info(url, run_metrics, deadline))
+
+def request_media_info(media_url, run_metrics=metrics.NULL, deadline=None):
+    try:
+        response = http_client.get(f"{endpoints.SPHINX_URL}/file?url={requests.utils.quote(media_url)}",
+                                   timeout=(CONNECT_TIMEOUT, TASK_TIMEOUT), deadline=deadline, run_metrics=run_metrics)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            print(f"Failed to fetch data for URL {media_url}: {response.status_code}")
+            run_metrics.increment('errors', kind='media_info')
+            return {}
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to fetch data for URL {media_url}: {e}")
+        run_metrics.increment('errors', kind='media_info')
+        return {}
+
+def fetch_all_episode_details(showId, headers):
+    try:
+        return list(catalogue.iter_catalogue(showId, headers))
+    except requests.exceptions.HTTPError as e:
+        print(f"Failed to fetch all episodes details: {e}")
+        return []
+
+def find_longest_silence_within_range(silence_index, start_percentage, end_percentage, duration):
+    if not isinstance(silence_index, SilenceIndex):
+        silence_index = SilenceIndex(silence_index or [])
+    if not len(silence_index):
+        return None
+
+    start_time = duration * start_percentage / 100
+    end_time = duration * end_percentage / 100
+    return silence_index.longest(start_time, end_time)
+
+def check_marker_exists(markers, placement, index=0):
+    count = 0
+    for marker in markers:
+        if marker['placement'] == placement and 'start' in marker:
+            if count == index:
+                return marker['start']
+            count += 1
+    return None
+
+def sanitize_filename(title):
+    return re.sub(r'[^a-z0-9]', '', title.lower().replace(' ', '_'))
+
+# Raised when an episode can't be analysed (no settings or media info), so the
+# run can tell it apart from an episode that simply needs no Mid2
+class AnalysisError(Exception):
+    pass
+
+def process_episode(episode, decrypted_settings, run_metrics=metrics.NULL, deadline=None):
+    episode_guid = episode['_id']
+    episode_title = episode['title']
+
+    # Episodes that already have a Mid2 need no media analysis
+    existing = _existing_placement(episode)
+    if existing is not None:
+        return existing
+
+    if 'cms' in decrypted_settings and 'mediaUrl' in decrypted_settings['cms']:
+        media_url = decrypted_settings['cms']['mediaUrl']
+        media_info = fetch_media_info(media_url, run_metrics, deadline)
+        if not media_info:
+            raise AnalysisError("media info could not be fetched")
+
+        return _place_markers(episode, media_info, run_metrics)
+    else:
+        raise AnalysisError("missing 'cms' or 'mediaUrl' in its settings")
+
+# Placement timing is recorded separately from the media lookup it depends on
+def _place_markers(episode, media_info, run_metrics=metrics.NULL):
+    with run_metrics.stage('placement'):
+        episode_guid = episode['_id']
+        # Index the silences once; each placement window below is then a cheap range query
+        silence_index = SilenceIndex(media_info.get('silenceDetected', []))
+        episode_duration = media_info.get('duration', 0)
+
+        if episode_duration < 1200:  # Skipping episodes with duration less than 20 minutes
+            return None
+
+        markers = episode.get('markers', [])
+        # print(f"Processing episode {episode_guid}: Found markers {markers}")
+
+        preroll = check_marker_exists(markers, 'preroll')
+        postroll = check_marker_exists(markers, 'postroll')
+
+        # Check if postroll is at the very end of the episode
+        postroll_at_end = postroll is not None and postroll >= episode_duration - 1
+
+        # Episodes that already have a second midroll never get here (see process_episode)
+        midroll = check_marker_exists(markers, 'midroll', 0)
+        midroll2 = None
+
+        # New logic to handle postroll marker
+        if postroll and postroll < episode_duration - 300:  # 300 seconds = 5 minutes
+            midroll2 = postroll
+            postroll = episode_duration  # Update postroll to the very end
+
+        if not midroll:
+            return None  # Skip if no existing midroll
+
+        if not midroll2 and episode_duration >= 1200:
+            start_percentage = 50
+            if midroll:
+                midroll_end_time = midroll + episode_duration * 0.10  # Ensure 10% difference
+                start_percentage = max(start_percentage, (midroll_end_time / episode_duration) * 100)
+
+            longest_silence_midroll2 = find_longest_silence_within_range(silence_index, start_percentage, 90, episode_duration)
+            if longest_silence_midroll2:
+                midroll2 = longest_silence_midroll2['start'] + (longest_silence_midroll2['duration'] / 2)
+                if midroll and abs(midroll2 - midroll) < (0.10 * episode_duration):
+                    midroll2 = None
+                if preroll and abs(midroll2 - preroll) < (0.10 * episode_duration):
+                    midroll2 = None
+                if postroll and midroll2 is not None and abs(midroll2 - postroll) < (0.10 * episode_duration):
+                    midroll2 = None
+
+            if not midroll2 and midroll:
+                new_midroll_range_end = max(50, (midroll / episode_duration) * 100 - 10)
+                new_midroll_range_start = max(20, (midroll / episode_duration) * 100 - 20)
+                new_midroll_suggestion = find_longest_silence_within_range(silence_index, new_midroll_range_start, new_midroll_range_end, episode_duration)
+                if new_midroll_suggestion:
+                    midroll2 = new_midroll_suggestion['start'] + (new_midroll_suggestion['duration'] / 2)
+                    if midroll2 == midroll or abs(midroll2 - midroll) < (0.10 * episode_duration):
+                        midroll2 = None
+
+        if not midroll2:
+            return None  # Skip if no midroll2 can be generated
+
+        publish_date = episode.get('publishDate', '')
+
+        result = [
+            episode_guid, 
+            preroll, 
+            midroll if midroll else '', 
+            midroll2 if midroll2 else '', 
+            postroll, 
+            episode_duration, 
+            'Yes' if postroll_at_end else 'No',  # Note if postroll is at the end
+            publish_date
+        ]
+        # print(f"Result for episode {episode_guid}: {result}")
+        return result
+
+# The plan row for an episode that already has a second midroll: its current
+# markers, unchanged. It is returned rather than dropped so the diff report
+# lists the episode as skipped instead of it silently vanishing from the run,
+# but it is never written (see _keeps_markers). Returns None if there is no
+# second midroll.
+def _existing_placement(episode):
+    markers = episode.get('markers', [])
+    midroll2 = check_marker_exists(markers, 'midroll', 1)
+    if midroll2 is None:
+        return None
+    duration = episode.get('duration', '')
+    postroll = check_marker_exists(markers, 'postroll')
+    postroll_at_end = postroll is not None and duration != '' and postroll >= duration - 1
+    return [
+        episode['_id'],
+        check_marker_exists(markers, 'preroll'),
+        check_marker_exists(markers, 'midroll', 0),
+        midroll2,
+        postroll,
+        duration,
+        'Yes' if postroll_at_end else 'No',
+        episode.get('publishDate', ''),
+    ]
+
+# Episodes that already have a second midroll keep their markers exactly as
+# they are, whatever the marker diff makes of them
+def _keeps_markers(episode):
+    return check_marker_exists(episode.get('markers', []), 'midroll', 1) is not None
+
+# Worker pool settings: at most MAX_WORKERS episodes are analysed at once, and
+# each one gets TASK_TIMEOUT seconds from the moment it is submitted to them.
+# Its media lookup is cut off at that deadline, retries included, so one hung
+# lookup can't hold up the rest of the run or keep its worker.
+MAX_WORKERS = 16
+TASK_TIMEOUT = 300
+CONNECT_TIMEOUT = 10
+
+def worker(task, episode, decrypted_settings, run_metrics=metrics.NULL):
+    return process_episode(episode, decrypted_settings, run_metrics, deadline=task['deadline'])
+
+# Run process_episode over a bounded thread pool and yield each (episode,
+# result) pair as soon as it completes. At most `max_workers` episodes are
+# submitted at a time and each one's timeout runs from its submission, so even
+# a task queued behind a worker that never returns times out. Setting
+# `cancel_event` (or closing the generator, e.g. on a Streamlit rerun) drops
+# all queued episodes. Episodes that fail or time out yield None and,
+# given a `failed` set, have their GUID added to it.
+def run_episode_pool(episodes, decrypted_settings, max_workers=MAX_WORKERS, task_timeout=TASK_TIMEOUT, cancel_event=None, run_metrics=metrics.NULL, failed=None):
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    queue = deque(zip(episodes, decrypted_settings))
+    pending = {}
+
+    try:
+        while pending or queue:
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Cancelled with {len(pending) + len(queue)} episodes outstanding")
+                break
+
+            while queue and len(pending) < max_workers:
+                episode, settings = queue.popleft()
+                task = {'deadline': time.monotonic() + task_timeout, 'episode': episode}
+                pending[executor.submit(worker, task, episode, settings, run_metrics)] = task
+            run_metrics.set_gauge('episode_pool', len(queue))
+
+            next_deadline = min(task['deadline'] for task in pending.values())
+            done, _ = wait(pending, timeout=min(1, max(0, next_deadline - time.monotonic())), return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Failed to process episode {task['episode']['_id']}: {e}")
+                    run_metrics.increment('errors', kind='episode')
+                    result = None
+                    if failed is not None:
+                        failed.add(task['episode']['_id'])
+                yield task['episode'], result
+
+            now = time.monotonic()
+            for future, task in list(pending.items()):
+                if now > task['deadline']:
+                    print(f"Timed out processing episode {task['episode']['_id']} after {task_timeout}s")
+                    run_metrics.increment('errors', kind='timeout')
+                    del pending[future]
+                    if failed is not None:
+                        failed.add(task['episode']['_id'])
+                    yield task['episode'], None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def print_patch_request(episode_guid, preroll, midroll, midroll2, postroll, publish_date, episode_status, showId, headers, limiter, run_metrics=metrics.NULL):
+    # Construct markers string dynamically based on the presence of midroll2
+    if midroll2:
+        markers = f"{preroll},{midroll},{midroll2},{postroll}"
+    else:
+        markers = f"{preroll},{midroll},{postroll}"
+
+    update_payload = {
+        'markers': markers,
+        'publishDate': publish_date,
+        'status': episode_status
+    }
+
+    url = f"{endpoints.OPEN_API_URL}/rest/shows/{showId}/episodes/{episode_guid}"
+
+    # Throttled (429) and gateway (502) responses are retried by the writer
+    response = patch_writer.send_patch(url, update_payload, headers, limiter, run_metrics=run_metrics)
+
+    print(f"PATCH request for Episode GUID {episode_guid}:\nURL: {url}\nHeaders: {headers}\nPayload:\n{json.dumps(update_payload, indent=4)}")
+    print(f"Response Status Code: {response.status_code}\nResponse Text: {response.text}")
+
+    # Log non-200 responses
+    if response.status_code != 200:
+        run_metrics.increment('errors', kind='patch')
+        with open('error_log.txt', 'a') as log_file:
+            log_file.write(f"Episode GUID: {episode_guid}\nStatus Code: {response.status_code}\nResponse Text: {response.text}\n\n")
+    
+    return response
+
+def _missing(value):
+    return value is None or value == '' or (isinstance(value, float) and pd.isna(value))
+
+# PATCH one planned row (in PLAN_HEADER order)
+def patch_planned_row(row, showId, headers, limiter, run_metrics=metrics.NULL):
+    episode_guid, preroll, midroll, midroll2, postroll = row[:5]
+    publish_date = row[7]
+    episode_status = 'published'  # or derive from the plan if needed
+
+    # Ensure midroll2 is only included if it exists
+    if _missing(midroll2):
+        midroll2 = None
+
+    return print_patch_request(
+        episode_guid,
+        '' if _missing(preroll) else preroll,
+        '' if _missing(midroll) else midroll,
+        midroll2,
+        '' if _missing(postroll) else postroll,
+        publish_date, episode_status, showId, headers, limiter, run_metrics
+    )
+
+# PATCH every planned row. `rows` may be a generator fed by the analysis
+# stage: rows are pulled as write slots free up, so the first updates go out
+# while later episodes are still being analysed. Progress is reported against
+# the rows seen so far.
+def write_placements(rows, showId, headers, notify=print_notify, progress=None, max_workers=patch_writer.MAX_WORKERS, journal=None, run_metrics=metrics.NULL):
+    updated_count = 0  # Counter for updated episodes
+    seen = 0
+    limiter = patch_writer.new_limiter()
+
+    def pending_rows():
+        nonlocal seen, updated_count
+        for row in rows:
+            # Skip episodes a previous attempt of this run already updated
+            if journal is not None and row[0] in journal.patched:
+                updated_count += 1
+                continue
+            seen += 1
+            yield row
+
+    def write(row):
+        return patch_planned_row(row, showId, headers, limiter, run_metrics)
+
+    completed = 0
+    for row, response in patch_writer.write_concurrently(pending_rows(), write, max_workers=max_workers, run_metrics=run_metrics):
+        completed += 1
+        if response is not None and response.status_code == 200:
+            updated_count += 1  # Increment counter if the patch request was successful
+            if journal is not None:
+                journal.record('patched', guid=row[0])
+
+        # Report progress as each request completes
+        if progress is not None:
+            progress(completed, seen)
+
+    if completed == 0 and updated_count == 0:
+        notify('warning', "No episodes to process.")
+        if progress is not None:
+            progress(0, 0)
+        notify('status', "No episodes found to update.")
+        return 0
+
+    if progress is not None:
+        progress(completed, completed)
+    # Report the number of episodes updated
+    notify('success', f"Number of episodes updated: {updated_count}\n\nAll done! 🎉")
+    return updated_count
+
+# Apply a placement plan saved as CSV (PLAN_HEADER columns)
+def process_csv(file_content, showId, headers, notify=print_notify, progress=None, max_workers=patch_writer.MAX_WORKERS, journal=None, run_metrics=metrics.NULL):
+    df = pd.read_csv(StringIO(file_content))[PLAN_HEADER]
+    rows = df.astype(object).where(df.notna(), None).values.tolist()
+    return write_placements(rows, showId, headers, notify=notify, progress=progress, max_workers=max_workers, journal=journal, run_metrics=run_metrics)
+
+def _backup_row(row, markers):
+    return list(row) + [
+        check_marker_exists(markers, 'preroll'),
+        check_marker_exists(markers, 'midroll', 0),
+        check_marker_exists(markers, 'midroll', 1),
+        check_marker_exists(markers, 'postroll'),
+    ]
+
+# Report how a backup went once its uploads have finished. Returns True if
+# the backup is complete (on disk, and uploaded if an uploader was set).
+def finish_backup(sink, notify=print_notify, run_metrics=metrics.NULL):
+    with run_metrics.stage('backup'):
+        backed_up = sink.wait()
+    chunks = len(sink.manifest['chunks'])
+    if backed_up:
+        uploaded = " and uploaded to Google Drive" if sink.uploader is not None else ""
+        notify('success', f"Existing timestamps have been backed up successfully ({sink.row_count} episodes in {chunks} chunks in {sink.directory}{uploaded}).")
+    else:
+        notify('error', f"Backup saved to {sink.directory}, but {len(sink.errors)} of {chunks} chunks failed to upload: {sink.errors[0]}")
+    return backed_up
+
+# Fetch, match and decrypt a show's episodes. Returns the backup file name, the
+# matched catalogue episodes, their decrypted settings and every published
+# catalogue episode examined (matched or not). With a `watermark`, only
+# episodes newer than it are kept, so only those are decrypted and analysed.
+def prepare_episodes(showId, headers, notify=print_notify, watermark=None, run_metrics=metrics.NULL):
+    feed_url = endpoints.feed_url(showId)
+    with run_metrics.stage('rss_fetch'):
+        podcast_title, signature, rss_episodes = fetch_and_parse_rss(feed_url, run_metrics)
+    notify('status', f"Backing up existing timestamps for {podcast_title} \n\nThis may take a few minutes...")  # Display the podcast title
+    print(f"Podcast Title: {podcast_title}, Total Episodes Fetched: {len(rss_episodes)}")
+
+    sanitized_title = sanitize_filename(podcast_title)
+    filename = f"{sanitized_title}_timestamp_export.csv"
+
+    # Collect published episodes as catalogue pages arrive
+    detailed_episodes = []
+    detailed_count = 0
+    stop_after = _reached_watermark(watermark) if watermark else None
+    with run_metrics.stage('catalogue_fetch'):
+        for episode in catalogue.iter_catalogue(showId, headers, stop_after=stop_after, run_metrics=run_metrics):
+            detailed_count += 1
+            if 'publishDate' in episode and episode['publishDate'] and episode.get('status') == 'published':  # Ensure the episode has a valid publish date and is published
+                if not watermark or watermark.is_new(episode):
+                    detailed_episodes.append(episode)
+    print(f"Total Detailed Episodes Fetched: {detailed_count}")
+    if watermark:
+        print(f"{len(detailed_episodes)} published episodes are newer than {watermark.publish_date}")
+
+    # Match RSS items to CMS episodes by publish date, then title
+    matches = join_episodes(
+        [episode.get('title') for episode in detailed_episodes],
+        [episode['publishDate'] for episode in detailed_episodes],
+        [episode.title for episode in rss_episodes],
+        [episode.pubDate for episode in rss_episodes],
+    )
+    matched_episodes = []
+    matched_settings = []
+    for rss_index, cms_index in zip(matches['rss_index'], matches['cms_index']):
+        matched_episodes.append(detailed_episodes[cms_index])
+        matched_settings.append(rss_episodes[rss_index].settings)
+    print(f"Matched {len(matched_episodes)} of {len(rss_episodes)} RSS episodes to detailed episodes")
+
+    # Derive the feed key once and decrypt all settings before any worker starts
+    with run_metrics.stage('decrypt'):
+        decrypted_settings = decrypt_many(signature, matched_settings, password)
+
+    return filename, matched_episodes, decrypted_settings, detailed_episodes
+
+# Paging can stop at a page that is in newest-first order and holds nothing
+# newer than the watermark. Pages in any other order are always read in full.
+def _reached_watermark(watermark):
+    def stop_after(page):
+        dated = [episode for episode in page if episode.get('publishDate')]
+        if not dated or any(watermark.is_new(episode) for episode in dated):
+            return False
+        published = [parse_publish_date(episode['publishDate']) for episode in dated]
+        return all(newer >= older for newer, older in zip(published, published[1:]))
+    return stop_after
+
+# Sort plan rows by publish date from latest to oldest, handle None values
+def newest_first(results):
+    return sorted(results, key=lambda x: x[-1] if x[-1] else '', reverse=True)
+
+# Fetch, match, decrypt and analyse a show's episodes. Returns the backup file
+# name, the planned marker rows that change an episode (newest first) and a
+# diff report row for every placement, including the skipped no-ops.
+def plan_placements(showId, headers, max_workers=MAX_WORKERS, notify=print_notify, tolerance=marker_diff.MARKER_TOLERANCE, watermark=None, run_metrics=metrics.NULL):
+    filename, matched_episodes, decrypted_settings, _ = prepare_episodes(showId, headers, notify=notify, watermark=watermark, run_metrics=run_metrics)
+
+    results = []
+    report = []
+    with run_metrics.stage('analysis'):
+        for episode, result in run_episode_pool(matched_episodes, decrypted_settings, max_workers=max_workers, run_metrics=run_metrics):
+            if result:
+                changes = [] if _keeps_markers(episode) else marker_diff.diff_markers(episode.get('markers', []), result, tolerance)
+                report.append(marker_diff.report_row(episode.get('markers', []), result, changes))
+                if changes:
+                    results.append(result)
+
+    return filename, newest_first(results), report
+
+def build_diff_report(report):
+    export = CsvExport(marker_diff.REPORT_HEADER)
+    export.write_rows(sorted(report, key=lambda row: row[4] != 'update'))
+    return export.getvalue().decode('utf-8')
+
+def build_plan_csv(results):
+    export = CsvExport(PLAN_HEADER)
+    export.write_rows(results)
+    return export.getvalue().decode('utf-8')
+
+# Write the run report to .cache/metrics/mid2-<show>.json and .prom and return
+# the JSON path
+def _write_metrics(showId, run_metrics):
+    name = f"mid2-{showId}"
+    run_metrics.write_report(name)
+    return os.path.join(metrics.METRICS_DIR, name + '.json')
+
+# Run the whole autoplacer for one show. Returns a summary of the run. With
+# dry_run the plan is built and returned without backing up or updating
+# anything, and any journalled run is left untouched. With incremental, only
+# episodes published after the show's high-water mark are processed. Every
+# fresh run moves the mark up to the newest episode it settled (analysed, and
+# updated or found unchanged), but never past an episode it didn't settle
+# (failed, or not matched to a feed item). With resume, an unfinished journalled run is picked up: one
+# with a complete plan only writes what is left of it, and one that stopped
+# mid-analysis writes the rows it had placed and analyses the rest.
+def run_autoplacer(showId, key, max_workers=MAX_WORKERS, resume=False, dry_run=False, notify=print_notify, progress=None, tolerance=marker_diff.MARKER_TOLERANCE, upload_backup=True, incremental=False):
+    headers = {'x-api-key': key, 'Content-Type': 'application/json'}
+    http_client.configure(pool_size=max_workers)
+
+    run_metrics = metrics.Metrics()
+    watermark = Watermark(showId)
+    since = watermark if incremental and watermark else None
+    if incremental:
+        notify('info', f"Only processing episodes published after {watermark.publish_date}." if since else "No previous run for this show; processing the whole catalogue.")
+
+    if dry_run:
+        filename, results, report = plan_placements(showId, headers, max_workers=max_workers, notify=notify, tolerance=tolerance, watermark=since, run_metrics=run_metrics)
+        notify('status', '')
+        notify('info', f"Dry run: {len(results)} episodes would be updated, {len(report) - len(results)} already have the proposed markers.")
+        return {
+            'filename': filename,
+            'planned': len(results),
+            'unchanged': len(report) - len(results),
+            'updated': 0,
+            'backup': False,
+            'metrics': _write_metrics(showId, run_metrics),
+            'file_content': build_plan_csv(results),
+            'report_content': build_diff_report(report),
+        }
+
+    journal = RunJournal(showId)
+
+    resumable = resume and journal.can_resume()
+    if resume and not resumable:
+        notify('warning', "There is no interrupted run to resume for this show, so a new run was started.")
+
+    if resumable and journal.plan is not None:
+        results = newest_first(journal.plan)
+        filename = journal.filename
+        notify('info', f"Resuming previous run: {len(journal.patched)} of {len(results)} episodes already updated.")
+        file_content = build_plan_csv(results)
+        if not journal.backup_done:
+            sink = backup_store.open_backup(showId, filename, BACKUP_HEADER, upload=upload_backup, run_metrics=run_metrics)
+            sink.write_rows(_backup_row(row, journal.original_markers.get(row[0], [])) for row in results)
+            sink.close()
+            if finish_backup(sink, notify=notify, run_metrics=run_metrics):
+                journal.record('backup')
+        notify('status', '')
+        with run_metrics.stage('patch'):
+            updated_count = write_placements(results, showId, headers, notify=notify, progress=progress, journal=journal, run_metrics=run_metrics)
+    else:
+        if resumable:
+            notify('info', f"Resuming a run that stopped mid-analysis: {len(journal.patched)} of {len(journal.placed)} placed episodes already updated.")
+        else:
+            journal.start()
+        filename, updated_count, settled, unsettled = _run_pipelined(showId, headers, max_workers, journal, notify, progress, tolerance, upload_backup, since, run_metrics)
+        results = newest_first(journal.plan)
+        file_content = build_plan_csv(results)
+        # The mark stops short of any episode that failed, so the next run retries it
+        if settled:
+            watermark.advance(settled, unsettled=unsettled)
+            watermark.save()
+
+    journal.record('done')
+
+    return {
+        'filename': filename,
+        'planned': len(results),
+        'updated': updated_count,
+        'backup': journal.backup_done,
+        'watermark': watermark.publish_date,
+        'metrics': _write_metrics(showId, run_metrics),
+        'file_content': file_content,
+    }
+
+# A fresh run as one streaming pipeline: analysis -> diff -> backup -> PATCH.
+# Placements that match the episode's current markers within `tolerance`, and
+# those of episodes that already have a second midroll, are dropped. Every
+# other placement is fsynced to this run's journal file
+# together with the episode's original markers before the row is handed to
+# the writer, so no episode is updated before its original markers are on
+# disk; run files are never truncated, so they outlive later runs. The plan
+# rows and original markers also go to the chunked backup, which writes a chunk every
+# backup_store.CHUNK_ROWS rows and uploads it in the background. Analysis
+# and PATCH interleave, so 'analysis' is the time spent waiting on the
+# analysis stage and 'patch' the rest of the pipeline's wall time. Rows the
+# journal already holds (an interrupted attempt being resumed) are written
+# first, and their episodes aren't analysed again. Returns the
+# file name, the number of updated episodes, the settled episodes (analysed,
+# and either updated or needing no change) and the unsettled ones: every
+# other examined episode, whether its analysis or PATCH failed, it was never
+# analysed or it didn't match a feed item (not in the feed yet, say).
+def _run_pipelined(showId, headers, max_workers, journal, notify, progress, tolerance=marker_diff.MARKER_TOLERANCE, upload_backup=True, watermark=None, run_metrics=metrics.NULL):
+    filename, matched_episodes, decrypted_settings, examined = prepare_episodes(showId, headers, notify=notify, watermark=watermark, run_metrics=run_metrics)
+    notify('status', '')
+    sink = backup_store.open_backup(showId, filename, BACKUP_HEADER, upload=upload_backup, run_metrics=run_metrics)
+
+    analysed = set()
+    planned = set()
+    failed = set()
+    placed = list(journal.placed)
+    placed_guids = {row[0] for row in placed}
+    to_analyse = [(episode, settings) for episode, settings in zip(matched_episodes, decrypted_settings) if episode['_id'] not in placed_guids]
+
+    def placements():
+        # The writer skips the rows that were already PATCHed
+        for row in placed:
+            sink.write_row(_backup_row(row, journal.original_markers.get(row[0], [])))
+            analysed.add(row[0])
+            planned.add(row[0])
+            yield row
+        episodes = [episode for episode, _ in to_analyse]
+        settings = [settings for _, settings in to_analyse]
+        for episode, row in run_episode_pool(episodes, settings, max_workers=max_workers, run_metrics=run_metrics, failed=failed):
+            analysed.add(episode['_id'])
+            if not row:
+                continue
+            if _keeps_markers(episode):
+                run_metrics.increment('skipped', reason='existing_midroll2')
+                continue
+            if not marker_diff.diff_markers(episode.get('markers', []), row, tolerance):
+                run_metrics.increment('skipped', reason='unchanged')
+                continue
+            journal.record('placed', row=row, markers=episode.get('markers', []))
+            sink.write_row(_backup_row(row, episode.get('markers', [])))
+            planned.add(row[0])
+            yield row
+        journal.record('plan', filename=filename)
+        sink.close()
+
+    rows = metrics.TimedIterator(placements())
+    started = time.monotonic()
+    updated_count = write_placements(rows, showId, headers, notify=notify, progress=progress, journal=journal, run_metrics=run_metrics)
+    run_metrics.add_stage_time('analysis', rows.seconds)
+    run_metrics.add_stage_time('patch', time.monotonic() - started - rows.seconds)
+    if finish_backup(sink, notify=notify, run_metrics=run_metrics):
+        journal.record('backup')
+
+    settled, unsettled = [], []
+    for episode in examined:
+        guid = episode['_id']
+        done = guid in analysed and guid not in failed and (guid not in planned or guid in journal.patched)
+        (settled if done else unsettled).append(episode)
+    return filename, updated_count, settled, unsettled
@@ -0,0 +1,83 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+import http_client
+import metrics
+from rate_limit import TokenBucket
+
+# Concurrent, rate-limited writer for open.acast.com. Writes are spread over a
+# small thread pool and paced by a token bucket that backs off on its own when
+# the API answers 429 (throttled) or 502 (overloaded gateway).
+
+MAX_WORKERS = 8
+THROTTLE_STATUSES = (429, 502)
+
+_shared_limiter = None
+
+# Pace every write run in this process with one limiter instead of a fresh
+# bucket per run, e.g. a bucket that every process of a batch run reaches
+# through a manager, so together they stay within the account's write quota
+def set_shared_limiter(limiter):
+    global _shared_limiter
+    _shared_limiter = limiter
+
+# The limiter for a new write run
+def new_limiter():
+    return _shared_limiter if _shared_limiter is not None else TokenBucket()
+
+def retry_delay(response, attempt):
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return max(int(retry_after), http_client.backoff_delay(attempt))
+    return http_client.backoff_delay(attempt)
+
+# PATCH one resource, retrying throttled responses with the shared backoff
+# policy. Returns the final response.
+def send_patch(url, payload, headers, limiter, max_retries=http_client.MAX_RETRIES, run_metrics=metrics.NULL):
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        response = http_client.patch(url, headers=headers, data=json.dumps(payload), run_metrics=run_metrics)
+        if response.status_code in THROTTLE_STATUSES and attempt < max_retries:
+            print(f"Received {response.status_code} for {url}, retrying... ({attempt + 1}/{max_retries})")
+            run_metrics.increment('patch_retries', status=str(response.status_code))
+            limiter.slow_down()
+            time.sleep(retry_delay(response, attempt))
+            continue
+        if response.ok:
+            limiter.speed_up()
+        return response
+
+# Run `write(item)` for every item on a bounded pool and yield (item, response)
+# pairs in completion order. Items are pulled lazily, so `items` can be a
+# generator fed by an earlier stage. A response is None if the request raised.
+def write_concurrently(items, write, max_workers=MAX_WORKERS, run_metrics=metrics.NULL):
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    items = iter(items)
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_workers * 2:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(write, item)] = item
+            run_metrics.set_gauge('patch_writer', len(pending))
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Write failed: {e}")
+                    run_metrics.increment('errors', kind='patch')
+                    response = None
+                yield item, response
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
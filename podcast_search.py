@@ -0,0 +1,89 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import http_client
+import endpoints
+import search_cache
+from rate_limit import TokenBucket
+
+# Apple Podcasts lookups for the RSS Finder, independent of Streamlit: single
+# searches and bulk resolution of many show names to their Acast feed.
+
+# The iTunes Search API allows roughly 20 requests per minute
+ITUNES_RATE = 20 / 60
+ITUNES_BURST = 3
+MAX_WORKERS = 4
+BULK_HEADER = ['Query', 'Title', 'Show ID', 'Acast Link', 'RSS Feed', 'Status']
+
+# Function to query the iTunes Search API, raising on failure
+# Retries on 503 and other transient errors come from the shared http_client policy
+def fetch_podcasts(query):
+    response = http_client.get(f"{endpoints.ITUNES_URL}/search", params={
+        'term': query,
+        'media': 'podcast',
+    })
+    response.raise_for_status()  # Raises an HTTPError if the response was unsuccessful
+    data = response.json()
+    podcasts = [
+        {
+            'title': result['trackName'],
+            'link': result['collectionViewUrl'],
+            'feed': result.get('feedUrl', 'N/A'),
+            'artwork': result['artworkUrl600'],
+            'author': result.get('artistName', 'N/A'),
+            'genre': result.get('primaryGenreName', 'N/A'),
+            'episode_count': result.get('trackCount', 'N/A'),
+        }
+        for result in data['results']
+    ]
+    podcasts = sorted(podcasts, key=lambda p: 'acast.com' not in p['feed'])
+    return podcasts
+
+# Acast Show ID from an Acast feed URL (the last path segment)
+def extract_show_id(feed):
+    return feed.split("/")[-2] if feed.endswith('/') else feed.split("/")[-1]
+
+# First acast.com result; results are already sorted with Acast feeds first
+def best_acast_match(podcasts):
+    for podcast in podcasts:
+        if 'acast.com' in podcast['feed']:
+            return podcast
+    return None
+
+# Show names from an uploaded CSV or plain list: the first column of each row,
+# skipping blank lines and a header row
+def read_show_names(text):
+    names = []
+    for row in csv.reader(text.splitlines()):
+        name = row[0].strip() if row else ''
+        if name and name.lower() not in ('name', 'show name', 'podcast name', 'podcast', 'show'):
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+def resolve_show_name(name, limiter):
+    def fetch(query):
+        limiter.acquire()
+        return fetch_podcasts(query)
+
+    try:
+        podcast = best_acast_match(search_cache.get_results(name, fetch))
+    except Exception as e:
+        return [name, '', '', '', '', f"Error: {e}"]
+    if podcast is None:
+        return [name, '', '', '', '', 'No Acast match']
+    show_id = extract_show_id(podcast['feed'])
+    return [name, podcast['title'], show_id, f"https://shows.acast.com/{show_id}", podcast['feed'], 'Found']
+
+# Resolve every name to its best Acast match on a bounded pool, paced to the
+# iTunes rate limit (cached searches don't count against it), and yield
+# result rows in BULK_HEADER order as they complete
+def resolve_show_names(names, max_workers=MAX_WORKERS, rate=ITUNES_RATE, burst=ITUNES_BURST):
+    limiter = TokenBucket(rate=rate, burst=burst, min_rate=rate)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(resolve_show_name, name, limiter) for name in names}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+# Token-bucket rate limiter shared by everything that calls a rate-limited API.
+# Callers block in acquire() until a token is free; slow_down() and speed_up()
+# let the bucket adapt to throttling responses (multiplicative decrease,
+# additive increase).
+
+# Defaults match the open.acast.com write quota: sustained requests per
+# second and burst size. ACAST_WRITE_RATE overrides both, e.g. for stand-in
+# servers that have no quota.
+DEFAULT_RATE = float(os.environ.get('ACAST_WRITE_RATE', 5))
+DEFAULT_BURST = max(1, int(DEFAULT_RATE))
+MIN_RATE = 0.5
+
+class TokenBucket:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=MIN_RATE):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Block until a token is available
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    # Halve the rate and drop any saved-up burst after a throttling response
+    def slow_down(self):
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    # Creep back towards the configured rate after each successful write
+    def speed_up(self):
+        with self.lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
@@ -1,63 +1,44 @@
 import streamlit as st
 import requests
-import time
+import pandas as pd
+import search_cache
+import artwork_cache
+import podcast_search
+from csv_export import CsvExport
 from streamlit_extras.add_vertical_space import add_vertical_space
 
-# Function to search podcasts
-def search_podcasts(query, retries=3):
-    for i in range(retries):
-        try:
-            response = requests.get('https://itunes.apple.com/search', params={
-                'term': query,
-                'media': 'podcast',
-            })
-            response.raise_for_status()  # Raises an HTTPError if the response was unsuccessful
-            data = response.json()
-            podcasts = [
-                {
-                    'title': result['trackName'],
-                    'link': result['collectionViewUrl'],
-                    'feed': result.get('feedUrl', 'N/A'),
-                    'artwork': result['artworkUrl600'],
-                    'author': result.get('artistName', 'N/A'),
-                    'genre': result.get('primaryGenreName', 'N/A'),
-                    'episode_count': result.get('trackCount', 'N/A'),
-                }
-                for result in data['results']
-            ]
-            podcasts = sorted(podcasts, key=lambda p: 'acast.com' not in p['feed'])
-            return podcasts
+# Function to search podcasts, served from the shared search cache when possible
+def search_podcasts(query):
+    try:
+        return search_cache.get_results(query, podcast_search.fetch_podcasts)
+    except requests.exceptions.HTTPError as e:
+        st.error(f"HTTP error: {e}")
+        return None
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {e}")
+        return None
 
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 503 and i < retries - 1:  # Retry on 503 error
-                time.sleep(1)
-                continue
-            else:
-                st.error(f"HTTP error: {e}")
-                return None
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {e}")
-            return None
+RESULTS_PER_PAGE = 10
 
-    return None  # If we got here, we failed all retries
-
-# Function to display podcasts
-def display_podcasts(podcasts):
+# Function to display podcasts, RESULTS_PER_PAGE at a time with cached thumbnails
+def display_podcasts(podcasts, shown=RESULTS_PER_PAGE):
     if not podcasts:
         st.warning("No podcasts found.")
         return
     
-    for podcast in podcasts:
+    visible = podcasts[:shown]
+    thumbnails = artwork_cache.get_thumbnails([podcast["artwork"] for podcast in visible])
+    for podcast, thumbnail in zip(visible, thumbnails):
         col1, col2 = st.columns([1, 2])
         with col1:
-            st.image(podcast["artwork"], use_column_width=True)
+            st.image(thumbnail or podcast["artwork"], use_column_width=True)
         with col2:
             st.markdown(f"### [{podcast['title']}]({podcast['link']})")
             st.markdown(f"**Author:** {podcast['author']}")
             st.markdown(f"**Genre:** {podcast['genre']}")
             st.markdown(f"**Episodes:** {podcast['episode_count']}")
             if "acast.com" in podcast['feed']:
-                guid = podcast['feed'].split("/")[-2] if podcast['feed'].endswith('/') else podcast['feed'].split("/")[-1]
+                guid = podcast_search.extract_show_id(podcast['feed'])
                 acast_link = f"https://shows.acast.com/{guid}"
                 st.markdown(f"**Show ID:** {guid}")
                 st.markdown(f"[Acast Link]({acast_link})")
@@ -75,11 +56,51 @@ def main():
     podcast_name = st.text_input('Podcast Name:')
     if st.button('Search'):
         with st.spinner('Searching Apple Podcasts...'):
-            podcasts = search_podcasts(podcast_name)
-            if podcasts:
-                display_podcasts(podcasts)
-            else:
-                st.warning("No podcasts found. Try another search.")
+            st.session_state['rss_finder_results'] = search_podcasts(podcast_name)
+            st.session_state['rss_finder_shown'] = RESULTS_PER_PAGE
+
+    # Results are kept in the session so "Show more" can render the next page
+    if 'rss_finder_results' in st.session_state:
+        podcasts = st.session_state['rss_finder_results']
+        if podcasts:
+            display_podcasts(podcasts, st.session_state['rss_finder_shown'])
+            if st.session_state['rss_finder_shown'] < len(podcasts):
+                remaining = len(podcasts) - st.session_state['rss_finder_shown']
+                if st.button(f"Show more ({remaining} remaining)"):
+                    st.session_state['rss_finder_shown'] += RESULTS_PER_PAGE
+                    st.rerun()
+        else:
+            st.warning("No podcasts found. Try another search.")
+        cache_stats = search_cache.stats()
+        st.caption(f"Search cache: {cache_stats['hits']} hits, {cache_stats['stale_hits']} stale hits, {cache_stats['misses']} misses")
+
+    add_vertical_space(2)
+    bulk_lookup()
+
+# Bulk lookup: resolve an uploaded list of show names to Acast feeds
+def bulk_lookup():
+    st.subheader('Bulk Lookup')
+    st.write("Upload a list of show names (CSV with the name in the first column, or one per line) to find each show's Acast feed and Show ID.")
+    upload = st.file_uploader("Show names:", type=['csv', 'txt'])
+    if upload is not None and st.button('Look up all'):
+        names = podcast_search.read_show_names(upload.getvalue().decode('utf-8'))
+        if not names:
+            st.warning("No show names found in the uploaded file.")
+            return
+
+        export = CsvExport(podcast_search.BULK_HEADER)
+        progress_bar = st.progress(0)
+        results_table = st.empty()
+        rows = []
+        for row in podcast_search.resolve_show_names(names):
+            rows.append(row)
+            export.write_row(row)
+            progress_bar.progress(len(rows) / len(names), text=f"Resolved {len(rows)} of {len(names)} shows")
+            results_table.dataframe(pd.DataFrame(rows, columns=podcast_search.BULK_HEADER))
+
+        found = sum(1 for row in rows if row[-1] == 'Found')
+        st.success(f"Found Acast feeds for {found} of {len(names)} shows.")
+        st.download_button(label="Download CSV", data=export.getvalue(), file_name='rss_finder_bulk.csv', mime=export.mime)
 
 if __name__ == '__main__':
     main()
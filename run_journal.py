@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Append-only journal of autoplacer runs. Each stage records its output as a
+# JSON line as soon as it completes (every placement with the episode's
+# original markers, the finished plan, the backup, every successful PATCH), so
+# an interrupted run can be resumed without repeating finished work and no
+# episode is updated before its original markers are on disk. Every run gets
+# its own file under .cache/runs/<show>/ and old runs are never truncated or
+# deleted, so the original markers of every episode a run updated survive any
+# later run.
+
+JOURNAL_DIR = os.path.join('.cache', 'runs')
+
+# The show's run files, oldest first. A journal from before runs had their own
+# files (.cache/runs/<show>.jsonl) counts as the oldest run.
+def run_paths(show_id):
+    directory = os.path.join(JOURNAL_DIR, show_id)
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.jsonl'))
+    except FileNotFoundError:
+        names = []
+    paths = [os.path.join(directory, name) for name in names]
+    legacy_path = os.path.join(JOURNAL_DIR, f"{show_id}.jsonl")
+    if os.path.exists(legacy_path):
+        paths.insert(0, legacy_path)
+    return paths
+
+class RunJournal:
+    # Opens the show's latest run, if there is one
+    def __init__(self, show_id):
+        self.show_id = show_id
+        paths = run_paths(show_id)
+        self.path = paths[-1] if paths else None
+        self.lock = threading.Lock()
+        self.plan = None
+        self.placed = []
+        self.original_markers = {}
+        self.filename = None
+        self.backup_done = False
+        self.patched = set()
+        self.finished = False
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # A partially written last line means the run died mid-write
+                    self._apply(entry)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, entry):
+        stage = entry.get('stage')
+        if stage == 'placed':
+            self.placed.append(entry['row'])
+            self.original_markers[entry['row'][0]] = entry.get('markers', [])
+        elif stage == 'plan':
+            # Streamed runs record their rows one 'placed' entry at a time
+            self.plan = entry['rows'] if 'rows' in entry else list(self.placed)
+            self.filename = entry.get('filename')
+        elif stage == 'backup':
+            self.backup_done = True
+        elif stage == 'patched':
+            self.patched.add(entry['guid'])
+        elif stage == 'done':
+            self.finished = True
+
+    # True if there is an unfinished run to pick up: one with a complete
+    # placement plan, or one that died mid-analysis after placing some rows.
+    # The latter carries on in the same file, so its 'plan' entry covers the
+    # rows of both attempts.
+    def can_resume(self):
+        return not self.finished and (self.plan is not None or bool(self.placed))
+
+    # Begin a new run in a new file, leaving earlier runs on disk
+    def start(self):
+        directory = os.path.join(JOURNAL_DIR, self.show_id)
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.path = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl")
+            open(self.path, 'x').close()
+            self.plan = None
+            self.placed = []
+            self.original_markers = {}
+            self.filename = None
+            self.backup_done = False
+            self.patched = set()
+            self.finished = False
+
+    def record(self, stage, **data):
+        entry = dict(data, stage=stage)
+        with self.lock:
+            with open(self.path, 'a') as journal_file:
+                journal_file.write(json.dumps(entry) + '\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self._apply(entry)
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import sys
+import marker_diff
+
+# Headless entry point for the Script Hub pipelines, for scripting, cron jobs
+# and batch workers. Nothing here imports Streamlit, and each command only
+# imports the pipeline it runs (marker_diff is a small, dependency-free
+# module, imported up front for its defaults).
+#
+#   python scripthub.py export-timestamps SHOW_ID --key KEY
+#   python scripthub.py mid2 SHOW_ID --key KEY --dry-run
+#   python scripthub.py mid2 SHOW_ID --key KEY --incremental
+#   python scripthub.py import-timestamps SHOW_ID timestamps.csv --key KEY
+#   python scripthub.py embed SHOW_ID --gzip
+#   python scripthub.py batch mid2 show_ids.csv --key KEY --processes 8
+#
+# The API key can also be given in the ACAST_API_KEY environment variable.
+
+def write_output(path, data):
+    with open(path, 'wb') as output_file:
+        output_file.write(data)
+    print(f"Wrote {path}")
+
+def export_timestamps_command(args):
+    import timestamp_pipeline
+    show_name, episode_count, export = timestamp_pipeline.export_show_timestamps(args.show_id, args.key, compress=args.gzip)
+    write_output(args.output or export.file_name(show_name.replace(' ', '_')), export.getvalue())
+    print(f"{show_name}: {export.row_count} published of {episode_count} episodes")
+
+def mid2_command(args):
+    import mid2_pipeline
+    options = {'resume': args.resume, 'dry_run': args.dry_run, 'tolerance': args.tolerance, 'upload_backup': not args.no_upload, 'incremental': args.incremental}
+    if args.workers:
+        options['max_workers'] = args.workers
+    summary = mid2_pipeline.run_autoplacer(args.show_id, args.key, **options)
+    output = args.output or summary['filename']
+    write_output(output, summary.pop('file_content').encode('utf-8'))
+    if 'report_content' in summary:
+        write_output(os.path.splitext(output)[0] + '_diff.csv', summary.pop('report_content').encode('utf-8'))
+    print(json.dumps(summary))
+
+def import_timestamps_command(args):
+    import import_pipeline
+    options = {'dry_run': args.dry_run}
+    if args.workers:
+        options['max_workers'] = args.workers
+    summary = import_pipeline.import_timestamps(args.csv, args.show_id, args.key, **options)
+    error_content = summary.pop('error_content')
+    if summary['error_rows']:
+        write_output(args.errors or os.path.splitext(os.path.basename(args.csv))[0] + '_errors.csv', error_content)
+    print(json.dumps(summary))
+    return 1 if summary['failed'] else 0
+
+def embed_command(args):
+    import embed_pipeline
+    episodes, show_title, sanitized_show_title = embed_pipeline.get_episode_ids(args.show_id)
+    export = embed_pipeline.save_to_csv(episodes, compress=args.gzip)
+    write_output(args.output or export.file_name(sanitized_show_title), export.getvalue())
+    print(f"{show_title}: {export.row_count} episodes")
+
+def batch_command(args):
+    import batch
+    with open(args.show_ids) as show_ids_file:
+        show_ids = batch.read_show_ids(show_ids_file.read())
+
+    options = {}
+    if args.processes:
+        options['max_processes'] = args.processes
+    if args.job == 'mid2':
+        options['dry_run'] = args.dry_run
+        options['upload_backup'] = not args.no_upload
+        options['incremental'] = args.incremental
+        if args.workers:
+            options['max_workers'] = args.workers
+
+    failed = 0
+    for result in batch.run_batch(args.job, show_ids, args.key, output_dir=args.output_dir, **options):
+        failed += result['status'] != 'ok'
+        print(json.dumps(result))
+    return 1 if failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='scripthub', description="Run Script Hub pipelines without the web app.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_key(command):
+        command.add_argument('--key', default=os.environ.get('ACAST_API_KEY'), help="open.acast.com API key (default: $ACAST_API_KEY)")
+
+    export = commands.add_parser('export-timestamps', help="Export episode titles, GUIDs, publish dates and ad markers to CSV")
+    export.add_argument('show_id')
+    add_key(export)
+    export.add_argument('-o', '--output', help="Output file (default: <show name>.csv)")
+    export.add_argument('--gzip', action='store_true', help="Gzip the CSV")
+    export.set_defaults(func=export_timestamps_command, needs_key=True)
+
+    mid2 = commands.add_parser('mid2', help="Place Mid2 markers across a show's back catalogue")
+    mid2.add_argument('show_id')
+    add_key(mid2)
+    mid2.add_argument('-o', '--output', help="Where to write the placement CSV (default: <show>_timestamp_export.csv)")
+    mid2.add_argument('--workers', type=int, help="Episodes analysed in parallel")
+    mid2.add_argument('--resume', action='store_true', help="Resume the last unfinished run for this show")
+    mid2.add_argument('--dry-run', action='store_true', help="Plan placements without backing up or updating episodes, and write a marker diff report")
+    mid2.add_argument('--incremental', action='store_true', help="Only process episodes published since the last completed run")
+    mid2.add_argument('--no-upload', action='store_true', help="Keep the backup in backups/ only instead of also uploading it to Google Drive")
+    mid2.add_argument('--tolerance', type=float, default=marker_diff.MARKER_TOLERANCE, help=f"Seconds within which a marker counts as unchanged (default: {marker_diff.MARKER_TOLERANCE:g})")
+    mid2.set_defaults(func=mid2_command, needs_key=True)
+
+    importer = commands.add_parser('import-timestamps', help="Update episode markers from a timestamp export or Mid2 plan/backup CSV")
+    importer.add_argument('show_id')
+    importer.add_argument('csv', help="CSV file to import (.csv or .csv.gz)")
+    add_key(importer)
+    importer.add_argument('--workers', type=int, help="Updates sent in parallel")
+    importer.add_argument('--dry-run', action='store_true', help="Validate the file without updating episodes")
+    importer.add_argument('--errors', help="Where to write rejected rows (default: <csv name>_errors.csv)")
+    importer.set_defaults(func=import_timestamps_command, needs_key=True)
+
+    embed = commands.add_parser('embed', help="Export embed player codes for every episode to CSV")
+    embed.add_argument('show_id')
+    embed.add_argument('-o', '--output', help="Output file (default: <show name>.csv)")
+    embed.add_argument('--gzip', action='store_true', help="Gzip the CSV")
+    embed.set_defaults(func=embed_command, needs_key=False)
+
+    batch = commands.add_parser('batch', help="Run export-timestamps or mid2 for a list of shows")
+    batch.add_argument('job', choices=['export-timestamps', 'mid2'])
+    batch.add_argument('show_ids', help="CSV or text file with one Show ID per line")
+    add_key(batch)
+    batch.add_argument('--output-dir', help="Directory for per-show result files (default: batch_output/<timestamp>)")
+    batch.add_argument('--processes', type=int, help="Shows processed in parallel")
+    batch.add_argument('--workers', type=int, help="mid2: episodes analysed in parallel per show")
+    batch.add_argument('--dry-run', action='store_true', help="mid2: plan placements without updating episodes")
+    batch.add_argument('--incremental', action='store_true', help="mid2: only process episodes published since each show's last run")
+    batch.add_argument('--no-upload', action='store_true', help="mid2: keep backups local instead of also uploading them")
+    batch.set_defaults(func=batch_command, needs_key=True)
+
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.needs_key and not args.key:
+        parser.error("an API key is required: pass --key or set ACAST_API_KEY")
+    return args.func(args) or 0
+
+if __name__ == '__main__':
+    sys.exit(main())
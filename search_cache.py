@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# TTL/LRU cache for RSS Finder searches, shared by every session: an in-memory
+# LRU in front of a SQLite table on disk. Results younger than SEARCH_TTL are
+# served as-is; older ones (up to MAX_STALE) are served immediately while a
+# background thread refreshes them.
+
+CACHE_PATH = os.path.join('.cache', 'searches.sqlite3')
+SEARCH_TTL = 24 * 60 * 60  # seconds
+MAX_STALE = 7 * 24 * 60 * 60
+MEMORY_ENTRIES = 512
+MAX_ENTRIES = 20000
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_connection = None
+_revalidating = set()
+_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0}
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+def _connect():
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _connection = sqlite3.connect(CACHE_PATH, check_same_thread=False, timeout=30)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute(
+            'CREATE TABLE IF NOT EXISTS searches ('
+            'query TEXT PRIMARY KEY, results TEXT, fetched_at REAL, accessed_at REAL)'
+        )
+        _connection.commit()
+    return _connection
+
+def _remember(query, fetched_at, results):
+    _memory[query] = (fetched_at, results)
+    _memory.move_to_end(query)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+# (fetched_at, results) from memory or disk, or None
+def _lookup(query):
+    with _lock:
+        entry = _memory.get(query)
+        if entry is not None:
+            _memory.move_to_end(query)
+            return entry
+        connection = _connect()
+        row = connection.execute('SELECT fetched_at, results FROM searches WHERE query = ?', (query,)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE searches SET accessed_at = ? WHERE query = ?', (time.time(), query))
+        connection.commit()
+        entry = (row[0], json.loads(row[1]))
+        _remember(query, *entry)
+        return entry
+
+def _store(query, results):
+    now = time.time()
+    with _lock:
+        _remember(query, now, results)
+        connection = _connect()
+        connection.execute(
+            'INSERT OR REPLACE INTO searches (query, results, fetched_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (query, json.dumps(results), now, now)
+        )
+        connection.execute('DELETE FROM searches WHERE fetched_at < ?', (now - MAX_STALE,))
+        connection.execute(
+            'DELETE FROM searches WHERE query IN ('
+            'SELECT query FROM searches ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (MAX_ENTRIES,)
+        )
+        connection.commit()
+
+def _revalidate(query, fetch):
+    try:
+        _store(query, fetch(query))
+    except Exception as e:
+        print(f"Failed to refresh cached search '{query}': {e}")
+    finally:
+        with _lock:
+            _revalidating.discard(query)
+
+# Return results for `query`, calling `fetch(query)` on a miss. `fetch` should
+# raise on failure; failures are never cached.
+def get_results(query, fetch):
+    query = normalize_query(query)
+    entry = _lookup(query)
+    now = time.time()
+
+    if entry is not None and now - entry[0] <= MAX_STALE:
+        fetched_at, results = entry
+        if now - fetched_at <= SEARCH_TTL:
+            with _lock:
+                _stats['hits'] += 1
+            return results
+
+        with _lock:
+            _stats['stale_hits'] += 1
+            start_refresh = query not in _revalidating
+            _revalidating.add(query)
+        if start_refresh:
+            threading.Thread(target=_revalidate, args=(query, fetch), daemon=True).start()
+        return results
+
+    with _lock:
+        _stats['misses'] += 1
+    results = fetch(query)
+    _store(query, results)
+    return results
+
+def stats():
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,50 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Range-maximum index over an episode's detected silences. Silences are sorted
+# by their end time once and a sparse table of "longest silence" winners is
+# built over them, so finding the longest silence ending inside any time window
+# costs two binary searches and one table lookup.
+
+class SilenceIndex:
+    def __init__(self, silence_periods):
+        order = sorted(range(len(silence_periods)), key=lambda i: silence_periods[i]['end'])
+        self.ends = array('d', (silence_periods[i]['end'] for i in order))
+        self.durations = array('d', (silence_periods[i]['duration'] for i in order))
+        # Original list positions, used to break ties the same way max() does
+        self.positions = array('l', order)
+
+        n = len(order)
+        self.table = [array('l', range(n))]
+        width = 2
+        while width <= n:
+            previous = self.table[-1]
+            half = width // 2
+            self.table.append(array('l', (
+                self._longer(previous[i], previous[i + half])
+                for i in range(n - width + 1)
+            )))
+            width *= 2
+
+    def __len__(self):
+        return len(self.ends)
+
+    # Longer silence wins; on equal durations the one listed first wins
+    def _longer(self, a, b):
+        if self.durations[a] != self.durations[b]:
+            return a if self.durations[a] > self.durations[b] else b
+        return a if self.positions[a] < self.positions[b] else b
+
+    # Longest silence whose end falls within [start_time, end_time], or None
+    def longest(self, start_time, end_time):
+        lo = bisect_left(self.ends, start_time)
+        hi = bisect_right(self.ends, end_time) - 1
+        if lo > hi:
+            return None
+
+        level = (hi - lo + 1).bit_length() - 1
+        row = self.table[level]
+        best = self._longer(row[lo], row[hi - (1 << level) + 1])
+        end = self.ends[best]
+        duration = self.durations[best]
+        return {'start': end - duration, 'end': end, 'duration': duration}
@@ -0,0 +1,236 @@
+import json
+import random
+import re
+import threading
+import time
+from base64 import b64encode
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+import mid2_pipeline
+
+# Local stand-ins for the services the pipelines call: the Acast feeds, the
+# open.acast.com REST API, the sphinx encoder, the iTunes search API and the
+# Pipedream backup webhook. Everything is served from one threaded HTTP server
+# under a path prefix per service; `StandinServer.env()` gives the environment
+# variables (see endpoints.py) that point the pipelines at it.
+#
+# Shows are synthetic and sized by their ID: show "bench-1000" has 1000
+# episodes, each with encrypted <acast:settings> that mid2_pipeline.decrypt
+# accepts, catalogue markers that leave room for a Mid2, and silence data.
+
+SHOW_ID_PATTERN = re.compile(r'^bench-(\d+)$')
+EPISODE_DURATION = 3600
+SILENCES_PER_EPISODE = 200
+FIRST_PUBLISHED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# A fixed salt keeps feeds identical between runs (and their derived key cached)
+SALT = bytes(range(16))
+SIGNATURE = b64encode(SALT).decode('ascii')
+
+def episode_id(index):
+    return f"{index:024x}"
+
+def published(index):
+    return FIRST_PUBLISHED - timedelta(hours=index)
+
+def show_size(show_id):
+    match = SHOW_ID_PATTERN.match(show_id)
+    return int(match.group(1)) if match else None
+
+def encrypt_settings(settings, password=mid2_pipeline.password):
+    key = mid2_pipeline.derive_key(SIGNATURE, password)
+    plaintext = json.dumps(settings).encode('utf-8')
+    plaintext += b' ' * (-len(plaintext) % 16)  # decrypt() only keeps the JSON between the braces
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(SALT), backend=default_backend()).encryptor()
+    return b64encode(encryptor.update(plaintext) + encryptor.finalize()).decode('ascii')
+
+@lru_cache(maxsize=8)
+def build_feed(show_id, size, base_url):
+    items = []
+    for index in range(size):
+        settings = encrypt_settings({'cms': {'mediaUrl': f"{base_url}/media/{show_id}/{index}.mp3"}})
+        items.append(
+            f"<item><title>Episode {index}</title><guid>{episode_id(index)}</guid>"
+            f"<pubDate>{format_datetime(published(index), usegmt=True)}</pubDate>"
+            f"<acast:episodeId>{episode_id(index)}</acast:episodeId>"
+            f"<acast:settings>{escape(settings)}</acast:settings></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:acast="https://schema.acast.com/1.0/"><channel>'
+        f"<title>Benchmark Show {size}</title><acast:signature>{SIGNATURE}</acast:signature>"
+        + ''.join(items) +
+        '</channel></rss>'
+    ).encode('utf-8')
+
+def catalogue_episode(index):
+    return {
+        '_id': episode_id(index),
+        'title': f"Episode {index}",
+        'status': 'published',
+        'publishDate': published(index).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'duration': EPISODE_DURATION,
+        'markers': [
+            {'placement': 'preroll', 'start': 0},
+            {'placement': 'midroll', 'start': EPISODE_DURATION * 0.3},
+            {'placement': 'postroll', 'start': EPISODE_DURATION},
+        ],
+    }
+
+# Deterministic silences for a media URL, spread over the whole episode
+def media_info(media_url, silences=SILENCES_PER_EPISODE):
+    rng = random.Random(media_url)
+    periods = []
+    for _ in range(silences):
+        end = rng.uniform(1, EPISODE_DURATION)
+        duration = rng.uniform(0.2, 3)
+        periods.append({'start': max(0, end - duration), 'end': end, 'duration': duration})
+    return {'duration': EPISODE_DURATION, 'silenceDetected': periods}
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, status=200):
+        self._reply(status, json.dumps(data).encode('utf-8'))
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _route(self, method):
+        # Read any body up front, so a reply sent without looking at it (a 404,
+        # say) doesn't leave it on a kept-alive connection
+        self._read_body()
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+        service = parts[0]
+        time.sleep(self.server.media_latency if service == 'sphinx' else self.server.latency)
+
+        # /feeds/public/shows/<show>
+        if method == 'GET' and service == 'feeds' and parts[1:3] == ['public', 'shows'] and len(parts) == 4:
+            size = show_size(parts[3])
+            if size is None:
+                return self._reply(404)
+            body = build_feed(parts[3], size, self.server.base_url)
+            etag = f'"{parts[3]}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._reply(304, headers={'ETag': etag})
+            return self._reply(200, body, 'application/rss+xml', {'ETag': etag})
+
+        # /open/rest/shows/<show>/episodes[/<episode>]
+        if service == 'open' and parts[1:3] == ['rest', 'shows'] and len(parts) >= 5 and parts[4] == 'episodes':
+            size = show_size(parts[3])
+            if size is None:
+                return self._json({'message': 'Not found'}, 404)
+            if method == 'GET' and len(parts) == 5:
+                page = int(query.get('page', ['1'])[0])
+                limit = int(query.get('limit', ['100'])[0])
+                start = (page - 1) * limit
+                return self._json([catalogue_episode(index) for index in range(start, min(start + limit, size))])
+            if method == 'PATCH' and len(parts) == 6:
+                return self._json({'_id': parts[5]})
+
+        # /sphinx/file?url=<media url>
+        if method == 'GET' and service == 'sphinx' and parts[1:] == ['file']:
+            return self._json(media_info(query.get('url', [''])[0], self.server.silences))
+
+        # /itunes/search?term=<query>
+        if method == 'GET' and service == 'itunes' and parts[1:] == ['search']:
+            term = query.get('term', [''])[0]
+            return self._json({'results': [{
+                'trackName': f"{term} {size}",
+                'collectionViewUrl': f"{self.server.base_url}/itunes/show/bench-{size}",
+                'feedUrl': f"https://feeds.acast.com/public/shows/bench-{size}",
+                'artworkUrl600': f"{self.server.base_url}/itunes/artwork.jpg",
+                'artistName': 'Benchmark',
+                'primaryGenreName': 'Technology',
+                'trackCount': size,
+            } for size in (100, 1000, 10000)]})
+
+        # /pipedream (backup webhook)
+        if method == 'POST' and service == 'pipedream':
+            return self._json({'ok': True})
+
+        self._reply(404)
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_PATCH(self):
+        self._route('PATCH')
+
+    def do_POST(self):
+        self._route('POST')
+
+# One threaded server standing in for every remote service. `latency` is added
+# to each request, `media_latency` to sphinx encoder requests instead.
+class StandinServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, media_latency=0.0, silences=SILENCES_PER_EPISODE):
+        self.httpd = ThreadingHTTPServer((host, port), StandinHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.media_latency = media_latency
+        self.httpd.silences = silences
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.httpd.base_url = self.base_url
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def env(self):
+        return {
+            'ACAST_FEEDS_URL': f"{self.base_url}/feeds",
+            'ACAST_OPEN_API_URL': f"{self.base_url}/open",
+            'SPHINX_ENCODER_URL': f"{self.base_url}/sphinx",
+            'ITUNES_SEARCH_URL': f"{self.base_url}/itunes",
+            'PIPEDREAM_WEBHOOK_URL': f"{self.base_url}/pipedream",
+            'ACAST_WRITE_RATE': '1000',  # The stand-in API has no write quota
+        }
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve stand-ins for the Acast APIs until interrupted.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--media-latency', type=float, default=0.0, help="Seconds added to sphinx encoder requests")
+    args = parser.parse_args()
+    server = StandinServer(port=args.port, latency=args.latency, media_latency=args.media_latency).start()
+    for name, value in server.env().items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
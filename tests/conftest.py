@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root and read some settings at import
+# time, so the write rate is lifted before anything imports rate_limit (the
+# stand-in API has no write quota).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('ACAST_WRITE_RATE', '1000')
+
+import catalogue
+import endpoints
+from standin_servers import StandinServer
+
+# Every test runs in its own directory, so caches, journals, backups and
+# metrics reports land under tmp_path instead of the checkout
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture(scope='session')
+def standin():
+    with StandinServer() as server:
+        yield server
+
+# Point the pipelines at the stand-in servers for one test
+@pytest.fixture
+def services(standin, monkeypatch):
+    monkeypatch.setattr(endpoints, 'FEEDS_URL', f"{standin.base_url}/feeds")
+    monkeypatch.setattr(endpoints, 'OPEN_API_URL', f"{standin.base_url}/open")
+    monkeypatch.setattr(endpoints, 'SPHINX_URL', f"{standin.base_url}/sphinx")
+    monkeypatch.setattr(endpoints, 'PIPEDREAM_WEBHOOK_URL', f"{standin.base_url}/pipedream")
+    monkeypatch.setattr(catalogue, 'CATALOGUE_URL', f"{standin.base_url}/open/rest/shows/{{show_id}}/episodes")
+    return standin
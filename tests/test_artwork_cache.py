@@ -0,0 +1,104 @@
+import io
+import os
+import time
+from collections import OrderedDict
+import pytest
+import requests
+from PIL import Image
+import artwork_cache
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+
+def artwork(color, size=(600, 600)):
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format='JPEG')
+    return output.getvalue()
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(artwork_cache, '_memory', OrderedDict())
+    monkeypatch.setattr(artwork_cache, '_connection', None)
+    yield
+    if artwork_cache._connection is not None:
+        artwork_cache._connection.close()
+
+@pytest.fixture
+def artwork_server(monkeypatch):
+    images = {}
+    downloads = []
+
+    def get(url, **kwargs):
+        downloads.append(url)
+        if url not in images:
+            return FakeResponse(b'', status_code=404)
+        return FakeResponse(images[url])
+
+    monkeypatch.setattr(artwork_cache.http_client, 'get', get)
+    return images, downloads
+
+def cached_files():
+    return sorted(name for _, _, names in os.walk(artwork_cache.CACHE_DIR) for name in names)
+
+def test_artwork_is_downsized_once_and_then_served_locally(artwork_server):
+    images, downloads = artwork_server
+    images['red'] = artwork('red')
+    thumbnail = artwork_cache.get_thumbnail('red')
+    with Image.open(io.BytesIO(thumbnail)) as image:
+        assert image.size == artwork_cache.THUMBNAIL_SIZE
+    assert len(thumbnail) < len(images['red'])
+
+    artwork_cache._memory.clear()
+    assert artwork_cache.get_thumbnail('red') == thumbnail
+    assert downloads == ['red']
+
+def test_shared_artwork_is_stored_once(artwork_server):
+    images, _ = artwork_server
+    images['a'] = images['b'] = artwork('blue')
+    assert artwork_cache.get_thumbnails(['a', 'b']) == [artwork_cache.get_thumbnail('a')] * 2
+    assert len(cached_files()) == 1
+
+def test_unavailable_artwork_is_not_cached(artwork_server):
+    images, downloads = artwork_server
+    images['corrupt'] = b'not an image'
+    assert artwork_cache.get_thumbnails(['missing', 'corrupt']) == [None, None]
+    assert artwork_cache.get_thumbnail('missing') is None
+    assert downloads.count('missing') == 2
+    assert cached_files() == []
+
+def test_a_deleted_file_is_downloaded_again(artwork_server):
+    images, downloads = artwork_server
+    images['red'] = artwork('red')
+    artwork_cache.get_thumbnail('red')
+    for name in cached_files():
+        os.remove(artwork_cache._path(name[:-len('.jpg')]))
+    artwork_cache._memory.clear()
+
+    assert artwork_cache.get_thumbnail('red') is not None
+    assert downloads == ['red', 'red']
+
+def test_least_recently_used_thumbnails_are_evicted_by_size(artwork_server, monkeypatch):
+    images, _ = artwork_server
+    for url, color in (('red', 'red'), ('green', 'green'), ('blue', 'blue')):
+        images[url] = artwork(color)
+    sizes = {url: len(artwork_cache.make_thumbnail(images[url])) for url in images}
+    monkeypatch.setattr(artwork_cache, 'MAX_CACHE_BYTES', sizes['red'] + sizes['green'] + sizes['blue'] - 1)
+
+    artwork_cache.get_thumbnail('red')
+    time.sleep(0.01)
+    artwork_cache.get_thumbnail('green')
+    time.sleep(0.01)
+    artwork_cache._memory.clear()
+    artwork_cache.get_thumbnail('red')
+    time.sleep(0.01)
+    artwork_cache.get_thumbnail('blue')
+
+    indexed = {row[0] for row in artwork_cache._connect().execute('SELECT url FROM artwork')}
+    assert indexed == {'red', 'blue'}
+    assert len(cached_files()) == 2
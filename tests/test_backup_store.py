@@ -0,0 +1,60 @@
+import json
+import os
+import pytest
+import backup_store
+
+HEADER = ['Episode GUID', 'Preroll']
+
+class RecordingUploader:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.uploaded = []
+
+    def upload(self, name, data, sha256):
+        if name in self.fail:
+            raise RuntimeError("500 - upstream error")
+        self.uploaded.append((name, sha256))
+
+def manifest(sink):
+    with open(os.path.join(sink.directory, 'manifest.json')) as manifest_file:
+        return json.load(manifest_file)
+
+def test_rows_are_written_in_chunks_and_read_back(workdir):
+    sink = backup_store.open_backup('show', 'plan.csv', HEADER, chunk_rows=2)
+    sink.write_rows([f"guid-{index}", str(index)] for index in range(5))
+    # Two full chunks are on disk before the backup is closed
+    assert [chunk['rows'] for chunk in manifest(sink)['chunks']] == [2, 2]
+    assert not manifest(sink)['complete']
+    sink.close()
+
+    saved = manifest(sink)
+    assert saved['complete'] and saved['header'] == HEADER
+    assert [chunk['file'] for chunk in saved['chunks']] == ['plan-00001.csv.gz', 'plan-00002.csv.gz', 'plan-00003.csv.gz']
+    assert sink.row_count == 5
+    assert sink.wait()
+    assert list(backup_store.iter_backup_rows(sink.directory)) == [[f"guid-{index}", str(index)] for index in range(5)]
+
+def test_a_corrupted_chunk_fails_its_checksum(workdir):
+    sink = backup_store.open_backup('show', 'plan.csv', HEADER, chunk_rows=2)
+    sink.write_rows([['a', '0'], ['b', '1'], ['c', '2']])
+    sink.close()
+    path = os.path.join(sink.directory, 'plan-00002.csv.gz')
+    with open(path, 'ab') as chunk_file:
+        chunk_file.write(b'\0')
+
+    rows = backup_store.iter_backup_rows(sink.directory)
+    assert next(rows) == ['a', '0'] and next(rows) == ['b', '1']
+    with pytest.raises(ValueError, match='plan-00002.csv.gz'):
+        next(rows)
+
+def test_chunks_are_uploaded_and_failures_reported(workdir):
+    uploader = RecordingUploader(fail={'plan-00002.csv.gz'})
+    sink = backup_store.LocalBackupSink('show', 'plan.csv', HEADER, chunk_rows=1, uploader=uploader)
+    sink.write_rows([['a', '0'], ['b', '1'], ['c', '2']])
+    sink.close()
+
+    assert not sink.wait()
+    assert sink.errors == ['plan-00002.csv.gz: 500 - upstream error']
+    chunks = manifest(sink)['chunks']
+    assert [chunk['uploaded'] for chunk in chunks] == [True, False, True]
+    assert sorted(uploader.uploaded) == sorted((chunk['file'], chunk['sha256']) for chunk in chunks if chunk['uploaded'])
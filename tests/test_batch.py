@@ -0,0 +1,49 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import batch
+import patch_writer
+
+# Runs in a spawned worker: wait for the other worker, then take three tokens
+# from whatever limiter the batch initializer installed
+def take_tokens(barrier):
+    barrier.wait()
+    limiter = patch_writer.new_limiter()
+    taken = []
+    for _ in range(3):
+        limiter.acquire()
+        taken.append(time.time())
+    return taken
+
+def test_read_show_ids_skips_headers_blanks_and_duplicates():
+    assert batch.read_show_ids('Show ID,Name\nbench-1, One\n\n"bench-2"\nbench-1\n') == ['bench-1', 'bench-2']
+
+def test_batch_workers_share_one_write_limiter():
+    context = multiprocessing.get_context('spawn')
+    with batch.BatchManager(ctx=context) as manager:
+        barrier = manager.Barrier(2)
+        limiter = manager.TokenBucket(rate=10, burst=2)
+        with ProcessPoolExecutor(max_workers=2, mp_context=context, initializer=batch._init_worker,
+                                 initargs=(manager.BoundedSemaphore(4), limiter)) as executor:
+            futures = [executor.submit(take_tokens, barrier) for _ in range(2)]
+            taken = sorted(stamp for future in futures for stamp in future.result())
+    # Six tokens from one bucket: two at once, then four at 10 per second.
+    # Separate buckets would have handed out all six within 0.1s.
+    assert taken[-1] - taken[0] >= 0.3
+
+def test_each_show_gets_its_own_result_and_failures_stay_per_show(standin, monkeypatch, workdir):
+    for name, value in standin.env().items():
+        monkeypatch.setenv(name, value)
+    output_dir = str(workdir / 'batch')
+
+    results = {result['show_id']: result for result in batch.run_batch(
+        'mid2', ['bench-3', 'missing-show', 'bench-5'], 'key', output_dir=output_dir, max_processes=2, upload_backup=False)}
+
+    assert results['bench-3']['status'] == 'ok' and results['bench-3']['updated'] == 3
+    assert results['bench-5']['status'] == 'ok' and results['bench-5']['updated'] == 5
+    assert results['missing-show']['status'] == 'failed'
+    assert os.path.exists(results['bench-3']['file']) and os.path.exists(results['bench-5']['file'])
+    with open(os.path.join(output_dir, 'summary.jsonl')) as summary_file:
+        assert sorted(json.loads(line)['show_id'] for line in summary_file) == ['bench-3', 'bench-5', 'missing-show']
@@ -0,0 +1,61 @@
+import pytest
+import requests
+import catalogue
+from standin_servers import episode_id
+
+def ids(episodes):
+    return [episode['_id'] for episode in episodes]
+
+@pytest.fixture
+def pages_fetched(monkeypatch):
+    fetched = []
+    fetch = catalogue.fetch_page
+
+    def recording(show_id, headers, page, *args):
+        fetched.append(page)
+        return fetch(show_id, headers, page, *args)
+
+    monkeypatch.setattr(catalogue, 'fetch_page', recording)
+    return fetched
+
+@pytest.mark.parametrize('size', [0, 7, 100, 250])
+def test_every_episode_is_fetched_once(services, size):
+    episodes = list(catalogue.iter_catalogue(f"bench-{size}", {}, page_size=100))
+    assert sorted(ids(episodes)) == [episode_id(index) for index in range(size)]
+
+def test_paging_stops_at_the_first_short_page(services, pages_fetched):
+    list(catalogue.iter_catalogue('bench-45', {}, page_size=10, max_concurrency=2))
+    # Page 5 is short, so no page after 6 (requested before 5 came back) is asked for
+    assert set(range(1, 6)) <= set(pages_fetched) and max(pages_fetched) <= 6
+
+def test_stop_after_ends_paging_early(services, pages_fetched):
+    episodes = list(catalogue.iter_catalogue('bench-100', {}, page_size=10, max_concurrency=1, stop_after=lambda page: page[-1]['_id'] >= episode_id(29)))
+    assert ids(episodes) == [episode_id(index) for index in range(30)]
+    assert pages_fetched == [1, 2, 3]
+
+def test_an_endpoint_that_ignores_paging_is_read_once(monkeypatch):
+    everything = [{'_id': episode_id(index)} for index in range(10)]
+    fetched = []
+
+    def unpaginated(show_id, headers, page, *args):
+        fetched.append(page)
+        return list(everything)
+
+    monkeypatch.setattr(catalogue, 'fetch_page', unpaginated)
+    assert ids(catalogue.iter_catalogue('show', {}, page_size=10, max_concurrency=2)) == ids(everything)
+    assert 2 in fetched
+
+def test_an_error_body_is_a_requests_exception(monkeypatch):
+    class ErrorBody:
+        def raise_for_status(self):
+            pass
+
+        def iter_content(self, chunk_size):
+            return iter([b'{"message": "Forbidden"}'])
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(catalogue.http_client, 'get', lambda url, **kwargs: ErrorBody())
+    with pytest.raises(requests.exceptions.RequestException):
+        catalogue.fetch_page('show', {}, 1)
@@ -0,0 +1,61 @@
+from episode_join import join_episodes, normalize_titles
+import pandas as pd
+
+def matches(joined):
+    return {(row.rss_index, row.cms_index, row.match) for row in joined.itertuples()}
+
+def test_exact_publish_time_match():
+    joined = join_episodes(
+        ['One', 'Two'], ['2024-01-01T10:00:00.000Z', '2024-01-02T10:00:00.000Z'],
+        ['Two', 'One'], ['Tue, 02 Jan 2024 10:00:00 GMT', 'Mon, 01 Jan 2024 10:00:00 GMT'],
+    )
+    assert matches(joined) == {(0, 1, 'exact'), (1, 0, 'exact')}
+
+def test_title_match_on_the_same_day():
+    # Publish times differ by more than the nearest tolerance, titles agree
+    joined = join_episodes(
+        ['Episode 12: The Finale!'], ['2024-01-01T08:00:00Z'],
+        ['episode 12 the finale'], ['Mon, 01 Jan 2024 20:00:00 GMT'],
+    )
+    assert matches(joined) == {(0, 0, 'title')}
+
+def test_nearest_publish_time_within_tolerance():
+    joined = join_episodes(
+        ['CMS title'], ['2024-01-01T10:00:00Z'],
+        ['Feed title'], ['Mon, 01 Jan 2024 10:04:00 GMT'],
+    )
+    assert matches(joined) == {(0, 0, 'nearest')}
+
+def test_no_match_beyond_tolerance_or_without_tolerance():
+    args = (['CMS title'], ['2024-01-01T10:00:00Z'], ['Feed title'], ['Mon, 01 Jan 2024 10:30:00 GMT'])
+    assert join_episodes(*args).empty
+    assert join_episodes(*args[:2], ['Feed title'], ['Mon, 01 Jan 2024 10:04:00 GMT'], tolerance=None).empty
+
+def test_each_episode_is_matched_at_most_once():
+    # Two feed items close to one CMS episode: only the closer one matches
+    joined = join_episodes(
+        ['A'], ['2024-01-01T10:00:00Z'],
+        ['X', 'Y'], ['Mon, 01 Jan 2024 10:05:00 GMT', 'Mon, 01 Jan 2024 10:02:00 GMT'],
+    )
+    assert matches(joined) == {(1, 0, 'nearest')}
+
+def test_earlier_passes_take_priority():
+    # Item 0 matches CMS 0 exactly, so it can't also take CMS 1 by title
+    joined = join_episodes(
+        ['Same', 'Same'], ['2024-01-01T10:00:00Z', '2024-01-01T12:00:00Z'],
+        ['Same', 'Same'], ['Mon, 01 Jan 2024 10:00:00 GMT', 'Mon, 01 Jan 2024 18:00:00 GMT'],
+    )
+    assert matches(joined) == {(0, 0, 'exact'), (1, 1, 'title')}
+
+def test_unparseable_dates_and_blank_titles_never_match():
+    joined = join_episodes(['', None], ['not a date', None], ['', None], ['garbage', None])
+    assert joined.empty
+
+def test_rss_dates_in_other_formats_fall_back_to_inference():
+    joined = join_episodes(['A'], ['2024-01-01T10:00:00Z'], ['B'], ['2024-01-01 10:00:00+00:00'])
+    assert matches(joined) == {(0, 0, 'exact')}
+
+def test_normalize_titles():
+    normalized = normalize_titles(pd.Series(['Hello, World!', '', None, '###']))
+    assert normalized[0] == 'helloworld'
+    assert normalized[1:].isna().all()
@@ -0,0 +1,96 @@
+import threading
+import time
+import pytest
+import endpoints
+import http_client
+import mid2_pipeline
+from standin_servers import StandinServer
+
+def episodes(count):
+    return [{'_id': f"{index:024x}"} for index in range(count)]
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+def run_pool(monkeypatch, analyse, count, **options):
+    monkeypatch.setattr(mid2_pipeline, 'process_episode', analyse)
+    failed = set()
+    results = list(mid2_pipeline.run_episode_pool(episodes(count), [{}] * count, failed=failed, **options))
+    return {episode['_id']: result for episode, result in results}, failed
+
+def test_every_episode_yields_its_result(monkeypatch):
+    results, failed = run_pool(monkeypatch, lambda episode, settings, run_metrics, deadline: [episode['_id']], 6, max_workers=2)
+    assert results == {episode['_id']: [episode['_id']] for episode in episodes(6)}
+    assert failed == set()
+
+def test_errors_are_reported_as_failed(monkeypatch):
+    def analyse(episode, settings, run_metrics, deadline):
+        if episode['_id'].endswith('1'):
+            raise mid2_pipeline.AnalysisError("no media")
+        return [episode['_id']]
+
+    results, failed = run_pool(monkeypatch, analyse, 3)
+    assert results[f"{1:024x}"] is None
+    assert failed == {f"{1:024x}"}
+
+def test_a_hung_task_times_out_while_the_rest_finish(monkeypatch, release):
+    def analyse(episode, settings, run_metrics, deadline):
+        if episode['_id'] == f"{0:024x}":
+            release.wait()
+        return [episode['_id']]
+
+    started = time.monotonic()
+    results, failed = run_pool(monkeypatch, analyse, 5, max_workers=2, task_timeout=0.3)
+    assert time.monotonic() - started < 2
+    assert failed == {f"{0:024x}"}
+    assert sum(result is not None for result in results.values()) == 4
+
+def test_tasks_queued_behind_a_hung_worker_time_out_too(monkeypatch, release):
+    def analyse(episode, settings, run_metrics, deadline):
+        release.wait()
+
+    started = time.monotonic()
+    results, failed = run_pool(monkeypatch, analyse, 3, max_workers=1, task_timeout=0.2)
+    assert time.monotonic() - started < 2
+    assert len(failed) == 3 and set(results.values()) == {None}
+
+def test_setting_the_cancel_event_drops_queued_episodes(monkeypatch):
+    calls = []
+    cancel = threading.Event()
+
+    def analyse(episode, settings, run_metrics, deadline):
+        calls.append(episode['_id'])
+        return [episode['_id']]
+
+    monkeypatch.setattr(mid2_pipeline, 'process_episode', analyse)
+    pool = mid2_pipeline.run_episode_pool(episodes(50), [{}] * 50, max_workers=1, cancel_event=cancel)
+    next(pool)
+    cancel.set()
+    assert list(pool) == []
+    assert len(calls) == 1
+
+def test_the_media_lookup_is_cut_off_at_the_deadline(monkeypatch):
+    with StandinServer(media_latency=3) as server:
+        monkeypatch.setattr(endpoints, 'SPHINX_URL', f"{server.base_url}/sphinx")
+        started = time.monotonic()
+        assert mid2_pipeline.request_media_info('https://media/slow.mp3', deadline=started + 0.3) == {}
+        assert time.monotonic() - started < 1
+
+def test_retries_stop_before_the_deadline(monkeypatch):
+    class Throttled:
+        status_code = 503
+
+        def close(self):
+            pass
+
+    attempts = []
+    monkeypatch.setattr(http_client, '_send', lambda *args, **kwargs: attempts.append(args) or Throttled())
+    monkeypatch.setattr(http_client, 'backoff_delay', lambda attempt: 0.1)
+    started = time.monotonic()
+    response = http_client.get('http://sphinx/file', deadline=started + 0.25)
+    assert response.status_code == 503
+    assert time.monotonic() - started < 0.25
+    assert 1 < len(attempts) <= 3
@@ -0,0 +1,58 @@
+import json
+import pytest
+import requests
+from episode_records import CatalogueEpisode, InvalidJSONArrayError, iter_json_array
+
+DOCUMENT = [
+    {'_id': 'a' * 24, 'title': 'Ünïcode ✓', 'markers': [{'placement': 'midroll', 'start': 2.5}]},
+    12345,
+    -2.75e3,
+    'string, with ] brackets',
+    [1, [2, 3]],
+    None,
+    True,
+    {},
+]
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 8, 13, 64, 4096])
+def test_every_chunk_size_decodes_the_same(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode('utf-8')
+    assert list(iter_json_array(chunked(data, size))) == DOCUMENT
+
+def test_numbers_split_across_chunks_are_not_cut_short():
+    assert list(iter_json_array([b'[1', b'2.', b'5, 3', b'0]'])) == [12.5, 30]
+
+def test_empty_array():
+    assert list(iter_json_array([b' [ ', b' ] '])) == []
+
+def test_rejects_a_non_array_document():
+    with pytest.raises(InvalidJSONArrayError):
+        list(iter_json_array([b'{"a": 1}']))
+
+def test_rejects_an_empty_or_truncated_response():
+    with pytest.raises(InvalidJSONArrayError):
+        list(iter_json_array([]))
+    with pytest.raises(InvalidJSONArrayError):
+        list(iter_json_array([b'[{"a": 1}, {"b"']))
+
+def test_decoding_errors_are_requests_exceptions():
+    # Pages report RequestExceptions, as they did for response.json()
+    assert issubclass(InvalidJSONArrayError, requests.exceptions.RequestException)
+    assert issubclass(InvalidJSONArrayError, ValueError)
+
+def test_catalogue_episode_reads_like_the_cms_dict():
+    episode = CatalogueEpisode.from_json({
+        '_id': 'b' * 24, 'title': 'T', 'status': 'published', 'publishDate': '2024-01-01T00:00:00Z',
+        'duration': 1800, 'ignored': 'x',
+        'markers': [{'placement': 'preroll', 'start': 0}, {'placement': 'midroll', 'start': 600.5}, {'placement': 'postroll'}],
+    })
+    assert episode['_id'] == 'b' * 24
+    assert episode.get('duration') == 1800
+    assert episode.get('ignored') is None
+    assert 'ignored' not in episode and 'title' in episode
+    assert episode.markers == [{'placement': 'preroll', 'start': 0}, {'placement': 'midroll', 'start': 600.5}, {'placement': 'postroll'}]
+    with pytest.raises(KeyError):
+        episode['ignored']
@@ -0,0 +1,95 @@
+import json
+import os
+import pytest
+import endpoints
+import feed_cache
+import feed_parser
+import metrics
+from standin_servers import SIGNATURE, episode_id
+
+@pytest.fixture
+def parses(monkeypatch):
+    parsed = []
+    parse = feed_cache._parse_body
+
+    def counting(body_path, parsed_path, checksum):
+        parsed.append(body_path)
+        return parse(body_path, parsed_path, checksum)
+
+    monkeypatch.setattr(feed_cache, '_parse_body', counting)
+    return parsed
+
+@pytest.fixture
+def requests_sent(monkeypatch):
+    sent = []
+    get = feed_cache.http_client.get
+
+    def recording(url, **kwargs):
+        response = get(url, **kwargs)
+        sent.append((kwargs.get('headers'), response.status_code))
+        return response
+
+    monkeypatch.setattr(feed_cache.http_client, 'get', recording)
+    return sent
+
+def read(feed):
+    return feed.title, feed.signature, list(feed.episodes())
+
+def test_a_feed_is_fetched_once_then_revalidated_and_parsed_once(services, parses, requests_sent):
+    url = endpoints.feed_url('bench-5')
+    title, signature, episodes = read(feed_cache.get_feed(url))
+    assert (title, signature) == ('Benchmark Show 5', SIGNATURE)
+    assert [episode.episodeId for episode in episodes] == [episode_id(index) for index in range(5)]
+    assert all(isinstance(episode, feed_parser.FeedEpisode) for episode in episodes)
+
+    assert read(feed_cache.get_feed(url)) == (title, signature, episodes)
+    assert requests_sent == [({}, 200), ({'If-None-Match': '"bench-5"'}, 304)]
+    assert len(parses) == 1
+
+def test_an_unchanged_body_without_validators_is_not_parsed_again(services, parses):
+    url = endpoints.feed_url('bench-3')
+    read(feed_cache.get_feed(url))
+    # Forget the ETag, as for a server that sends none: the body is downloaded again but not re-parsed
+    _, meta_path, _ = feed_cache._paths(url)
+    meta = feed_cache._read_meta(meta_path)
+    meta['etag'] = None
+    feed_cache._write_atomic(meta_path, json.dumps(meta))
+
+    run_metrics = metrics.Metrics()
+    assert read(feed_cache.get_feed(url, run_metrics=run_metrics))[2][0].episodeId == episode_id(0)
+    assert len(parses) == 1
+    assert 'feed_parses' not in run_metrics.report()['counters']
+
+def test_a_changed_body_is_parsed_again(services, parses):
+    url = endpoints.feed_url('bench-3')
+    read(feed_cache.get_feed(url))
+    _, meta_path, _ = feed_cache._paths(url)
+    meta = feed_cache._read_meta(meta_path)
+    meta.update(etag=None, checksum='stale')
+    feed_cache._write_atomic(meta_path, json.dumps(meta))
+
+    assert len(read(feed_cache.get_feed(url))[2]) == 3
+    assert len(parses) == 2
+
+def test_a_missing_parsed_file_is_rebuilt_from_the_body_on_a_304(services, parses):
+    url = endpoints.feed_url('bench-2')
+    read(feed_cache.get_feed(url))
+    os.remove(feed_cache._paths(url)[2])
+    assert len(read(feed_cache.get_feed(url))[2]) == 2
+    assert len(parses) == 2
+
+def test_least_recently_used_feeds_are_evicted_with_all_their_files(services, monkeypatch):
+    urls = [endpoints.feed_url(f"bench-{size}") for size in (20, 21, 22)]
+    for url in urls[:2]:
+        read(feed_cache.get_feed(url))
+    oldest = feed_cache._paths(urls[0])
+    for path in oldest:
+        os.utime(path, (1, 1))
+
+    total = sum(os.path.getsize(os.path.join(feed_cache.CACHE_DIR, name)) for name in os.listdir(feed_cache.CACHE_DIR))
+    monkeypatch.setattr(feed_cache, 'MAX_CACHE_BYTES', total)
+    read(feed_cache.get_feed(urls[2]))
+
+    assert not any(os.path.exists(path) for path in oldest)
+    assert all(os.path.exists(path) for path in feed_cache._paths(urls[1]))
+    assert os.path.exists(feed_cache._paths(urls[2])[0])
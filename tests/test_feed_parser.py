@@ -0,0 +1,62 @@
+import io
+from feed_parser import Feed
+
+def rss(items, channel_head='<title>Show</title><acast:signature>c2lnbmF0dXJl</acast:signature>', channel_tail=''):
+    return io.BytesIO((
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:acast="https://schema.acast.com/1.0/"><channel>'
+        + channel_head + ''.join(items) + channel_tail +
+        '</channel></rss>'
+    ).encode('utf-8'))
+
+def item(index, settings='blob'):
+    return (
+        f"<item><title>Episode {index}</title><guid>guid-{index}</guid>"
+        f"<pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate>"
+        f"<acast:episodeId>ep-{index}</acast:episodeId><acast:settings>{settings}</acast:settings></item>"
+    )
+
+class Closing:
+    closed = 0
+
+    def close(self):
+        self.closed += 1
+
+def test_the_header_is_read_before_any_episode():
+    feed = Feed(rss([item(0), item(1)]))
+    assert (feed.title, feed.signature) == ('Show', 'c2lnbmF0dXJl')
+    episodes = list(feed.episodes())
+    assert [episode.episodeId for episode in episodes] == ['ep-0', 'ep-1']
+    assert episodes[1]._asdict() == {
+        'episodeId': 'ep-1', 'settings': 'blob', 'title': 'Episode 1',
+        'pubDate': 'Mon, 01 Jan 2024 00:00:00 GMT', 'guid': 'guid-1',
+    }
+
+def test_item_titles_are_not_taken_for_the_show_title():
+    feed = Feed(rss([item(0)], channel_head='', channel_tail='<title>Late title</title>'))
+    assert feed.title is None
+    list(feed.episodes())
+    assert feed.title == 'Late title'
+
+def test_items_are_dropped_once_read():
+    feed = Feed(rss([item(index) for index in range(50)]))
+    read = []
+    for episode in feed.episodes():
+        # Items parsed ahead are still in the tree; ones already read are not
+        in_tree = {elem.findtext('guid') for elem in feed._channel.findall('item')}
+        assert not in_tree & set(read)
+        read.append(episode.guid)
+    assert feed._channel.findall('item') == []
+
+def test_the_source_is_closed_once_the_episodes_are_read():
+    response = Closing()
+    feed = Feed(rss([item(0), item(1)]), response=response)
+    episodes = feed.episodes()
+    next(episodes)
+    assert response.closed == 0
+    list(episodes)
+    assert response.closed == 1
+
+def test_an_item_without_an_episode_id_is_still_yielded():
+    feed = Feed(rss(['<item><title>Trailer</title></item>', item(1)]))
+    assert [episode.episodeId for episode in feed.episodes()] == [None, 'ep-1']
@@ -0,0 +1,150 @@
+import csv
+import gzip
+import io
+import pandas as pd
+import pytest
+import requests
+import import_pipeline
+from import_pipeline import ERROR_HEADER, import_timestamps, markers_payload, validate
+
+NAN = float('nan')
+PLAN_COLUMNS = ['Episode GUID', 'Preroll', 'Midroll', 'Midroll2', 'Postroll', 'Episode Duration', 'Postroll At End', 'Publish Date']
+EXPORT_COLUMNS = ['Episode Title', 'GUID', 'Publish Date', 'Preroll', 'Midroll', 'Postroll']
+
+def guid(index):
+    return f"{index:024x}"
+
+def frame(rows, columns=PLAN_COLUMNS):
+    chunk = pd.DataFrame(rows, columns=columns, dtype=str)
+    return import_pipeline._normalise(chunk, import_pipeline._column_map(chunk.columns), first_row=2)
+
+def quiet(level, message):
+    pass
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return str(path)
+
+def error_rows(summary):
+    rows = list(csv.reader(io.StringIO(summary['error_content'].decode('utf-8'))))
+    assert rows[0] == ERROR_HEADER
+    return rows[1:]
+
+def test_validate_reports_the_first_failing_check():
+    reasons = validate(frame([
+        [guid(1), '0', '600', '1200', '1800', '3600', 'No', ''],      # valid
+        ['NOT-A-GUID', '0', '600', '', '1800', '', '', ''],
+        [guid(3), '0', 'soon', '', '1800', '', '', ''],
+        [guid(4), '', '', '', '', '', '', ''],
+        [guid(5), '-1', '600', '', '1800', '', '', ''],
+        [guid(6), '0', '1300', '1200', '1800', '', '', ''],
+        [guid(7), '0', '600', '', '4000', '3600', '', ''],
+        [guid(8), '0', '600', '', '9999', '3600', '', ''],             # postroll at end
+        [guid(9).upper(), '0', '', '', '1800', '', '', ''],            # GUIDs are case-insensitive
+    ]))
+    assert reasons.to_dict() == {
+        3: 'Invalid GUID (expected 24 lowercase hex characters)',
+        4: 'Non-numeric marker',
+        5: 'No markers',
+        6: 'Negative marker',
+        7: 'Markers out of order (preroll, midroll, midroll2, postroll)',
+        8: 'Marker past the end of the episode',
+    }
+
+def test_markers_past_the_end_allow_a_second_of_slack():
+    reasons = validate(frame([[guid(1), '0', '600', '', '3600.9', '3600', '', '']]))
+    assert reasons.empty
+
+def test_gaps_are_skipped_when_checking_the_order():
+    reasons = validate(frame([
+        [guid(1), '', '900', '', '600', '', '', ''],
+        [guid(2), '0', '', '1200', '1800', '', '', ''],
+    ]))
+    assert list(reasons.index) == [2]
+
+def test_markers_payload_keeps_positional_slots():
+    assert markers_payload((0.0, 600.5, 1200.0, 1800.0)) == '0,600.5,1200,1800'
+    assert markers_payload((0.0, NAN, NAN, 1800.0)) == '0,,1800'
+    assert markers_payload((NAN, 600.0, NAN, NAN)) == ',600,'
+    assert markers_payload((NAN, NAN, 1200.0, 1800.0)) == ',,1200,1800'
+    assert markers_payload((0.0, 3207.5654372207546, NAN, 3600.0)) == '0,3207.5654372207546,3600'
+
+def test_dry_run_validates_across_chunks(workdir):
+    rows = [[guid(i), '0', '600', '', '1800', '3600', 'No', ''] for i in range(25)]
+    rows[4][2] = 'x'
+    rows.append([guid(3), '0', '600', '', '1800', '3600', 'No', ''])  # duplicate from an earlier chunk
+    path = write_csv(workdir / 'plan.csv', PLAN_COLUMNS, rows)
+
+    summary = import_timestamps(path, 'show', 'key', dry_run=True, chunk_rows=10, notify=quiet)
+    assert {key: summary[key] for key in ('rows', 'valid', 'invalid', 'duplicates', 'updated', 'chunks')} == {
+        'rows': 26, 'valid': 24, 'invalid': 1, 'duplicates': 1, 'updated': 0, 'chunks': 3,
+    }
+    assert error_rows(summary) == [
+        ['6', guid(4), 'Non-numeric marker'],
+        ['27', guid(3), 'Duplicate GUID (first occurrence kept)'],
+    ]
+
+def test_reads_gzipped_exporter_csvs(services, workdir):
+    path = workdir / 'export.csv.gz'
+    with gzip.open(path, 'wt', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerow(['Title, with comma', guid(1), '01/02/2024', '0', '100', '200'])
+    summary = import_timestamps(str(path), 'bench-1', 'key', dry_run=True, notify=quiet)
+    assert (summary['rows'], summary['valid']) == (1, 1)
+
+def test_rejects_files_without_marker_columns(workdir):
+    path = write_csv(workdir / 'other.csv', ['GUID', 'Title'], [[guid(1), 'x']])
+    with pytest.raises(ValueError):
+        import_timestamps(path, 'show', 'key', dry_run=True, notify=quiet)
+
+def test_imports_through_the_writer(services, workdir):
+    rows = [[f"Episode {i}", guid(i), '01/01/2024', '0', '' if i % 2 else '600', '1800'] for i in range(12)]
+    rows.append(['Bad', 'nope', '01/01/2024', '0', '600', '1800'])
+    path = write_csv(workdir / 'export.csv', EXPORT_COLUMNS, rows)
+    progress = []
+
+    summary = import_timestamps(path, 'bench-12', 'key', chunk_rows=5, max_workers=4, notify=quiet,
+                                progress=lambda completed, total: progress.append((completed, total)))
+    assert (summary['valid'], summary['updated'], summary['failed'], summary['invalid']) == (12, 12, 0, 1)
+    assert progress[-1] == (12, 12)
+    assert error_rows(summary) == [['14', 'nope', 'Invalid GUID (expected 24 lowercase hex characters)']]
+
+def test_failed_writes_are_reported_with_their_row(services, workdir):
+    path = write_csv(workdir / 'plan.csv', PLAN_COLUMNS, [[guid(1), '0', '600', '', '1800', '', '', '']])
+    summary = import_timestamps(path, 'unknown-show', 'key', notify=quiet)
+    assert (summary['updated'], summary['failed']) == (0, 1)
+    assert error_rows(summary) == [['2', guid(1), 'PATCH failed: 404']]
+
+def test_exporter_rows_for_episodes_with_a_second_midroll_are_refused(services, workdir, monkeypatch):
+    catalogue_episodes = [
+        {'_id': guid(1), 'markers': [{'placement': 'midroll', 'start': 600}, {'placement': 'midroll', 'start': 1200}]},
+        {'_id': guid(2), 'markers': [{'placement': 'midroll', 'start': 600}, {'placement': 'midroll'}]},
+    ]
+    monkeypatch.setattr(import_pipeline.catalogue, 'iter_catalogue', lambda show_id, headers, **kwargs: iter(catalogue_episodes))
+    sent = []
+    send_patch = import_pipeline.patch_writer.send_patch
+    monkeypatch.setattr(import_pipeline.patch_writer, 'send_patch', lambda url, payload, *args, **kwargs: sent.append(url.rsplit('/', 1)[1]) or send_patch(url, payload, *args, **kwargs))
+    path = write_csv(workdir / 'export.csv', EXPORT_COLUMNS, [
+        ['A', guid(1), '', '0', '600', '1800'],
+        ['B', guid(2), '', '0', '600', '1800'],
+        ['C', guid(3), '', '0', '600', '1800'],
+    ])
+
+    summary = import_timestamps(path, 'bench-12', 'key', notify=quiet)
+    assert (summary['valid'], summary['invalid'], summary['updated']) == (2, 1, 2)
+    assert sorted(sent) == [guid(2), guid(3)]
+    assert error_rows(summary) == [['2', guid(1), 'Episode has a second midroll and the file has no Midroll2 column']]
+
+def test_files_with_a_midroll2_column_skip_the_catalogue(workdir, monkeypatch):
+    monkeypatch.setattr(import_pipeline.catalogue, 'iter_catalogue', lambda *args, **kwargs: pytest.fail("catalogue fetched"))
+    path = write_csv(workdir / 'plan.csv', PLAN_COLUMNS, [[guid(1), '0', '600', '1200', '1800', '', '', '']])
+    assert import_timestamps(path, 'show', 'key', dry_run=True, notify=quiet)['valid'] == 1
+
+def test_an_exporter_file_for_an_unknown_show_is_not_imported(services, workdir):
+    path = write_csv(workdir / 'export.csv', EXPORT_COLUMNS, [['A', guid(1), '', '0', '600', '1800']])
+    with pytest.raises(requests.exceptions.HTTPError):
+        import_timestamps(path, 'unknown-show', 'key', notify=quiet)
@@ -0,0 +1,57 @@
+from base64 import b64encode
+import pytest
+import mid2_pipeline
+from standin_servers import SIGNATURE, encrypt_settings
+
+@pytest.fixture(autouse=True)
+def empty_key_cache(monkeypatch):
+    monkeypatch.setattr(mid2_pipeline, '_key_cache', type(mid2_pipeline._key_cache)())
+
+def count_derivations(monkeypatch):
+    calls = []
+    scrypt = mid2_pipeline.Scrypt
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs['salt'])
+        return scrypt(*args, **kwargs)
+
+    monkeypatch.setattr(mid2_pipeline, 'Scrypt', counting)
+    return calls
+
+def test_decrypt_many_derives_the_key_once_and_keeps_the_order(monkeypatch):
+    calls = count_derivations(monkeypatch)
+    texts = [encrypt_settings({'cms': {'mediaUrl': f"https://media/{index}.mp3"}}) for index in range(5)]
+    calls.clear()  # encrypt_settings derived (and cached) the key itself
+
+    mid2_pipeline._key_cache.clear()
+    decrypted = mid2_pipeline.decrypt_many(SIGNATURE, texts, mid2_pipeline.password)
+    assert [settings['cms']['mediaUrl'] for settings in decrypted] == [f"https://media/{index}.mp3" for index in range(5)]
+    assert len(calls) == 1
+
+    # decrypt() reuses the cached key
+    assert mid2_pipeline.decrypt(SIGNATURE, texts[2], mid2_pipeline.password) == decrypted[2]
+    assert len(calls) == 1
+
+def test_a_bad_blob_only_fails_itself():
+    texts = [encrypt_settings({'cms': {'mediaUrl': 'a'}}), 'not base64!', encrypt_settings({'cms': {'mediaUrl': 'b'}})]
+    assert mid2_pipeline.decrypt_many(SIGNATURE, texts, mid2_pipeline.password) == [
+        {'cms': {'mediaUrl': 'a'}}, {}, {'cms': {'mediaUrl': 'b'}},
+    ]
+
+def test_a_bad_signature_fails_every_blob():
+    assert mid2_pipeline.decrypt_many('not base64!', ['x', 'y'], mid2_pipeline.password) == [{}, {}]
+
+def test_keys_are_evicted_least_recently_used(monkeypatch):
+    monkeypatch.setattr(mid2_pipeline, 'KEY_CACHE_SIZE', 2)
+    calls = count_derivations(monkeypatch)
+    signatures = [b64encode(bytes([index]) * 16).decode('ascii') for index in range(3)]
+
+    mid2_pipeline.derive_key(signatures[0], 'password')
+    mid2_pipeline.derive_key(signatures[1], 'password')
+    mid2_pipeline.derive_key(signatures[0], 'password')  # now the most recently used
+    mid2_pipeline.derive_key(signatures[2], 'password')  # evicts signatures[1]
+    assert len(calls) == 3
+    assert list(mid2_pipeline._key_cache) == [(signatures[0], 'password'), (signatures[2], 'password')]
+
+    mid2_pipeline.derive_key(signatures[1], 'password')
+    assert len(calls) == 4
@@ -0,0 +1,50 @@
+from marker_diff import MarkerChange, diff_markers, report_row
+
+GUID = 'c' * 24
+
+def plan_row(preroll, midroll, midroll2, postroll, duration=3600):
+    return [GUID, preroll, midroll, midroll2, postroll, duration, 'No', '2024-01-01T00:00:00Z']
+
+def cms(*markers):
+    return [{'placement': placement, 'start': start} for placement, start in markers]
+
+def test_identical_markers_are_a_no_op():
+    markers = cms(('preroll', 0), ('midroll', 900), ('midroll', 1800), ('postroll', 3600))
+    assert diff_markers(markers, plan_row(0, 900, 1800, 3600)) == []
+
+def test_positions_within_tolerance_are_unchanged():
+    markers = cms(('preroll', 0), ('midroll', 900), ('postroll', 3600))
+    assert diff_markers(markers, plan_row(0, 900.6, None, 3599.5)) == []
+    assert diff_markers(markers, plan_row(0, 902, None, 3600), tolerance=5) == []
+
+def test_moved_added_and_removed_markers():
+    markers = cms(('preroll', 0), ('midroll', 900), ('postroll', 1500))
+    changes = diff_markers(markers, plan_row('', 900, 1500, 3600))
+    assert changes == [
+        MarkerChange('preroll', 0.0, None),
+        MarkerChange('midroll2', None, 1500.0),
+        MarkerChange('postroll', 1500.0, 3600.0),
+    ]
+
+def test_postroll_at_end_shorthand_matches_the_duration():
+    markers = cms(('midroll', 900), ('midroll', 1800), ('postroll', 9999))
+    assert diff_markers(markers, plan_row(None, 900, 1800, 3600)) == []
+    assert diff_markers(cms(('midroll', 900), ('postroll', 3600)), plan_row(None, 900, None, 9999)) == []
+
+def test_markers_a_plan_row_cannot_hold_are_ignored():
+    markers = cms(('midroll', 600), ('midroll', 1800), ('midroll', 2400), ('postroll', 3600))
+    assert diff_markers(markers, plan_row(None, 600, 1800, 3600)) == []
+    assert report_row(markers, plan_row(None, 600, 1800, 3600), [])[1] == 'midroll 600, midroll2 1800, midroll3 2400, postroll 3600'
+
+def test_markers_without_a_start_are_ignored():
+    markers = [{'placement': 'preroll'}, {'placement': 'midroll', 'start': 900}]
+    assert diff_markers(markers, plan_row(None, 900, None, None)) == []
+
+def test_report_row():
+    markers = cms(('midroll', 900), ('postroll', 3600))
+    row = plan_row(None, 900, 1800, 3600)
+    changes = diff_markers(markers, row)
+    assert report_row(markers, row, changes) == [
+        GUID, 'midroll 900, postroll 3600', 'midroll 900, midroll2 1800, postroll 3600', 'midroll2: - -> 1800', 'update',
+    ]
+    assert report_row(markers, plan_row(None, 900, None, 3600), [])[4] == 'skip'
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import media_cache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(media_cache, '_connection', None)
+    yield
+    if media_cache._connection is not None:
+        media_cache._connection.close()
+
+def media_info(silences):
+    return {'duration': 3600.0, 'silenceDetected': [{'end': float(index + 1), 'duration': 0.5} for index in range(silences)]}
+
+def cached_urls():
+    return {row[0] for row in media_cache._connect().execute('SELECT url FROM media_info')}
+
+def test_stored_media_info_round_trips():
+    media_cache.store('a', media_info(3))
+    assert media_cache.lookup('a') == media_info(3)
+    assert media_cache.lookup('b') is None
+
+def test_expired_entries_are_dropped(monkeypatch):
+    media_cache.store('a', media_info(3))
+    monkeypatch.setattr(media_cache, 'MEDIA_TTL', -1)
+    assert media_cache.lookup('a') is None
+    assert cached_urls() == set()
+
+def test_least_recently_used_entries_are_evicted_by_size(monkeypatch):
+    # 16 bytes per silence: a is 160 bytes, b 1600 and c 320
+    monkeypatch.setattr(media_cache, 'MAX_CACHE_BYTES', 2000)
+    media_cache.store('a', media_info(10))
+    time.sleep(0.01)
+    media_cache.store('b', media_info(100))
+    time.sleep(0.01)
+    assert media_cache.lookup('a') is not None
+    time.sleep(0.01)
+    media_cache.store('c', media_info(20))
+    assert cached_urls() == {'a', 'c'}
+
+def test_a_cache_from_before_sizes_is_upgraded():
+    os.makedirs(os.path.dirname(media_cache.CACHE_PATH), exist_ok=True)
+    old = sqlite3.connect(media_cache.CACHE_PATH)
+    old.execute('CREATE TABLE media_info (url TEXT PRIMARY KEY, duration REAL, silences BLOB, fetched_at REAL, accessed_at REAL)')
+    old.execute('INSERT INTO media_info VALUES (?, ?, ?, ?, ?)', ('a', 60.0, media_cache._pack_silences(media_info(4)['silenceDetected']), time.time(), time.time()))
+    old.commit()
+    old.close()
+
+    assert media_cache.lookup('a')['duration'] == 60.0
+    assert media_cache._connect().execute('SELECT size FROM media_info').fetchone() == (64,)
+
+def test_concurrent_requests_for_one_url_share_a_single_fetch():
+    calls = []
+    release = threading.Event()
+
+    def fetch(url):
+        calls.append(url)
+        release.wait(5)
+        return media_info(2)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(media_cache.get_media_info, 'shared', fetch) for _ in range(8)]
+        time.sleep(0.2)
+        release.set()
+        results = [future.result() for future in futures]
+    assert calls == ['shared']
+    assert all(result == media_info(2) for result in results)
+    # Later calls are served from the cache
+    assert media_cache.get_media_info('shared', fetch) == media_info(2)
+    assert calls == ['shared']
+
+def test_failed_fetches_are_shared_but_not_cached():
+    calls = []
+    release = threading.Event()
+
+    def fetch(url):
+        calls.append(url)
+        release.wait(5)
+        raise RuntimeError("encoder down")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(media_cache.get_media_info, 'down', fetch) for _ in range(4)]
+        time.sleep(0.2)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+    assert calls == ['down']
+
+    assert media_cache.get_media_info('empty', lambda url: {}) == {}
+    assert media_cache.lookup('empty') is None
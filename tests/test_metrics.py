@@ -0,0 +1,97 @@
+import json
+import os
+import time
+import metrics
+
+def test_stages_add_up_time_and_calls():
+    run_metrics = metrics.Metrics()
+    with run_metrics.stage('decrypt'):
+        time.sleep(0.02)
+    run_metrics.add_stage_time('decrypt', 1.5, calls=3)
+    stage = run_metrics.report()['stages']['decrypt']
+    assert stage['calls'] == 4
+    assert 1.52 <= stage['seconds'] < 1.6
+
+def test_latencies_fall_into_the_first_bucket_that_holds_them():
+    run_metrics = metrics.Metrics()
+    for seconds in (0.01, 0.05, 0.3, 1000):
+        run_metrics.observe_latency('api.example', seconds)
+    histogram = run_metrics.report()['latency']['api.example']
+    assert histogram['count'] == 4
+    assert histogram['buckets']['0.05'] == 2
+    assert histogram['buckets']['0.5'] == 1
+    # Past the last bound only the count and sum see it
+    assert sum(histogram['buckets'].values()) == 3
+    assert histogram['sum'] == 1000.36
+
+def test_counters_are_kept_per_label_set():
+    run_metrics = metrics.Metrics()
+    run_metrics.increment('http_retries', host='a')
+    run_metrics.increment('http_retries', 2, host='a')
+    run_metrics.increment('http_retries', host='b')
+    run_metrics.increment('feed_parses')
+    counters = run_metrics.report()['counters']
+    assert sorted(counters['http_retries'], key=lambda entry: entry['host']) == [
+        {'host': 'a', 'value': 3}, {'host': 'b', 'value': 1}]
+    assert counters['feed_parses'] == [{'value': 1}]
+
+def test_gauges_remember_their_peak():
+    run_metrics = metrics.Metrics()
+    for depth in (3, 8, 2):
+        run_metrics.set_gauge('episodes', depth)
+    assert run_metrics.report()['queue_depth'] == {'episodes': {'current': 2, 'max': 8}}
+
+def test_the_null_registry_records_nothing():
+    with metrics.NULL.stage('decrypt'):
+        pass
+    metrics.NULL.add_stage_time('decrypt', 1)
+    metrics.NULL.observe_latency('api.example', 1)
+    metrics.NULL.increment('http_retries', host='a')
+    metrics.NULL.set_gauge('episodes', 4)
+    report = metrics.NULL.report()
+    assert (report['stages'], report['latency'], report['counters'], report['queue_depth']) == ({}, {}, {}, {})
+
+def test_timed_iterator_counts_only_the_wait_for_items():
+    def slow():
+        for item in range(3):
+            time.sleep(0.02)
+            yield item
+
+    timed = metrics.TimedIterator(slow())
+    items = []
+    for item in timed:
+        items.append(item)
+        time.sleep(0.05)
+    assert items == [0, 1, 2]
+    assert 0.06 <= timed.seconds < 0.15
+
+def test_prometheus_output_has_cumulative_buckets_and_escaped_labels():
+    run_metrics = metrics.Metrics()
+    run_metrics.add_stage_time('fetch "rss"', 2)
+    run_metrics.observe_latency('api.example', 0.07)
+    run_metrics.observe_latency('api.example', 0.2)
+    run_metrics.increment('http_errors', host='api.example', status=503)
+    run_metrics.set_gauge('episodes', 5)
+    lines = metrics.to_prometheus(run_metrics.report()).splitlines()
+
+    assert 'scripthub_stage_seconds_total{stage="fetch \\"rss\\""} 2.0' in lines
+    assert 'scripthub_stage_calls_total{stage="fetch \\"rss\\""} 1' in lines
+    assert 'scripthub_http_request_duration_seconds_bucket{host="api.example",le="0.05"} 0' in lines
+    assert 'scripthub_http_request_duration_seconds_bucket{host="api.example",le="0.1"} 1' in lines
+    assert 'scripthub_http_request_duration_seconds_bucket{host="api.example",le="0.25"} 2' in lines
+    assert 'scripthub_http_request_duration_seconds_bucket{host="api.example",le="300"} 2' in lines
+    assert 'scripthub_http_request_duration_seconds_bucket{host="api.example",le="+Inf"} 2' in lines
+    assert 'scripthub_http_request_duration_seconds_count{host="api.example"} 2' in lines
+    assert 'scripthub_http_errors_total{host="api.example",status="503"} 1' in lines
+    assert 'scripthub_queue_depth{pool="episodes"} 5' in lines
+    assert 'scripthub_queue_depth_max{pool="episodes"} 5' in lines
+
+def test_write_report_exports_json_and_prometheus(workdir):
+    run_metrics = metrics.Metrics()
+    run_metrics.increment('feed_parses')
+    report = run_metrics.write_report('show-1')
+    base = os.path.join(metrics.METRICS_DIR, 'show-1')
+    with open(base + '.json') as report_file:
+        assert json.load(report_file) == report
+    with open(base + '.prom') as prom_file:
+        assert 'scripthub_feed_parses_total{} 1\n' in prom_file.read()
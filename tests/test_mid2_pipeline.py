@@ -0,0 +1,174 @@
+import glob
+import io
+import json
+import pandas as pd
+import backup_store
+import import_pipeline
+import marker_diff
+import mid2_pipeline
+from run_journal import RunJournal
+from standin_servers import catalogue_episode, episode_id
+from watermark import Watermark
+
+def quiet(level, message):
+    pass
+
+def test_an_existing_mid2_is_planned_unchanged_without_analysis():
+    episode = {
+        '_id': 'e' * 24, 'title': 'T', 'publishDate': '2024-01-01T00:00:00Z', 'duration': 3000,
+        'markers': [
+            {'placement': 'preroll', 'start': 0}, {'placement': 'midroll', 'start': 900},
+            {'placement': 'midroll', 'start': 1800}, {'placement': 'postroll', 'start': 9999},
+        ],
+    }
+    # No settings: any media lookup would fail the analysis
+    row = mid2_pipeline.process_episode(episode, {})
+    assert row == ['e' * 24, 0, 900, 1800, 9999, 3000, 'Yes', '2024-01-01T00:00:00Z']
+    assert marker_diff.diff_markers(episode['markers'], row) == []
+
+def test_an_episode_with_three_midrolls_is_reported_but_never_written(services, monkeypatch):
+    episode = {
+        '_id': 'f' * 24, 'title': 'T', 'publishDate': '2024-01-01T00:00:00Z', 'status': 'published', 'duration': 3000,
+        'markers': [
+            {'placement': 'midroll', 'start': 600}, {'placement': 'midroll', 'start': 1800},
+            {'placement': 'midroll', 'start': 2400}, {'placement': 'postroll', 'start': 9999},
+        ],
+    }
+    monkeypatch.setattr(mid2_pipeline, 'prepare_episodes', lambda *args, **kwargs: ('show_timestamp_export.csv', [episode], [{}], [episode]))
+    written = []
+    monkeypatch.setattr(mid2_pipeline, 'patch_planned_row', lambda row, *args, **kwargs: written.append(row))
+
+    _, results, report = mid2_pipeline.plan_placements('show', {}, notify=quiet)
+    assert results == []
+    assert [row[0] for row in report] == ['f' * 24]
+    assert report[0][3:] == ['', 'skip']
+
+    summary = mid2_pipeline.run_autoplacer('show', 'key', notify=quiet, upload_backup=False)
+    assert (summary['planned'], summary['updated']) == (0, 0)
+    assert written == []
+
+def test_a_full_run_updates_every_planned_episode(services):
+    summary = mid2_pipeline.run_autoplacer('bench-12', 'key', max_workers=4, notify=quiet, upload_backup=False)
+    assert summary['planned'] == 12
+    assert summary['updated'] == 12
+    assert summary['backup']
+    assert summary['watermark'] == catalogue_episode(0)['publishDate']
+
+    with open(summary['metrics']) as report_file:
+        stages = json.load(report_file)['stages']
+    assert {'analysis', 'patch', 'fetch_media_info'} <= set(stages)
+
+def test_the_backup_holds_the_original_markers_and_restores_them(services, monkeypatch):
+    summary = mid2_pipeline.run_autoplacer('bench-4', 'key', notify=quiet, upload_backup=False)
+    assert summary['updated'] == 4
+    [directory] = glob.glob('backups/bench-4/*')
+    rows = list(backup_store.iter_backup_rows(directory))
+    original = catalogue_episode(0)['markers']
+    assert len(rows) == 4
+    preroll, midroll, postroll = (marker['start'] for marker in original)
+    assert all([float(value) if value else None for value in row[8:]] == [preroll, midroll, None, postroll] for row in rows)
+
+    sent = []
+    send_patch = import_pipeline.patch_writer.send_patch
+    monkeypatch.setattr(import_pipeline.patch_writer, 'send_patch', lambda url, payload, *args, **kwargs: sent.append(payload) or send_patch(url, payload, *args, **kwargs))
+    for chunk in sorted(glob.glob(f"{directory}/*.csv.gz")):
+        import_pipeline.import_timestamps(chunk, 'bench-4', 'key', notify=quiet)
+    assert sent == [{'markers': ','.join(import_pipeline._format_marker(marker['start']) for marker in original)}] * 4
+
+def test_resume_only_writes_what_is_left(services, monkeypatch):
+    dry = mid2_pipeline.run_autoplacer('bench-6', 'key', dry_run=True, notify=quiet)
+    plan = pd.read_csv(io.StringIO(dry['file_content'])).astype(object).values.tolist()
+
+    journal = RunJournal('bench-6')
+    journal.start()
+    for row in plan:
+        journal.record('placed', row=row, markers=[])
+    journal.record('plan', filename=dry['filename'])
+    journal.record('backup')
+    for row in plan[:4]:
+        journal.record('patched', guid=row[0])
+
+    written = []
+    patch = mid2_pipeline.patch_planned_row
+    monkeypatch.setattr(mid2_pipeline, 'patch_planned_row', lambda row, *args: written.append(row[0]) or patch(row, *args))
+    summary = mid2_pipeline.run_autoplacer('bench-6', 'key', resume=True, notify=quiet, upload_backup=False)
+    assert summary['updated'] == 6
+    assert sorted(written) == sorted(row[0] for row in plan[4:])
+    assert not RunJournal('bench-6').can_resume()
+
+def test_a_run_that_stopped_mid_analysis_resumes_where_it_left_off(services, monkeypatch):
+    dry = mid2_pipeline.run_autoplacer('bench-8', 'key', dry_run=True, notify=quiet)
+    plan = pd.read_csv(io.StringIO(dry['file_content']), dtype={'Episode GUID': str}).astype(object).values.tolist()
+
+    # The interrupted attempt placed three rows and updated two of them
+    journal = RunJournal('bench-8')
+    journal.start()
+    for row in plan[:3]:
+        journal.record('placed', row=row, markers=[])
+    for row in plan[:2]:
+        journal.record('patched', guid=row[0])
+
+    written = []
+    analysed = []
+    patch = mid2_pipeline.patch_planned_row
+    analyse = mid2_pipeline.process_episode
+    monkeypatch.setattr(mid2_pipeline, 'patch_planned_row', lambda row, *args: written.append(row[0]) or patch(row, *args))
+    monkeypatch.setattr(mid2_pipeline, 'process_episode', lambda episode, *args, **kwargs: analysed.append(episode['_id']) or analyse(episode, *args, **kwargs))
+    messages = []
+    summary = mid2_pipeline.run_autoplacer('bench-8', 'key', resume=True, upload_backup=False,
+                                           notify=lambda level, message: messages.append((level, message)))
+
+    assert summary['updated'] == 8 and summary['planned'] == 8
+    assert sorted(written) == sorted(row[0] for row in plan[2:])
+    assert not set(analysed) & {row[0] for row in plan[:3]}
+    assert any(level == 'info' and message.startswith('Resuming') for level, message in messages)
+    assert not RunJournal('bench-8').can_resume()
+
+def test_episodes_missing_from_the_feed_hold_the_watermark_back(services, monkeypatch):
+    # Episode 3 is in the catalogue but its feed item hasn't appeared yet
+    missing = episode_id(3)
+    join = mid2_pipeline.join_episodes
+
+    def join_without_missing(cms_titles, *args, **kwargs):
+        matches = join(cms_titles, *args, **kwargs)
+        return matches[matches['cms_index'] != cms_titles.index("Episode 3")]
+
+    monkeypatch.setattr(mid2_pipeline, 'join_episodes', join_without_missing)
+    summary = mid2_pipeline.run_autoplacer('bench-6', 'key', notify=quiet, upload_backup=False, incremental=True)
+    assert summary['updated'] == 5
+    assert Watermark('bench-6').publish_date == catalogue_episode(4)['publishDate']
+
+    monkeypatch.setattr(mid2_pipeline, 'join_episodes', join)
+    written = []
+    patch = mid2_pipeline.patch_planned_row
+    monkeypatch.setattr(mid2_pipeline, 'patch_planned_row', lambda row, *args: written.append(row[0]) or patch(row, *args))
+    mid2_pipeline.run_autoplacer('bench-6', 'key', notify=quiet, upload_backup=False, incremental=True)
+    assert missing in written
+    assert Watermark('bench-6').publish_date == catalogue_episode(0)['publishDate']
+
+def test_asking_to_resume_with_nothing_to_resume_says_so(services):
+    messages = []
+    summary = mid2_pipeline.run_autoplacer('bench-3', 'key', resume=True, upload_backup=False,
+                                           notify=lambda level, message: messages.append((level, message)))
+    assert summary['updated'] == 3
+    assert ('warning', "There is no interrupted run to resume for this show, so a new run was started.") in messages
+
+def test_failed_analyses_hold_the_watermark_back(services, monkeypatch):
+    failing = {episode_id(2), episode_id(5)}
+    analyse = mid2_pipeline.process_episode
+
+    def flaky(episode, settings, run_metrics, deadline=None):
+        if episode['_id'] in failing:
+            raise mid2_pipeline.AnalysisError("media info could not be fetched")
+        return analyse(episode, settings, run_metrics, deadline)
+
+    monkeypatch.setattr(mid2_pipeline, 'process_episode', flaky)
+    summary = mid2_pipeline.run_autoplacer('bench-10', 'key', notify=quiet, upload_backup=False, incremental=True)
+    assert summary['updated'] == 8
+    # Newest settled episode older than the oldest failure (episode 5)
+    assert Watermark('bench-10').publish_date == catalogue_episode(6)['publishDate']
+
+    failing.clear()
+    summary = mid2_pipeline.run_autoplacer('bench-10', 'key', notify=quiet, upload_backup=False, incremental=True)
+    assert summary['planned'] == 6
+    assert Watermark('bench-10').publish_date == catalogue_episode(0)['publishDate']
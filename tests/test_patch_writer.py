@@ -0,0 +1,101 @@
+import time
+from types import SimpleNamespace
+import pytest
+import requests
+import http_client
+import patch_writer
+from rate_limit import TokenBucket
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(patch_writer, 'time', SimpleNamespace(sleep=slept.append))
+    return slept
+
+def serve(monkeypatch, statuses):
+    responses = iter(statuses)
+    sent = []
+
+    def patch(url, **kwargs):
+        sent.append(url)
+        return next(responses)
+
+    monkeypatch.setattr(http_client, 'patch', patch)
+    return sent
+
+def test_the_bucket_allows_a_burst_then_paces_to_its_rate():
+    bucket = TokenBucket(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # Two tokens up front, the other four at 20 per second
+    assert 0.18 <= time.monotonic() - started < 0.5
+
+def test_the_bucket_halves_on_throttling_and_creeps_back():
+    bucket = TokenBucket(rate=4, burst=4, min_rate=1.5)
+    bucket.slow_down()
+    assert bucket.rate == 2
+    assert bucket.tokens <= 0
+    bucket.slow_down()
+    assert bucket.rate == 1.5
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == 4
+
+def test_retry_after_is_honoured_but_never_shortens_the_backoff():
+    assert patch_writer.retry_delay(FakeResponse(429, '7'), 0) == 7
+    assert patch_writer.retry_delay(FakeResponse(429, '1'), 3) == http_client.backoff_delay(3)
+    assert patch_writer.retry_delay(FakeResponse(429, 'Wed, 21 Oct 2015 07:28:00 GMT'), 1) == http_client.backoff_delay(1)
+    assert patch_writer.retry_delay(FakeResponse(502), 2) == http_client.backoff_delay(2)
+
+def test_send_patch_retries_throttled_responses(monkeypatch, sleeps):
+    sent = serve(monkeypatch, [FakeResponse(429, '3'), FakeResponse(502), FakeResponse(200)])
+    limiter = TokenBucket(rate=100, burst=100)
+    response = patch_writer.send_patch('http://api/episode', {'markers': '0,600,1800'}, {}, limiter)
+    assert response.status_code == 200
+    assert len(sent) == 3
+    assert sleeps == [3, http_client.backoff_delay(1)]
+    assert limiter.rate < 100
+
+def test_send_patch_returns_other_errors_at_once(monkeypatch, sleeps):
+    sent = serve(monkeypatch, [FakeResponse(404)])
+    response = patch_writer.send_patch('http://api/episode', {}, {}, TokenBucket(rate=100, burst=100))
+    assert response.status_code == 404
+    assert len(sent) == 1 and sleeps == []
+
+def test_send_patch_gives_up_after_max_retries(monkeypatch, sleeps):
+    sent = serve(monkeypatch, [FakeResponse(429)] * 3)
+    response = patch_writer.send_patch('http://api/episode', {}, {}, TokenBucket(rate=100, burst=100), max_retries=2)
+    assert response.status_code == 429
+    assert len(sent) == 3 and len(sleeps) == 2
+
+def test_write_concurrently_pulls_items_lazily_and_reports_failures():
+    pulled = []
+
+    def items():
+        for item in range(20):
+            pulled.append(item)
+            yield item
+
+    def write(item):
+        if item == 3:
+            raise requests.exceptions.ConnectionError("refused")
+        return FakeResponse(200)
+
+    writer = patch_writer.write_concurrently(items(), write, max_workers=2)
+    first = next(writer)
+    # No more than two writes per worker are queued ahead
+    assert len(pulled) <= 2 * 2
+    results = dict([first] + list(writer))
+    assert sorted(results) == list(range(20))
+    assert results[3] is None
+    assert all(response.status_code == 200 for item, response in results.items() if item != 3)
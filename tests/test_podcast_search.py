@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+import pytest
+import endpoints
+import podcast_search
+import search_cache
+
+@pytest.fixture
+def itunes(standin, monkeypatch):
+    monkeypatch.setattr(endpoints, 'ITUNES_URL', f"{standin.base_url}/itunes")
+    monkeypatch.setattr(search_cache, '_memory', OrderedDict())
+    monkeypatch.setattr(search_cache, '_connection', None)
+    yield standin
+    if search_cache._connection is not None:
+        search_cache._connection.close()
+
+@pytest.fixture
+def searches(monkeypatch):
+    sent = []
+    fetch = podcast_search.fetch_podcasts
+
+    def recording(query):
+        sent.append(query)
+        return fetch(query)
+
+    monkeypatch.setattr(podcast_search, 'fetch_podcasts', recording)
+    return sent
+
+def test_show_names_skip_headers_blanks_and_duplicates():
+    text = 'Show Name,Notes\nThe Daily,x\n\n  Serial \nThe Daily\n'
+    assert podcast_search.read_show_names(text) == ['The Daily', 'Serial']
+
+def test_show_ids_come_from_the_feed_url():
+    assert podcast_search.extract_show_id('https://feeds.acast.com/public/shows/abc123') == 'abc123'
+    assert podcast_search.extract_show_id('https://feeds.acast.com/public/shows/abc123/') == 'abc123'
+
+def test_acast_feeds_are_preferred():
+    podcasts = [{'feed': 'https://example.com/rss'}, {'feed': 'https://feeds.acast.com/public/shows/x'}]
+    assert podcast_search.best_acast_match(podcasts) is podcasts[1]
+    assert podcast_search.best_acast_match(podcasts[:1]) is None
+
+def test_every_name_gets_one_row(itunes):
+    names = [f"show {index}" for index in range(6)]
+    rows = list(podcast_search.resolve_show_names(names, rate=100, burst=100))
+    assert sorted(row[0] for row in rows) == names
+    row = next(row for row in rows if row[0] == 'show 0')
+    assert row == ['show 0', 'show 0 100', 'bench-100', 'https://shows.acast.com/bench-100',
+                   'https://feeds.acast.com/public/shows/bench-100', 'Found']
+    assert all(len(row) == len(podcast_search.BULK_HEADER) for row in rows)
+
+def test_lookups_are_paced_to_the_rate_limit(itunes):
+    started = time.monotonic()
+    rows = list(podcast_search.resolve_show_names([f"show {index}" for index in range(5)], rate=10, burst=1))
+    # One lookup at once, the other four at 10 per second
+    assert time.monotonic() - started >= 0.35
+    assert all(row[-1] == 'Found' for row in rows)
+
+def test_cached_names_do_not_wait_for_the_limiter(itunes, searches):
+    names = [f"show {index}" for index in range(5)]
+    list(podcast_search.resolve_show_names(names, rate=100, burst=100))
+    searches.clear()
+
+    started = time.monotonic()
+    # A rate this low would stall on a second uncached lookup
+    rows = list(podcast_search.resolve_show_names(names + ['new show'], rate=0.01, burst=1))
+    assert time.monotonic() - started < 5
+    assert len(rows) == 6
+    assert searches == ['new show']
+
+def test_failed_lookups_are_reported_per_name(itunes, monkeypatch):
+    def fetch(query):
+        if query == 'broken':
+            raise RuntimeError("503 Service Unavailable")
+        return [{'title': query, 'feed': 'https://example.com/rss'}]
+
+    monkeypatch.setattr(podcast_search, 'fetch_podcasts', fetch)
+    rows = {row[0]: row for row in podcast_search.resolve_show_names(['broken', 'elsewhere'], rate=100, burst=100)}
+    assert rows['broken'][-1] == 'Error: 503 Service Unavailable'
+    assert rows['elsewhere'] == ['elsewhere', '', '', '', '', 'No Acast match']
@@ -0,0 +1,81 @@
+import os
+import run_journal
+from run_journal import RunJournal, run_paths
+
+ROW = ['d' * 24, 0, 900, 1800, 3600, 3600, 'Yes', '2024-01-01T00:00:00Z']
+ORIGINAL = [{'placement': 'midroll', 'start': 900}, {'placement': 'postroll', 'start': 3600}]
+
+def test_a_new_show_has_nothing_to_resume():
+    journal = RunJournal('show')
+    assert journal.path is None
+    assert not journal.can_resume()
+
+def test_resume_after_an_interrupted_write_stage():
+    journal = RunJournal('show')
+    journal.start()
+    journal.record('placed', row=ROW, markers=ORIGINAL)
+    journal.record('plan', filename='plan.csv')
+    journal.record('backup')
+    journal.record('patched', guid=ROW[0])
+
+    resumed = RunJournal('show')
+    assert resumed.can_resume()
+    assert resumed.plan == [ROW]
+    assert resumed.original_markers == {ROW[0]: ORIGINAL}
+    assert resumed.filename == 'plan.csv'
+    assert resumed.backup_done
+    assert resumed.patched == {ROW[0]}
+
+    resumed.record('done')
+    assert not RunJournal('show').can_resume()
+
+def test_a_run_that_died_mid_analysis_resumes_from_its_placed_rows():
+    journal = RunJournal('show')
+    journal.start()
+    journal.record('placed', row=ROW, markers=ORIGINAL)
+    journal.record('patched', guid=ROW[0])
+
+    resumed = RunJournal('show')
+    assert resumed.can_resume()
+    assert resumed.plan is None
+    assert resumed.placed == [ROW] and resumed.patched == {ROW[0]}
+
+def test_a_run_that_placed_nothing_is_not_resumable():
+    RunJournal('show').start()
+    assert not RunJournal('show').can_resume()
+
+def test_a_partially_written_last_line_is_ignored():
+    journal = RunJournal('show')
+    journal.start()
+    journal.record('placed', row=ROW, markers=ORIGINAL)
+    journal.record('plan', filename='plan.csv')
+    with open(journal.path, 'a') as journal_file:
+        journal_file.write('{"stage": "patch')
+    resumed = RunJournal('show')
+    assert resumed.can_resume()
+    assert resumed.patched == set()
+
+def test_starting_a_run_keeps_earlier_runs_and_their_original_markers():
+    first = RunJournal('show')
+    first.start()
+    first.record('placed', row=ROW, markers=ORIGINAL)
+    first.record('patched', guid=ROW[0])
+
+    second = RunJournal('show')
+    second.start()
+    assert second.path != first.path
+    assert second.placed == [] and second.patched == set()
+    assert run_paths('show') == [first.path, second.path]
+    with open(first.path) as first_file:
+        assert '"markers"' in first_file.read()
+
+def test_a_legacy_single_file_journal_is_read_as_the_oldest_run():
+    os.makedirs(run_journal.JOURNAL_DIR)
+    legacy_path = os.path.join(run_journal.JOURNAL_DIR, 'show.jsonl')
+    with open(legacy_path, 'w') as legacy_file:
+        legacy_file.write('{"stage": "plan", "rows": [], "filename": "old.csv"}\n')
+    assert RunJournal('show').filename == 'old.csv'
+
+    journal = RunJournal('show')
+    journal.start()
+    assert run_paths('show') == [legacy_path, journal.path]
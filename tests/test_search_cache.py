@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+import pytest
+import search_cache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(search_cache, '_memory', OrderedDict())
+    monkeypatch.setattr(search_cache, '_revalidating', set())
+    monkeypatch.setattr(search_cache, '_stats', {'hits': 0, 'stale_hits': 0, 'misses': 0})
+    monkeypatch.setattr(search_cache, '_connection', None)
+    yield
+    if search_cache._connection is not None:
+        search_cache._connection.close()
+
+def counting(results):
+    calls = []
+
+    def fetch(query):
+        calls.append(query)
+        return results
+    return fetch, calls
+
+def wait_for_refreshes():
+    deadline = time.monotonic() + 5
+    while search_cache._revalidating and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_queries_are_normalized_and_served_from_the_cache():
+    fetch, calls = counting([{'title': 'Show'}])
+    assert search_cache.get_results('  The  SHOW ', fetch) == [{'title': 'Show'}]
+    assert search_cache.get_results('the show', fetch) == [{'title': 'Show'}]
+    assert calls == ['the show']
+    assert search_cache.stats() == {'hits': 1, 'stale_hits': 0, 'misses': 1}
+
+def test_results_survive_a_restart_on_disk(monkeypatch):
+    fetch, calls = counting(['result'])
+    search_cache.get_results('show', fetch)
+    search_cache._connection.close()
+    monkeypatch.setattr(search_cache, '_connection', None)
+    monkeypatch.setattr(search_cache, '_memory', OrderedDict())
+
+    assert search_cache.get_results('show', fetch) == ['result']
+    assert calls == ['show']
+
+def test_stale_results_are_served_at_once_and_refreshed_in_the_background(monkeypatch):
+    search_cache.get_results('show', lambda query: ['old'])
+    monkeypatch.setattr(search_cache, 'SEARCH_TTL', -1)
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(query):
+        calls.append(query)
+        release.wait(5)
+        return ['new']
+
+    started = time.monotonic()
+    assert search_cache.get_results('show', slow_fetch) == ['old']
+    assert search_cache.get_results('show', slow_fetch) == ['old']
+    assert time.monotonic() - started < 1
+    release.set()
+    wait_for_refreshes()
+
+    # One refresh for both stale hits
+    assert calls == ['show']
+    assert search_cache.get_results('show', slow_fetch) == ['new']
+    assert search_cache.stats()['stale_hits'] == 3
+
+def test_results_past_max_stale_are_fetched_again(monkeypatch):
+    search_cache.get_results('show', lambda query: ['old'])
+    monkeypatch.setattr(search_cache, 'MAX_STALE', -1)
+    assert search_cache.get_results('show', lambda query: ['new']) == ['new']
+
+def test_failures_are_not_cached(monkeypatch):
+    def failing(query):
+        raise RuntimeError("503")
+
+    with pytest.raises(RuntimeError):
+        search_cache.get_results('show', failing)
+    assert search_cache.get_results('show', lambda query: ['found']) == ['found']
+
+    # A failed refresh keeps serving the stale results
+    monkeypatch.setattr(search_cache, 'SEARCH_TTL', -1)
+    assert search_cache.get_results('show', failing) == ['found']
+    wait_for_refreshes()
+    assert search_cache.get_results('show', failing) == ['found']
+
+def test_least_recently_used_searches_are_evicted(monkeypatch):
+    monkeypatch.setattr(search_cache, 'MAX_ENTRIES', 2)
+    monkeypatch.setattr(search_cache, 'MEMORY_ENTRIES', 2)
+    for query in ('a', 'b'):
+        search_cache.get_results(query, lambda query: [query])
+        time.sleep(0.01)
+    search_cache._memory.clear()
+    search_cache.get_results('a', lambda query: ['refetched'])
+    time.sleep(0.01)
+    search_cache.get_results('c', lambda query: [query])
+
+    stored = {row[0] for row in search_cache._connect().execute('SELECT query FROM searches')}
+    assert stored == {'a', 'c'}
+    assert list(search_cache._memory) == ['a', 'c']
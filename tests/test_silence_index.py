@@ -0,0 +1,39 @@
+import random
+import pytest
+from silence_index import SilenceIndex
+
+def brute_force(silences, start_time, end_time):
+    inside = [silence for silence in silences if start_time <= silence['end'] <= end_time]
+    if not inside:
+        return None
+    best = max(inside, key=lambda silence: silence['duration'])
+    return {'start': best['end'] - best['duration'], 'end': best['end'], 'duration': best['duration']}
+
+def random_silences(rng, count):
+    return [{'end': rng.uniform(0, 3600), 'duration': round(rng.uniform(0.2, 3), 1)} for _ in range(count)]
+
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 64, 200])
+def test_longest_matches_a_linear_scan(count):
+    rng = random.Random(count)
+    silences = random_silences(rng, count)
+    index = SilenceIndex(silences)
+    assert len(index) == count
+    for _ in range(200):
+        start_time = rng.uniform(-100, 3600)
+        end_time = start_time + rng.uniform(0, 2000)
+        assert index.longest(start_time, end_time) == brute_force(silences, start_time, end_time)
+
+def test_window_bounds_are_inclusive():
+    index = SilenceIndex([{'end': 10.0, 'duration': 1.0}, {'end': 20.0, 'duration': 2.0}])
+    assert index.longest(10.0, 10.0)['end'] == 10.0
+    assert index.longest(10.0, 20.0)['end'] == 20.0
+    assert index.longest(10.5, 19.5) is None
+
+def test_ties_go_to_the_silence_listed_first():
+    silences = [{'end': 30.0, 'duration': 2.0}, {'end': 10.0, 'duration': 2.0}, {'end': 20.0, 'duration': 1.0}]
+    assert SilenceIndex(silences).longest(0, 40)['end'] == 30.0
+
+def test_empty_index():
+    index = SilenceIndex([])
+    assert len(index) == 0
+    assert index.longest(0, 100) is None
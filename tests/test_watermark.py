@@ -0,0 +1,52 @@
+from watermark import Watermark, parse_publish_date
+
+def episode(guid, publish_date):
+    return {'_id': guid, 'publishDate': publish_date}
+
+def test_a_show_without_a_mark_treats_everything_as_new():
+    watermark = Watermark('show')
+    assert not watermark
+    assert watermark.is_new(episode('a', '2020-01-01T00:00:00Z'))
+
+def test_advance_and_is_new():
+    watermark = Watermark('show')
+    watermark.advance([
+        episode('a', '2024-01-01T00:00:00.000Z'),
+        episode('b', '2024-01-03T00:00:00.000Z'),
+        episode('c', '2024-01-03T00:00:00.000Z'),
+    ])
+    assert watermark.publish_date == '2024-01-03T00:00:00.000Z'
+    assert watermark.guids == {'b', 'c'}
+    assert not watermark.is_new(episode('a', '2024-01-01T00:00:00.000Z'))
+    assert not watermark.is_new(episode('b', '2024-01-03T00:00:00Z'))
+    # Same moment, different episode, and anything later, are new
+    assert watermark.is_new(episode('d', '2024-01-03T00:00:00Z'))
+    assert watermark.is_new(episode('e', '2024-01-03T00:00:01Z'))
+
+def test_the_mark_never_moves_back():
+    watermark = Watermark('show')
+    watermark.advance([episode('b', '2024-01-03T00:00:00Z')])
+    watermark.advance([episode('a', '2024-01-01T00:00:00Z')])
+    assert watermark.publish_date == '2024-01-03T00:00:00Z'
+    assert watermark.guids == {'b'}
+
+def test_the_mark_stops_short_of_unsettled_episodes():
+    settled = [episode('a', '2024-01-01T00:00:00Z'), episode('c', '2024-01-02T00:00:00Z'), episode('e', '2024-01-04T00:00:00Z')]
+    unsettled = [episode('d', '2024-01-03T00:00:00Z'), episode('f', '2024-01-02T00:00:00Z')]
+    watermark = Watermark('show')
+    watermark.advance(settled, unsettled=unsettled)
+    assert watermark.publish_date == '2024-01-02T00:00:00Z'
+    assert watermark.guids == {'c'}
+    assert all(watermark.is_new(failed) for failed in unsettled)
+
+def test_save_and_reload():
+    watermark = Watermark('show')
+    watermark.advance([episode('a', '2024-01-01T00:00:00Z')])
+    watermark.save()
+    reloaded = Watermark('show')
+    assert reloaded.publish_date == '2024-01-01T00:00:00Z'
+    assert reloaded.guids == {'a'}
+    assert not Watermark('other')
+
+def test_parse_publish_date_defaults_to_utc():
+    assert parse_publish_date('2024-01-01T00:00:00') == parse_publish_date('2024-01-01T00:00:00Z')
@@ -0,0 +1,73 @@
+from operator import itemgetter
+import catalogue
+import endpoints
+import feed_cache
+from episode_join import join_episodes, parse_cms_dates
+from csv_export import CsvExport
+
+# Timestamp export pipeline, independent of Streamlit: one CSV row per
+# published episode with its title, GUID, publish date and ad markers.
+
+EXPORT_HEADER = ['Episode Title', 'GUID', 'Publish Date', 'Preroll', 'Midroll', 'Postroll']
+
+# Returns the show name, the number of catalogue episodes and the CsvExport
+def export_show_timestamps(showId, key, compress=False):
+    headers = {
+        'x-api-key': key,
+    }
+
+    # Parse RSS Feed early
+    rssFeed = feed_cache.get_feed(endpoints.feed_url(showId))
+    showName = rssFeed.title
+
+    rssItems = list(rssFeed.episodes())
+
+    # Extract markers as catalogue pages arrive
+    rows = []
+    episodeCount = 0
+    for episodes in catalogue.iter_catalogue(showId, headers):
+        episodeCount += 1
+        episodeGUID = episodes.get('_id')
+        episodeTitle = episodes.get('title')
+        publishStatus = episodes.get('status')
+        episodePublished = episodes.get('publishDate')
+        duration = episodes.get('duration')
+        adMarkers = {marker['placement']: str(marker['start']) for marker in episodes['markers'] if 'start' in marker}
+
+        # Get ad markers from dictionary, or default to an empty string
+        preroll = adMarkers.get('preroll', "")
+        midroll = adMarkers.get('midroll', "")
+        postroll = adMarkers.get('postroll', "")
+
+        if postroll == '9999':
+            postroll = duration
+
+        if publishStatus == 'published':
+            row = {}
+            row['Episode Title'] = episodeTitle
+            row['GUID'] = episodeGUID
+            row['Publish Date'] = episodePublished
+            row['Preroll'] = preroll
+            row['Midroll'] = midroll
+            row['Postroll'] = postroll
+            rows.append(row)
+
+    rows.sort(key=itemgetter('Publish Date'), reverse=True)
+
+    # Match CMS episodes to RSS items by publish date, then title
+    matches = join_episodes(
+        [row['Episode Title'] for row in rows],
+        [row['Publish Date'] for row in rows],
+        [item.title for item in rssItems],
+        [item.pubDate for item in rssItems],
+    )
+    cmsPublished = parse_cms_dates([row['Publish Date'] for row in rows])
+    for rssIndex, cmsIndex in zip(matches['rss_index'], matches['cms_index']):
+        row = rows[cmsIndex]
+        row['GUID'] = rssItems[rssIndex].guid
+        row['Publish Date'] = cmsPublished[cmsIndex].strftime('%m/%d/%Y')  # Convert date to string in Month/Date/Year format
+
+    export = CsvExport(EXPORT_HEADER, compress=compress)
+    export.write_rows(row.values() for row in rows)
+
+    return showName, episodeCount, export
@@ -0,0 +1,62 @@
+import json
+import os
+from datetime import datetime, timezone
+
+# Per-show high-water mark for incremental autoplacer runs: the newest CMS
+# publishDate a completed run has processed, plus the GUIDs published at
+# exactly that moment (so an episode sharing the timestamp isn't skipped).
+# Episodes at or below the mark are left alone by incremental runs.
+
+WATERMARK_DIR = os.path.join('.cache', 'watermarks')
+
+def parse_publish_date(value):
+    published = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+class Watermark:
+    def __init__(self, show_id):
+        self.path = os.path.join(WATERMARK_DIR, f"{show_id}.json")
+        self.publish_date = None
+        self.guids = set()
+        try:
+            with open(self.path) as watermark_file:
+                saved = json.load(watermark_file)
+            self.publish_date = saved['publish_date']
+            self.guids = set(saved['guids'])
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    def __bool__(self):
+        return self.publish_date is not None
+
+    def is_new(self, episode):
+        if self.publish_date is None:
+            return True
+        published = parse_publish_date(episode['publishDate'])
+        mark = parse_publish_date(self.publish_date)
+        return published > mark or (published == mark and episode['_id'] not in self.guids)
+
+    # Move the mark up to the newest of `episodes`; it never moves back, and
+    # never past the oldest of `unsettled` (episodes a later run must retry)
+    def advance(self, episodes, unsettled=()):
+        limit = min((parse_publish_date(episode['publishDate']) for episode in unsettled), default=None)
+        mark = parse_publish_date(self.publish_date) if self.publish_date else None
+        for episode in episodes:
+            published = parse_publish_date(episode['publishDate'])
+            if limit is not None and published > limit:
+                continue
+            if mark is None or published > mark:
+                mark = published
+                self.publish_date = episode['publishDate']
+                self.guids = {episode['_id']}
+            elif published == mark:
+                self.guids.add(episode['_id'])
+
+    def save(self):
+        os.makedirs(WATERMARK_DIR, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as watermark_file:
+            json.dump({'publish_date': self.publish_date, 'guids': sorted(self.guids)}, watermark_file)
+        os.replace(temp_path, self.path)